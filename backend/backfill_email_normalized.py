@@ -0,0 +1,108 @@
+"""
+Backfill contacts.email_normalized / leads.email_normalized in batches.
+
+Run once after database_migration_email_normalized.sql. New and updated rows
+are already covered by its triggers; this walks existing rows by primary key
+range so each UPDATE holds row locks on at most --batch-size rows and commits
+before the next, keeping the live /applications traffic unblocked. Safe to
+re-run or resume with --start-id: rows already correct are skipped.
+
+Usage (from backend/, with the DB_* environment variables set):
+    python backfill_email_normalized.py --table contacts [--batch-size 5000] [--sleep 0.05]
+    python backfill_email_normalized.py --table leads --dry-run
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import Any, Dict
+
+from connection_manager import open_connection
+
+logger = logging.getLogger(__name__)
+
+# table -> primary key column
+TABLES = {
+    'contacts': 'contact_id',
+    'leads': 'lead_id',
+}
+
+# Must match the LOWER(TRIM(email_address)) in the triggers
+NEEDS_BACKFILL = "(email_normalized IS NULL OR email_normalized <> LOWER(TRIM(email_address)))"
+
+
+def backfill(connection, table: str, batch_size: int = 5000, sleep: float = 0.0,
+             start_id: int = 0, dry_run: bool = False) -> Dict[str, Any]:
+    """Normalize email_normalized for every row of table with primary key > start_id."""
+    key = TABLES[table]
+    started = time.perf_counter()
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MAX({key}) AS max_id FROM {table}")
+        max_id = (cursor.fetchone() or {}).get('max_id') or 0
+        if dry_run:
+            cursor.execute(f"SELECT COUNT(*) AS pending FROM {table} WHERE {NEEDS_BACKFILL}")
+            pending = cursor.fetchone()['pending']
+    connection.commit()
+
+    if dry_run:
+        return {'table': table, 'max_id': max_id, 'pending': pending, 'dry_run': True}
+
+    updated = 0
+    batches = 0
+    low = start_id
+    while low < max_id:
+        high = min(low + batch_size, max_id)
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE {table}
+                SET email_normalized = LOWER(TRIM(email_address))
+                WHERE {key} > %s AND {key} <= %s AND {NEEDS_BACKFILL}
+            """, (low, high))
+            updated += cursor.rowcount
+        connection.commit()
+        batches += 1
+
+        logger.info("Backfilled batch", extra={
+            'table': table,
+            'last_id': high,
+            'max_id': max_id,
+            'updated': updated
+        })
+        low = high
+        if sleep:
+            time.sleep(sleep)
+
+    return {
+        'table': table,
+        'max_id': max_id,
+        'batches': batches,
+        'updated': updated,
+        'elapsed_s': round(time.perf_counter() - started, 1)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill email_normalized in primary-key batches")
+    parser.add_argument('--table', required=True, choices=sorted(TABLES))
+    parser.add_argument('--batch-size', type=int, default=5000, help='Primary key range per UPDATE')
+    parser.add_argument('--sleep', type=float, default=0.05, help='Seconds to pause between batches')
+    parser.add_argument('--start-id', type=int, default=0, help='Resume after this primary key')
+    parser.add_argument('--dry-run', action='store_true', help='Only count the rows that need a backfill')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    connection = open_connection()
+    try:
+        summary = backfill(connection, args.table, args.batch_size, args.sleep, args.start_id, args.dry_run)
+    finally:
+        connection.close()
+
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
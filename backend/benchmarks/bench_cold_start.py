@@ -0,0 +1,87 @@
+"""
+Cold-start benchmark for the main Lambda handler.
+
+Each sample runs in a fresh interpreter (like a new Lambda execution
+environment) and measures:
+
+- import: `import lambda_function`
+- first request: the first lambda_handler call for the route (OPTIONS
+  preflight or POST /presign)
+
+AWS endpoints are pointed at a closed local port and fake credentials are
+set, so no request leaves the machine.
+
+Usage (from backend/):
+    python benchmarks/bench_cold_start.py [--runs 10]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = r"""
+import json, time, logging, sys
+started = time.perf_counter()
+import lambda_function
+imported = time.perf_counter()
+logging.getLogger().setLevel(logging.CRITICAL)
+event = json.loads(sys.argv[1])
+lambda_function.lambda_handler(event, None)
+finished = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'first_request_ms': (finished - imported) * 1000}))
+"""
+
+ROUTES = {
+    'OPTIONS': {'httpMethod': 'OPTIONS', 'path': '/applications', 'headers': {}},
+    'POST /presign': {
+        'httpMethod': 'POST',
+        'path': '/presign',
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'fileName': 'receipt.jpg', 'fileType': 'image/jpeg'})
+    },
+}
+
+
+def _environment():
+    env = dict(os.environ)
+    env.update({
+        'AWS_ACCESS_KEY_ID': 'bench',
+        'AWS_SECRET_ACCESS_KEY': 'bench',
+        'AWS_DEFAULT_REGION': 'ap-southeast-1',
+        'AWS_ENDPOINT_URL': 'http://127.0.0.1:9',
+        'AWS_MAX_ATTEMPTS': '1',
+        'S3_BUCKET_NAME': 'bench-bucket',
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    return env
+
+
+def run_sample(event):
+    output = subprocess.run(
+        [sys.executable, '-c', SAMPLE, json.dumps(event)],
+        cwd=BACKEND_DIR, env=_environment(), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lambda cold-start benchmark")
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters per route')
+    args = parser.parse_args(argv)
+
+    print(f"{'route':16s} {'import ms':>10s} {'first request ms':>17s} {'total ms':>10s}")
+    for route, event in ROUTES.items():
+        samples = [run_sample(event) for _ in range(args.runs)]
+        import_ms = statistics.median(s['import_ms'] for s in samples)
+        request_ms = statistics.median(s['first_request_ms'] for s in samples)
+        total_ms = statistics.median(s['import_ms'] + s['first_request_ms'] for s in samples)
+        print(f"{route:16s} {import_ms:10.1f} {request_ms:17.1f} {total_ms:10.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Microbenchmark: cold vs warm generate_pdf renders.
+
+Cold = parse the template with CompiledTemplate and render (what every call
+paid before templates were compiled once per container). Warm = render onto
+an already compiled template.
+
+Usage (from backend/):
+    python benchmarks/bench_compiled_template.py [--template path.pdf] [--runs 50]
+"""
+import os
+import io
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from services.pdf_generator import CompiledTemplate, generate_pdf
+
+SAMPLE_APPLICATION = {
+    'firstName': 'Aisyah',
+    'lastName': 'Binti Ahmad',
+    'email': 'aisyah@example.com',
+    'phone': '123456789',
+    'nric': '900101-14-5678',
+    'partnershipTier': 'gold',
+    'totalPayable': 5000,
+    'addressLine1': '12 Jalan Ampang',
+    'city': 'Kuala Lumpur',
+    'state': 'wilayah_persekutuan',
+    'postcode': '50450',
+    'companyName': 'Example Sdn Bhd',
+    'position': 'Director',
+}
+
+
+def build_template(pages=3, lines_per_page=60):
+    """A text-heavy template so parsing cost is visible."""
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    can = canvas.Canvas(buffer, pagesize=(595.27, 841.89))
+    for page in range(pages):
+        can.setFont("Helvetica", 8)
+        for line in range(lines_per_page):
+            can.drawString(40, 800 - line * 12, f"Template page {page + 1} clause {line + 1}: " + "lorem ipsum " * 8)
+        can.showPage()
+    can.save()
+    return buffer.getvalue()
+
+
+def time_runs(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--template', help='PDF template to use (default: generated fixture)')
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.template:
+        with open(args.template, 'rb') as f:
+            template_bytes = f.read()
+    else:
+        template_bytes = build_template()
+
+    def render(template):
+        return generate_pdf(
+            template_bytes,
+            SAMPLE_APPLICATION,
+            config.PLACEHOLDER_POSITIONS,
+            config.SIGNATURE_POSITION,
+            config.SIGNATURE_SIZE,
+            template=template
+        )
+
+    compiled = CompiledTemplate(template_bytes)
+    render(compiled)  # import reportlab/pdfrw outside the measurement
+
+    cold = time_runs(lambda: render(CompiledTemplate(template_bytes)), args.runs)
+    warm = time_runs(lambda: render(compiled), args.runs)
+
+    print(f"template: {len(template_bytes)} bytes, {compiled.page_count} page(s), runs: {args.runs}")
+    for label, samples in (('cold (parse + render)', cold), ('warm (render only)', warm)):
+        print(f"{label:24s} median {statistics.median(samples):8.2f} ms   "
+              f"p95 {sorted(samples)[int(len(samples) * 0.95) - 1]:8.2f} ms")
+    print(f"speedup: {statistics.median(cold) / statistics.median(warm):.2f}x")
+
+
+if __name__ == '__main__':
+    main()
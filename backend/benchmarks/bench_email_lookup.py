@@ -0,0 +1,146 @@
+"""
+Email lookup benchmark: LOWER(email_address) vs the indexed email_normalized.
+
+Seeds a scratch table shaped like contacts (default 1,000,000 rows, with mixed
+case and stray whitespace in email_address), then:
+
+- EXPLAINs both lookups and fails (exit 1) unless the email_normalized query
+  uses idx_email_normalized and the LOWER() query is still a full scan, so the
+  plan regression is caught wherever this is run
+- times --lookups random lookups with each query
+
+The scratch table is dropped afterwards unless --keep is given; with --keep a
+later run reuses it instead of seeding again. Needs a MySQL/MariaDB server.
+
+Usage (from backend/, with the DB_* environment variables set):
+    python benchmarks/bench_email_lookup.py [--rows 1000000] [--lookups 200] [--keep]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from connection_manager import open_connection  # noqa: E402
+
+TABLE = 'bench_email_lookup_contacts'
+SEED_BATCH = 10000
+
+LOWER_QUERY = f"SELECT contact_id FROM {TABLE} WHERE LOWER(email_address) = %s LIMIT 1"
+NORMALIZED_QUERY = f"SELECT contact_id FROM {TABLE} WHERE email_normalized = %s LIMIT 1"
+
+
+def _email(i: int) -> str:
+    return f'Partner.{i}@Example{i % 97}.com'
+
+
+def _stored(i: int) -> str:
+    # How browsers and old imports left email_address: mixed case, sometimes padded
+    email = _email(i)
+    return f' {email} ' if i % 10 == 0 else email
+
+
+def seed(connection, rows: int) -> float:
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {TABLE} (
+                contact_id INT NOT NULL AUTO_INCREMENT,
+                email_address VARCHAR(255) NOT NULL,
+                email_normalized VARCHAR(255) NULL,
+                PRIMARY KEY (contact_id),
+                KEY idx_email_normalized (email_normalized)
+            )
+        """)
+        cursor.execute(f"SELECT COUNT(*) AS seeded FROM {TABLE}")
+        seeded = cursor.fetchone()['seeded']
+        for low in range(seeded, rows, SEED_BATCH):
+            batch = range(low, min(low + SEED_BATCH, rows))
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (email_address, email_normalized) VALUES (%s, %s)",
+                [(_stored(i), _email(i).lower()) for i in batch]
+            )
+            connection.commit()
+        cursor.execute(f"ANALYZE TABLE {TABLE}")
+        cursor.fetchall()
+    connection.commit()
+    return time.perf_counter() - started
+
+
+def explain(connection, query: str, email: str) -> dict:
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + query, (email,))
+        plan = cursor.fetchone()
+    return {'type': plan.get('type'), 'key': plan.get('key'), 'rows': plan.get('rows')}
+
+
+def time_lookups(connection, query: str, emails) -> dict:
+    samples = []
+    with connection.cursor() as cursor:
+        for email in emails:
+            started = time.perf_counter()
+            cursor.execute(query, (email,))
+            found = cursor.fetchone()
+            samples.append((time.perf_counter() - started) * 1000)
+            if found is None:
+                raise SystemExit(f'lookup missed {email!r}')
+    connection.commit()
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[int(len(samples) * 0.95) - 1], 3),
+        'max_ms': round(samples[-1], 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=200, help='Lookups timed per query')
+    parser.add_argument('--keep', action='store_true', help='Keep the seeded table for later runs')
+    args = parser.parse_args(argv)
+
+    connection = open_connection()
+    try:
+        seed_s = seed(connection, args.rows)
+
+        probe = _email(args.rows // 2).lower()
+        plans = {
+            'lower': explain(connection, LOWER_QUERY, probe),
+            'normalized': explain(connection, NORMALIZED_QUERY, probe),
+        }
+        failures = []
+        if plans['normalized']['key'] != 'idx_email_normalized' or plans['normalized']['type'] != 'ref':
+            failures.append('email_normalized lookup does not use idx_email_normalized')
+        if plans['lower']['type'] != 'ALL':
+            failures.append('LOWER(email_address) lookup is no longer a full scan; benchmark baseline changed')
+
+        emails = [_email(random.randrange(args.rows)).lower() for _ in range(args.lookups)]
+        results = {
+            'rows': args.rows,
+            'seed_s': round(seed_s, 1),
+            'explain': plans,
+            # The full scan is slow enough that a tenth of the lookups gives a stable median
+            'lower': time_lookups(connection, LOWER_QUERY, emails[:max(1, args.lookups // 10)]),
+            'normalized': time_lookups(connection, NORMALIZED_QUERY, emails),
+        }
+    finally:
+        if not args.keep:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            connection.commit()
+        connection.close()
+
+    print(json.dumps(results, indent=2))
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Accuracy/throughput benchmark for the receipt amount parser.
+
+Runs textract_service.parse_amount_from_lines over the labelled Textract
+block dumps in benchmarks/receipt_corpus/ and reports the hit rate (parsed
+amount equals the label; a label of null expects no amount), the currency hit
+rate and parser throughput in lines per second.
+
+Each corpus file is a detect_document_text response plus a "label" object:
+    {"label": {"amount": 1250.0, "currency": "MYR"}, "Blocks": [...]}
+
+Usage (from backend/):
+    python benchmarks/bench_receipt_parser.py [--runs 200] [--verbose]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.textract_service import parse_amount_from_lines
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'receipt_corpus')
+
+
+def load_corpus(corpus_dir=CORPUS_DIR):
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, '*.json'))):
+        with open(path) as f:
+            doc = json.load(f)
+        lines = [
+            {'Text': block['Text'], 'Confidence': block.get('Confidence'), 'Page': block.get('Page', 1)}
+            for block in doc.get('Blocks', [])
+            if block.get('BlockType') == 'LINE'
+        ]
+        corpus.append((os.path.splitext(os.path.basename(path))[0], lines, doc['label']))
+    return corpus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Receipt parser accuracy/throughput benchmark")
+    parser.add_argument('--runs', type=int, default=200, help='Passes over the corpus for the throughput figure')
+    parser.add_argument('--corpus', default=CORPUS_DIR, help='Directory of labelled Textract JSON dumps')
+    parser.add_argument('--verbose', action='store_true', help='Print every receipt result')
+    args = parser.parse_args(argv)
+
+    # Keep parser logging out of the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"no corpus files in {args.corpus}")
+        return 1
+
+    hits = currency_hits = currency_labels = 0
+    for name, lines, label in corpus:
+        result = parse_amount_from_lines(lines)
+        amount = result['amount'] if result else None
+        currency = result.get('currency') if result else None
+
+        expected = label.get('amount')
+        hit = (amount is None) if expected is None else (amount is not None and abs(amount - expected) < 0.005)
+        hits += hit
+        if label.get('currency'):
+            currency_labels += 1
+            currency_hits += currency == label['currency']
+
+        if args.verbose or not hit:
+            mark = '✓' if hit else '✗'
+            print(f"{mark} {name:28s} expected {expected!s:>10} {label.get('currency') or '':3s}  "
+                  f"got {amount!s:>10} {currency or '':3s}")
+
+    total_lines = sum(len(lines) for _, lines, _ in corpus)
+    started = time.perf_counter()
+    for _ in range(args.runs):
+        for _, lines, _ in corpus:
+            parse_amount_from_lines(lines)
+    elapsed = time.perf_counter() - started
+
+    print(f"\nreceipts:       {len(corpus)}")
+    print(f"amount hit rate: {hits}/{len(corpus)} ({hits / len(corpus) * 100:.1f}%)")
+    if currency_labels:
+        print(f"currency hits:   {currency_hits}/{currency_labels} ({currency_hits / currency_labels * 100:.1f}%)")
+    print(f"throughput:      {total_lines * args.runs / elapsed:,.0f} lines/s "
+          f"({elapsed / (args.runs * len(corpus)) * 1e6:.1f} us/receipt)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
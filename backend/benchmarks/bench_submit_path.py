@@ -0,0 +1,169 @@
+"""
+/applications write benchmark: per-statement path vs the submit_partner_application procedure.
+
+Runs the database part of a submission (lambda_function.write_application_rows
+and lambda_function.call_submit_procedure) --runs times per path against a
+real MySQL/MariaDB server, e.g. a local container loaded with the schema and
+all database_migration_*.sql files. Each sample is its own transaction and
+reports:
+
+- round trips: statements sent on the cursor plus the final COMMIT/ROLLBACK
+- latency: median / p95 from the first statement to the end of the transaction
+
+Every --repeat-every'th submission uses bench.existing@example.com, whose
+contact is committed by one seed submission at the start of each run, so both
+the new and the existing contact branches are measured. Other transactions are
+rolled back unless --commit is given, so the benchmark can be re-run on the
+same database.
+Add latency between client and server (e.g. tc netem on the container) to see
+the effect of a Lambda-to-RDS network hop. Run benchmarks/check_submit_parity.py
+first: timings only mean something if both paths write the same rows.
+
+Usage (from backend/, with the DB_* environment variables set):
+    python benchmarks/bench_submit_path.py [--runs 200] [--repeat-every 4] [--commit]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import lambda_function  # noqa: E402
+from connection_manager import open_connection  # noqa: E402
+
+
+class CountingCursor:
+    """Cursor proxy counting the statements sent to the server."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.statements = 0
+
+    def execute(self, query, args=None):
+        self.statements += 1
+        return self._cursor.execute(query, args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+EXISTING_EMAIL = 'bench.existing@example.com'
+
+
+def _submission(run_id: str, n: int, repeat_every: int):
+    existing = repeat_every and n % repeat_every == repeat_every - 1
+    email = EXISTING_EMAIL if existing else f'bench.{run_id}.{n}@example.com'
+    contact_data = {
+        'first_name': 'Bench',
+        'last_name': f'Partner{n}',
+        'email_address': email,
+        'gender': 'prefer_not_to_say',
+        'phone_number': '+6590000000',
+        'country_code': '+65',
+        'identification_card': '',
+        'address_line_1': '1 Bench Road',
+        'address_line_2': '',
+        'city': 'Singapore',
+        'state': 'Singapore',
+        'postcode': '000001'
+    }
+    partner_data = {
+        'position': 'Director',
+        'company_name': 'Bench Pte Ltd',
+        'industry': 'Retail',
+        'partnership_tier': 'gold',
+        'terms_accepted': True,
+        'total_payable': 1000,
+        # Not in receipt_extractions, so both paths take the pending_extraction branch
+        'receipt_storage_key': f'receipts/bench-{run_id}-{n}.jpg',
+        'receipt_file_name': 'receipt.jpg',
+        'sales_rep': 'bench',
+        'utm_source': 'bench',
+        'utm_medium': 'bench',
+        'referrer': ''
+    }
+    pxier_contact_data = {key: contact_data[key] for key in (
+        'first_name', 'last_name', 'email_address', 'phone_number',
+        'address_line_1', 'address_line_2', 'city', 'state', 'postcode'
+    )}
+    return contact_data, partner_data, pxier_contact_data, {'customer': pxier_contact_data}
+
+
+def ensure_existing_contact(connection) -> None:
+    contact_data, partner_data, pxier_contact_data, pxier_payload = _submission('seed', 0, 1)
+    with connection.cursor() as cursor:
+        lambda_function.write_application_rows(
+            cursor, contact_data, partner_data, partner_data['receipt_storage_key'],
+            pxier_contact_data, pxier_payload
+        )
+    connection.commit()
+
+
+def run_path(connection, path: str, runs: int, repeat_every: int, commit: bool) -> dict:
+    run_id = uuid.uuid4().hex[:8]
+    latencies = []
+    round_trips = []
+    for n in range(runs):
+        contact_data, partner_data, pxier_contact_data, pxier_payload = _submission(run_id, n, repeat_every)
+        cursor = CountingCursor(connection.cursor())
+        started = time.perf_counter()
+        if path == 'statements':
+            lambda_function.write_application_rows(
+                cursor, contact_data, partner_data, partner_data['receipt_storage_key'],
+                pxier_contact_data, pxier_payload
+            )
+        else:
+            lambda_function.call_submit_procedure(
+                cursor, contact_data, partner_data, pxier_contact_data, pxier_payload
+            )
+        if commit:
+            connection.commit()
+        else:
+            connection.rollback()
+        latencies.append((time.perf_counter() - started) * 1000)
+        round_trips.append(cursor.statements + 1)
+        cursor.close()
+
+    latencies.sort()
+    return {
+        'round_trips_median': statistics.median(round_trips),
+        'round_trips_max': max(round_trips),
+        'median_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=200, help='Submissions per path')
+    parser.add_argument('--repeat-every', type=int, default=4,
+                        help='Use the existing contact every N submissions (0 = always a new contact)')
+    parser.add_argument('--commit', action='store_true', help='Commit instead of rolling back each submission')
+    args = parser.parse_args(argv)
+
+    connection = open_connection()
+    try:
+        ensure_existing_contact(connection)
+        # Warm up the connection and the procedure cache before timing
+        run_path(connection, 'procedure', 5, args.repeat_every, commit=False)
+        run_path(connection, 'statements', 5, args.repeat_every, commit=False)
+
+        results = {
+            'runs': args.runs,
+            'statements': run_path(connection, 'statements', args.runs, args.repeat_every, args.commit),
+            'procedure': run_path(connection, 'procedure', args.runs, args.repeat_every, args.commit),
+        }
+    finally:
+        connection.close()
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
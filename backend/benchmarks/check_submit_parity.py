@@ -0,0 +1,236 @@
+"""
+Parity check: the submit_partner_application procedure vs write_application_rows.
+
+For each case below, a submission is written once through the per-statement
+path (lambda_function.write_application_rows + idempotency.complete_request,
+as insert_lead_and_partner_application does) and once through
+lambda_function.call_submit_procedure, each in its own transaction that is
+rolled back afterwards. The contacts, partner_applications, payments,
+pxier_outbox, contact_audits and idempotency_keys rows each path wrote are
+compared with generated ids and timestamps left out.
+
+Cases:
+- new_contact: first submission for an email, receipt without an upload-time amount
+- existing_contact: the email already has a contact (no outbox row, 'proposed_update' audit)
+- precomputed_amount: receipt_extractions already holds the extracted amount
+- pending_extraction: receipt not in receipt_extractions yet
+- no_receipt: no receipt key at all
+- lost_claim: the idempotency key is held by another claim token; both paths must raise ClaimLostError
+
+Prints a JSON report and exits 1 if any case differs. Needs a MySQL/MariaDB
+server with the schema and all database_migration_*.sql files loaded; nothing
+is committed.
+
+Usage (from backend/, with the DB_* environment variables set):
+    python benchmarks/check_submit_parity.py
+"""
+import os
+import sys
+import json
+import uuid
+import argparse
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import lambda_function  # noqa: E402
+import idempotency  # noqa: E402
+from connection_manager import open_connection  # noqa: E402
+
+PRECOMPUTED_AMOUNT = Decimal('123.45')
+
+CASES = ('new_contact', 'existing_contact', 'precomputed_amount', 'pending_extraction', 'no_receipt', 'lost_claim')
+
+
+def _body(run_id: str, case: str):
+    return {
+        'firstName': 'Parity',
+        'lastName': case.replace('_', ' ').title(),
+        'email': f' Parity.{run_id}.{case}@Example.com ',
+        'phone': '+60120000000',
+        'countryCode': '+60',
+        'nric': '900101-14-5678',
+        'addressLine1': '1 Parity Road',
+        'city': 'Kuala Lumpur',
+        'state': 'Kuala Lumpur',
+        'postcode': '50000',
+        'position': 'Director',
+        'companyName': 'Parity Sdn Bhd',
+        'industry': 'Retail',
+        'partnershipTier': 'gold',
+        'termsAccepted': True,
+        'totalPayable': 1000,
+        'receiptStorageKey': '' if case == 'no_receipt' else f'receipts/parity-{run_id}-{case}.pdf',
+        'receiptFileName': '' if case == 'no_receipt' else 'receipt.pdf',
+        'utmSource': 'parity',
+        'utmMedium': 'check',
+    }
+
+
+def _rows(body):
+    contact_data = lambda_function.build_contact_data(body)
+    partner_data = lambda_function.build_partner_data(body)
+    pxier_contact_data = lambda_function.build_pxier_contact_data(contact_data)
+    try:
+        pxier_payload = lambda_function.build_pxier_payload(pxier_contact_data)
+    except Exception:
+        pxier_payload = None
+    return contact_data, partner_data, pxier_contact_data, pxier_payload
+
+
+def _json(value):
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
+
+
+def _snapshot(cursor, written, key):
+    """Rows written for one submission, with its own ids replaced by placeholders."""
+    ids = {
+        written['contact_id']: '<contact_id>',
+        written['application_id']: '<application_id>',
+        written['payment_id']: '<payment_id>',
+    }
+
+    def normalize(row):
+        if row is None:
+            return None
+        out = {}
+        for column, value in row.items():
+            if column in ('contact_id', 'partner_application_id', 'booking_id', 'application_id', 'payment_id'):
+                value = ids.get(value, value)
+            elif column in ('contact_data', 'payload', 'result'):
+                value = _json(value)
+                if column == 'result' and value:
+                    value = normalize(value)
+            elif isinstance(value, (Decimal, float)):
+                value = str(Decimal(str(value)).quantize(Decimal('0.01')))
+            out[column] = value
+        return out
+
+    def select(query, args, many=False):
+        cursor.execute(query, args)
+        if many:
+            return [normalize(row) for row in cursor.fetchall()]
+        return normalize(cursor.fetchone())
+
+    return {
+        'written': normalize({k: v for k, v in written.items() if k != 'pxier_outbox_id'})
+        | {'has_outbox_row': written['pxier_outbox_id'] is not None},
+        'contact': select("""
+            SELECT first_name, last_name, email_address, gender, phone_number, country_code,
+                   identification_card, address_line_1, address_line_2, city, state, postcode,
+                   lead_source, status
+            FROM contacts WHERE contact_id = %s
+        """, (written['contact_id'],)),
+        'application': select("""
+            SELECT contact_id, position, company_name, industry, partnership_tier, terms_accepted,
+                   total_payable, receipt_storage_key, receipt_file_name, sales_rep, utm_source,
+                   utm_medium, referrer, status
+            FROM partner_applications WHERE id = %s
+        """, (written['application_id'],)),
+        'payment': select("""
+            SELECT contact_id, partner_application_id, amount, payment_method, payment_type,
+                   description, official_receipt, attachment, status
+            FROM payments WHERE id = %s
+        """, (written['payment_id'],)),
+        'pxier_outbox': select("""
+            SELECT contact_id, partner_application_id, contact_data, status, attempts
+            FROM pxier_outbox WHERE partner_application_id = %s
+        """, (written['application_id'],), many=True),
+        'audits': select("""
+            SELECT contact_id, email_address, phone_number, booking_id, action, source, payload
+            FROM contact_audits WHERE booking_id = %s
+        """, (written['application_id'],), many=True),
+        'idempotency_key': select(
+            "SELECT status, result FROM idempotency_keys WHERE idempotency_key = %s", (key,)
+        ),
+    }
+
+
+def _write(connection, path: str, run_id: str, case: str):
+    """Write one case through path in a transaction that is rolled back; returns its snapshot."""
+    body = _body(run_id, case)
+    contact_data, partner_data, pxier_contact_data, pxier_payload = _rows(body)
+    key = f'parity:{run_id}:{case}:{path}'
+    token = uuid.uuid4().hex
+    try:
+        with connection.cursor() as cursor:
+            if case == 'existing_contact':
+                # Same email committed earlier by another submission
+                lambda_function.write_application_rows(
+                    cursor, contact_data, partner_data, '', pxier_contact_data, pxier_payload
+                )
+            if case == 'precomputed_amount':
+                cursor.execute("""
+                    INSERT INTO receipt_extractions (storage_key, bucket, status, amount, created_at, updated_at)
+                    VALUES (%s, 'parity', 'extracted', %s, NOW(), NOW())
+                """, (partner_data['receipt_storage_key'], PRECOMPUTED_AMOUNT))
+            idempotency._try_claim(cursor, key, idempotency.request_hash(body), token)
+            if case == 'lost_claim':
+                token = uuid.uuid4().hex
+
+            try:
+                if path == 'statements':
+                    written = lambda_function.write_application_rows(
+                        cursor, contact_data, partner_data, partner_data['receipt_storage_key'],
+                        pxier_contact_data, pxier_payload
+                    )
+                    idempotency.complete_request(cursor, key, token, {
+                        name: written[name] for name in
+                        ('contact_id', 'application_id', 'payment_id', 'payment_amount', 'payment_status')
+                    })
+                else:
+                    written = lambda_function.call_submit_procedure(
+                        cursor, contact_data, partner_data, pxier_contact_data, pxier_payload, key, token
+                    )
+            except idempotency.ClaimLostError:
+                return {'claim_lost': True}
+
+            snapshot = _snapshot(cursor, written, key)
+            return snapshot | {'claim_lost': False}
+    finally:
+        connection.rollback()
+
+
+def _differences(a, b, path=''):
+    if isinstance(a, dict) and isinstance(b, dict):
+        diffs = []
+        for name in sorted(set(a) | set(b)):
+            diffs += _differences(a.get(name), b.get(name), f'{path}.{name}' if path else name)
+        return diffs
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        diffs = []
+        for index, (x, y) in enumerate(zip(a, b)):
+            diffs += _differences(x, y, f'{path}[{index}]')
+        return diffs
+    return [] if a == b else [{'field': path, 'statements': a, 'procedure': b}]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--case', choices=CASES, action='append', help='Only run these cases')
+    args = parser.parse_args(argv)
+
+    run_id = uuid.uuid4().hex[:8]
+    connection = open_connection()
+    report = []
+    try:
+        for case in args.case or CASES:
+            statements = _write(connection, 'statements', run_id, case)
+            procedure = _write(connection, 'procedure', run_id, case)
+            differences = _differences(statements, procedure)
+            if case == 'lost_claim' and not (statements['claim_lost'] and procedure['claim_lost']):
+                differences.append({
+                    'field': 'claim_lost', 'expected': True,
+                    'statements': statements['claim_lost'], 'procedure': procedure['claim_lost']
+                })
+            report.append({'case': case, 'match': not differences, 'differences': differences})
+    finally:
+        connection.close()
+
+    print(json.dumps(report, indent=2, default=str))
+    return 0 if all(result['match'] for result in report) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Benchmark suite for the PDF pipeline.
+
+Measures each stage of confirmation PDF generation across fixture templates
+and signatures of different sizes:
+
+- generate_pdf_filename
+- _build_signature_image_reader (reportlab fallback path)
+- create_overlay
+- generate_pdf (warm, compiled template)
+- generate_pdf (cold, template parsed per call)
+
+For every stage/fixture it reports median and p95 wall time, tracemalloc peak
+memory and output size. Fixtures are generated deterministically at start-up.
+
+Usage (from backend/):
+    python benchmarks/pdf_pipeline.py                          # print a report
+    python benchmarks/pdf_pipeline.py --save baseline.json     # record a baseline
+    python benchmarks/pdf_pipeline.py --baseline baseline.json --threshold 0.25
+        # exit 1 if any stage's median time or peak memory regressed by more than 25%
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import base64
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from services import pdf_generator
+from services.pdf_generator import CompiledTemplate
+
+SAMPLE_APPLICATION = {
+    'firstName': 'Aisyah',
+    'lastName': 'Binti Ahmad',
+    'email': 'aisyah@example.com',
+    'phone': '123456789',
+    'nric': '900101-14-5678',
+    'partnershipTier': 'gold',
+    'totalPayable': 5000,
+    'addressLine1': '12 Jalan Ampang, Menara Example, Level 23A, Unit 7',
+    'addressLine2': 'Off Jalan Sultan Ismail',
+    'city': 'Kuala Lumpur',
+    'state': 'wilayah_persekutuan',
+    'postcode': '50450',
+    'companyName': 'Example Sdn Bhd',
+    'position': 'Director',
+}
+
+# name -> (pages, text lines per page, embedded background image side in px)
+TEMPLATE_FIXTURES = {
+    'template_small': (1, 20, 0),
+    'template_medium': (3, 60, 0),
+    'template_large': (6, 80, 800),
+}
+
+# name -> canvas size in px (what the signature pad exports at different DPRs)
+SIGNATURE_FIXTURES = {
+    'signature_small': (300, 100),
+    'signature_medium': (600, 200),
+    'signature_large': (1800, 600),
+}
+
+
+def build_template(pages, lines_per_page, image_side):
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
+    from PIL import Image
+
+    rng = random.Random(pages * 1000 + lines_per_page)
+    buffer = io.BytesIO()
+    can = canvas.Canvas(buffer, pagesize=(595.27, 841.89))
+    background = None
+    if image_side:
+        noise = bytes(rng.getrandbits(8) for _ in range(image_side * image_side))
+        background = ImageReader(Image.frombytes('L', (image_side, image_side), noise))
+
+    for page in range(pages):
+        if background is not None:
+            can.drawImage(background, 0, 0, width=595.27, height=841.89)
+        can.setFont("Helvetica", 8)
+        for line in range(lines_per_page):
+            can.drawString(40, 800 - line * 9.5, f"Clause {page + 1}.{line + 1} " + "terms and conditions " * 6)
+        can.showPage()
+    can.save()
+    return buffer.getvalue()
+
+
+def build_signature(width, height):
+    """A transparent PNG with a pen stroke, as exported by the signature canvas."""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(width * height)
+    im = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(im)
+    points = [(int(width * i / 40), int(height / 2 + rng.uniform(-0.35, 0.35) * height)) for i in range(41)]
+    draw.line(points, fill=(20, 20, 60, 255), width=max(2, height // 40))
+    buffer = io.BytesIO()
+    im.save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def _output_size(result):
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    if isinstance(result, str):
+        return len(result.encode('utf-8'))
+    return None
+
+
+def measure(fn, runs):
+    """Median/p95 wall time over `runs` calls, then one traced call for peak memory and output size."""
+    fn()  # warm imports and caches outside the measurement
+
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[max(0, int(len(samples) * 0.95) - 1)], 3),
+        'peak_kb': round(peak / 1024, 1),
+        'output_bytes': _output_size(result),
+    }
+
+
+def build_cases():
+    templates = {name: build_template(*spec) for name, spec in TEMPLATE_FIXTURES.items()}
+    signatures = {name: build_signature(*size) for name, size in SIGNATURE_FIXTURES.items()}
+    positions = config.PLACEHOLDER_POSITIONS
+    sig_pos, sig_size = config.SIGNATURE_POSITION, config.SIGNATURE_SIZE
+
+    cases = {
+        'generate_pdf_filename': lambda: pdf_generator.generate_pdf_filename('Aisyah Binti Ahmad', '+60123456789'),
+    }
+
+    for sig_name, signature in signatures.items():
+        data = dict(SAMPLE_APPLICATION, signatureData=signature)
+        cases[f'build_signature_image_reader/{sig_name}'] = (
+            lambda signature=signature: pdf_generator._build_signature_image_reader(signature)
+        )
+        cases[f'create_overlay/{sig_name}'] = (
+            lambda data=data: pdf_generator.create_overlay(data, positions, sig_pos, sig_size, pagesize=(595.27, 841.89))
+        )
+
+    data = dict(SAMPLE_APPLICATION, signatureData=signatures['signature_medium'])
+    for tpl_name, template_bytes in templates.items():
+        compiled = CompiledTemplate(template_bytes)
+        cases[f'generate_pdf_warm/{tpl_name}'] = (
+            lambda template_bytes=template_bytes, compiled=compiled: pdf_generator.generate_pdf(
+                template_bytes, data, positions, sig_pos, sig_size, template=compiled)
+        )
+        cases[f'generate_pdf_cold/{tpl_name}'] = (
+            lambda template_bytes=template_bytes: pdf_generator.generate_pdf(
+                template_bytes, data, positions, sig_pos, sig_size, template=CompiledTemplate(template_bytes))
+        )
+
+    return cases
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human-readable regressions beyond `threshold` (fractional)."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ('median_ms', 'peak_kb'):
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if change > threshold:
+                regressions.append(f"{name} {metric}: {before} -> {after} (+{change * 100:.1f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=30, help='Timed runs per case')
+    parser.add_argument('--filter', default='', help='Only run cases whose name contains this text')
+    parser.add_argument('--save', help='Write results as JSON (use as a later --baseline)')
+    parser.add_argument('--baseline', help='Compare against a saved results file')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed fractional regression in median time / peak memory (default 0.25)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'case':58s} {'median ms':>10s} {'p95 ms':>10s} {'peak KB':>10s} {'output B':>10s}")
+    for name, fn in build_cases().items():
+        if args.filter and args.filter not in name:
+            continue
+        result = measure(fn, args.runs)
+        results[name] = result
+        output = '' if result['output_bytes'] is None else result['output_bytes']
+        print(f"{name:58s} {result['median_ms']:10.3f} {result['p95_ms']:10.3f} {result['peak_kb']:10.1f} {output:>10}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"results saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nno regressions beyond {args.threshold * 100:.0f}%")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
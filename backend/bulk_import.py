@@ -0,0 +1,410 @@
+"""
+Bulk import of partner applications (event sign-up spreadsheets).
+
+Streams a CSV or JSONL file whose columns / keys are the /applications body
+fields (firstName, lastName, email, phone, countryCode, nric, partnershipTier,
+termsAccepted, ...). Each row is checked with the same validate_application()
+rules as POST /applications; invalid rows are appended to the --rejects file
+and the import carries on.
+
+Valid rows are written in chunks, one transaction per chunk:
+- contacts are resolved with one locking IN (...) query on email_normalized,
+  and the missing ones inserted with a single executemany; only contacts this
+  chunk inserted count as new (Pxier outbox, 'created' audit)
+- partner_applications, payments, pxier_outbox (new contacts) and
+  contact_audits rows are each written with one executemany
+
+The rows match what /applications writes, so receipts without an upload-time
+amount are left pending_extraction for the scheduled receipt worker run and
+new contacts are pushed to Pxier by the scheduled outbox drain. Confirmation
+emails are not sent.
+
+After every committed chunk the number of rows read is saved to the
+--checkpoint file; a re-run resumes after it. Every application records its
+<source>:<row number> in partner_applications.import_row_ref (unique), so rows
+committed just before an interruption are skipped rather than imported twice.
+Run database_migration_bulk_import.sql first.
+
+Usage (from backend/, with the DB_* environment variables set):
+    python bulk_import.py --input signups.csv [--chunk-size 500] [--rejects rejects.jsonl]
+    python bulk_import.py --input signups.jsonl --validate-only
+"""
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import config
+from connection_manager import open_connection
+from lambda_function import (
+    validate_application,
+    build_contact_data,
+    build_partner_data,
+    build_pxier_contact_data
+)
+from receipt_worker import PENDING_EXTRACTION
+from receipt_upload_handler import UPLOAD_EXTRACTED
+from pxier_outbox import OUTBOX_PENDING
+from services.pxier_service import build_pxier_payload
+
+logger = logging.getLogger(__name__)
+
+# CSV cells are strings; these fields are booleans / numbers in the JSON body
+BOOLEAN_FIELDS = ('termsAccepted', 'notBusinessOwner')
+NUMBER_FIELDS = ('totalPayable',)
+TRUE_VALUES = ('true', 'yes', 'y', '1')
+
+
+def _csv_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    # An empty cell means the field was not provided, as if it were absent from a JSON body
+    record = {key.strip(): value for key, value in row.items() if key and value not in (None, '')}
+    for field in BOOLEAN_FIELDS:
+        if field in record:
+            record[field] = record[field].strip().lower() in TRUE_VALUES
+    for field in NUMBER_FIELDS:
+        if field in record:
+            record[field] = float(record[field])
+    return record
+
+
+def read_rows(path: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Stream (row number, record, parse error) from a .csv or JSONL file; row numbers start at 1."""
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        if path.lower().endswith('.csv'):
+            for row_number, row in enumerate(csv.DictReader(f), 1):
+                try:
+                    yield row_number, _csv_record(row), None
+                except ValueError as e:
+                    yield row_number, None, f'Invalid number: {e}'
+        else:
+            row_number = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                row_number += 1
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield row_number, None, f'Invalid JSON: {e}'
+                    continue
+                if isinstance(record, dict):
+                    yield row_number, record, None
+                else:
+                    yield row_number, None, 'Row is not a JSON object'
+
+
+def load_checkpoint(path: str, source: str) -> int:
+    """Rows already imported from source according to the checkpoint file (0 without one)."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('source') != source:
+        raise SystemExit(f"Checkpoint {path} belongs to {checkpoint.get('source')!r}, not {source!r}")
+    return int(checkpoint.get('rows_done', 0))
+
+
+def save_checkpoint(path: str, source: str, rows_done: int, totals: Dict[str, int]) -> None:
+    # Write and rename, so an interruption never leaves a truncated checkpoint
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'source': source, 'rows_done': rows_done, 'totals': totals}, f)
+    os.replace(tmp_path, path)
+
+
+def _in_clause(values) -> str:
+    return ', '.join(['%s'] * len(values))
+
+
+def _select_map(cursor, query: str, values: List[Any], key: str, value: str, extra_args=()) -> Dict[Any, Any]:
+    """Run query with an IN (...) of values, then extra_args; returns {row[key]: row[value]}."""
+    if not values:
+        return {}
+    cursor.execute(query.format(_in_clause(values)), list(values) + list(extra_args))
+    return {row[key]: row[value] for row in cursor.fetchall()}
+
+
+def _audit_payload(pxier_contact_data: Dict[str, Any]) -> Optional[str]:
+    if not config.PXIER_ACCESS_TOKEN:
+        return None
+    try:
+        return json.dumps(build_pxier_payload(pxier_contact_data))
+    except Exception as e:
+        logger.warning("⚠ Could not build Pxier payload for audit", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e)
+        })
+        return None
+
+
+def write_chunk(connection, source: str, rows: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, int]:
+    """Write one chunk of validated (row number, record) pairs in a single transaction."""
+    refs = {row_number: f'{source}:{row_number}' for row_number, _ in rows}
+
+    with connection.cursor() as cursor:
+        # Rows committed by an interrupted run after its last checkpoint
+        already_imported = _select_map(
+            cursor,
+            "SELECT import_row_ref FROM partner_applications WHERE import_row_ref IN ({})",
+            list(refs.values()), 'import_row_ref', 'import_row_ref'
+        )
+        pending = [(n, record) for n, record in rows if refs[n] not in already_imported]
+        if not pending:
+            connection.commit()
+            return {'imported': 0, 'already_imported': len(rows), 'new_contacts': 0}
+
+        prepared = []
+        for row_number, record in pending:
+            contact_data = build_contact_data(record)
+            prepared.append({
+                'ref': refs[row_number],
+                'contact': contact_data,
+                'partner': build_partner_data(record),
+                'pxier_contact': build_pxier_contact_data(contact_data)
+            })
+
+        # Contacts: one IN (...) lookup, one executemany for the missing ones, one lookup for their ids.
+        # FOR UPDATE also gap-locks the missing emails on the unique index, so /applications cannot
+        # create one of them before this chunk commits
+        emails = list(dict.fromkeys(row['contact']['email_address'] for row in prepared))
+        contact_ids = _select_map(
+            cursor,
+            "SELECT contact_id, email_normalized FROM contacts WHERE email_normalized IN ({}) FOR UPDATE",
+            emails, 'email_normalized', 'contact_id'
+        )
+        new_emails = [email for email in emails if email not in contact_ids]
+        if new_emails:
+            first_row = {}
+            for row in prepared:
+                first_row.setdefault(row['contact']['email_address'], row)
+            # 1 affected row per inserted contact; a duplicate is left as is and reports 0
+            inserted = cursor.executemany("""
+                INSERT INTO contacts (
+                    first_name, last_name, email_address, gender, phone_number,
+                    country_code, identification_card,
+                    address_line_1, address_line_2, city, state, postcode,
+                    lead_source, status, created_at, updated_at
+                ) VALUES (
+                    %(first_name)s, %(last_name)s, %(email_address)s, %(gender)s, %(phone_number)s,
+                    %(country_code)s, %(identification_card)s,
+                    %(address_line_1)s, %(address_line_2)s, %(city)s, %(state)s,
+                    %(postcode)s, 'ccp', 'converted', NOW(), NOW()
+                )
+                ON DUPLICATE KEY UPDATE contact_id = contact_id
+            """, [first_row[email]['contact'] for email in new_emails])
+            if inserted != len(new_emails):
+                # Without gap locks (READ COMMITTED) another transaction can commit one of these
+                # contacts after the lookup, and it must not be treated as new. The redone chunk
+                # finds it in the lookup.
+                logger.warning("Contacts created concurrently - redoing chunk", extra={
+                    'source': source,
+                    'new_contacts': len(new_emails),
+                    'inserted': inserted
+                })
+                connection.rollback()
+                return write_chunk(connection, source, rows)
+            contact_ids.update(_select_map(
+                cursor,
+                "SELECT contact_id, email_normalized FROM contacts WHERE email_normalized IN ({})",
+                new_emails, 'email_normalized', 'contact_id'
+            ))
+
+        # Like /applications, only the first application for a new contact queues Pxier and audits 'created'
+        created = set(new_emails)
+        for row in prepared:
+            email = row['contact']['email_address']
+            row['contact_id'] = contact_ids[email]
+            row['is_new_contact'] = email in created
+            created.discard(email)
+
+        cursor.executemany("""
+            INSERT INTO partner_applications (
+                contact_id, position, company_name, industry, partnership_tier,
+                terms_accepted, total_payable,
+                receipt_storage_key, receipt_file_name,
+                sales_rep, utm_source, utm_medium, referrer, import_row_ref,
+                submitted_at, status, created_at, updated_at
+            ) VALUES (
+                %(contact_id)s, %(position)s, %(company_name)s, %(industry)s,
+                %(partnership_tier)s, %(terms_accepted)s, %(total_payable)s,
+                %(receipt_storage_key)s, %(receipt_file_name)s,
+                %(sales_rep)s, %(utm_source)s, %(utm_medium)s, %(referrer)s, %(import_row_ref)s,
+                NOW(), 'pending', NOW(), NOW()
+            )
+        """, [dict(row['partner'], contact_id=row['contact_id'], import_row_ref=row['ref']) for row in prepared])
+        application_ids = _select_map(
+            cursor,
+            "SELECT id, import_row_ref FROM partner_applications WHERE import_row_ref IN ({})",
+            [row['ref'] for row in prepared], 'import_row_ref', 'id'
+        )
+
+        receipt_keys = list(dict.fromkeys(
+            row['partner']['receipt_storage_key'] for row in prepared if row['partner']['receipt_storage_key']
+        ))
+        amounts = _select_map(
+            cursor,
+            "SELECT storage_key, amount FROM receipt_extractions WHERE storage_key IN ({}) AND status = %s",
+            receipt_keys, 'storage_key', 'amount', extra_args=(UPLOAD_EXTRACTED,)
+        )
+
+        payments = []
+        for row in prepared:
+            receipt_key = row['partner']['receipt_storage_key']
+            row['application_id'] = application_ids[row['ref']]
+            amount = amounts.get(receipt_key) if receipt_key else None
+            payments.append({
+                'contact_id': row['contact_id'],
+                'partner_application_id': row['application_id'],
+                'amount': float(amount) if amount is not None else 0.0,
+                'payment_method': 'bank_transfer',
+                'payment_type': 'membership_fee',
+                'description': f"membership_fee - {row['contact']['last_name']} {row['contact']['first_name']}",
+                'official_receipt': receipt_key,
+                'attachment': receipt_key,
+                'status': PENDING_EXTRACTION if receipt_key and amount is None else 'pending'
+            })
+        cursor.executemany("""
+            INSERT INTO payments (
+                contact_id, partner_application_id, amount,
+                payment_method, payment_type, description,
+                official_receipt, attachment, status,
+                transaction_datetime, created_at, updated_at
+            ) VALUES (
+                %(contact_id)s, %(partner_application_id)s, %(amount)s,
+                %(payment_method)s, %(payment_type)s, %(description)s,
+                %(official_receipt)s, %(attachment)s, %(status)s,
+                NOW(), NOW(), NOW()
+            )
+        """, payments)
+
+        outbox = [
+            (row['contact_id'], row['application_id'], json.dumps(row['pxier_contact']), OUTBOX_PENDING)
+            for row in prepared if row['is_new_contact']
+        ]
+        if outbox:
+            cursor.executemany("""
+                INSERT INTO pxier_outbox (
+                    contact_id, partner_application_id, contact_data,
+                    status, attempts, next_attempt_at, created_at, updated_at
+                ) VALUES (
+                    %s, %s, %s, %s, 0, NOW(), NOW(), NOW()
+                )
+            """, outbox)
+
+        cursor.executemany("""
+            INSERT INTO contact_audits (
+                contact_id, email_address, phone_number, booking_id,
+                action, source, payload, created_at
+            ) VALUES (
+                %s, %s, %s, %s, %s, %s, %s, NOW()
+            )
+        """, [(
+            row['contact_id'],
+            row['contact']['email_address'],
+            row['contact']['phone_number'],
+            row['application_id'],
+            'created' if row['is_new_contact'] else 'proposed_update',
+            'bulk_import',
+            _audit_payload(row['pxier_contact'])
+        ) for row in prepared])
+
+    connection.commit()
+    return {
+        'imported': len(prepared),
+        'already_imported': len(rows) - len(prepared),
+        'new_contacts': len(outbox)
+    }
+
+
+def run_import(connection, path: str, source: str, checkpoint_path: str, rejects_path: Optional[str],
+               chunk_size: int = 500, validate_only: bool = False) -> Dict[str, Any]:
+    started = time.perf_counter()
+    rows_done = 0 if validate_only else load_checkpoint(checkpoint_path, source)
+    totals = {'read': 0, 'invalid': 0, 'imported': 0, 'already_imported': 0, 'new_contacts': 0, 'chunks': 0}
+    resumed_from = rows_done
+
+    rejects = open(rejects_path, 'a', encoding='utf-8') if rejects_path else None
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+    last_row = rows_done
+
+    def flush():
+        if chunk and not validate_only:
+            written = write_chunk(connection, source, chunk)
+            for key, count in written.items():
+                totals[key] += count
+            totals['chunks'] += 1
+        chunk.clear()
+        if not validate_only:
+            save_checkpoint(checkpoint_path, source, last_row, totals)
+        logger.info("Import progress", extra={'source': source, 'rows_done': last_row, **totals})
+
+    try:
+        for row_number, record, error in read_rows(path):
+            if row_number <= rows_done:
+                continue
+            totals['read'] += 1
+            if error is None:
+                try:
+                    error = validate_application(record)
+                except (TypeError, AttributeError):
+                    # e.g. a JSON number where /applications expects a string
+                    error = 'Invalid field types'
+            if error:
+                totals['invalid'] += 1
+                if rejects:
+                    rejects.write(json.dumps({'row': row_number, 'error': error, 'record': record}) + '\n')
+            else:
+                chunk.append((row_number, record))
+            last_row = row_number
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk or last_row > rows_done:
+            flush()
+    finally:
+        if rejects:
+            rejects.close()
+
+    return {
+        'source': source,
+        'resumed_from_row': resumed_from,
+        'rows_done': last_row,
+        **totals,
+        'validate_only': validate_only,
+        'elapsed_s': round(time.perf_counter() - started, 1)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import partner applications from a CSV or JSONL file")
+    parser.add_argument('--input', required=True, help='Applications file (.csv, or JSON lines)')
+    parser.add_argument('--source', default=None,
+                        help='Name recorded in import_row_ref (default: the input file name)')
+    parser.add_argument('--checkpoint', default=None, help='Checkpoint file (default: <input>.checkpoint.json)')
+    parser.add_argument('--rejects', default=None, help='Append invalid rows as JSON lines to this file')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Rows written per transaction')
+    parser.add_argument('--validate-only', action='store_true', help='Only validate; no database access')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    source = args.source or os.path.basename(args.input)
+    checkpoint = args.checkpoint or args.input + '.checkpoint.json'
+
+    connection = None if args.validate_only else open_connection()
+    try:
+        summary = run_import(connection, args.input, source, checkpoint, args.rejects,
+                             args.chunk_size, args.validate_only)
+    finally:
+        if connection is not None:
+            connection.close()
+
+    print(json.dumps(summary))
+    return 1 if summary['invalid'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
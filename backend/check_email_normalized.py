@@ -0,0 +1,99 @@
+"""
+Check database_migration_email_normalized.sql and its backfill on a live database.
+
+Run after the migration and backfill_email_normalized.py, before deploying the
+code that looks contacts and leads up by email_normalized. For each table it
+checks that:
+
+- both email_normalized triggers exist
+- no row still needs a backfill (email_normalized NULL or out of step with
+  LOWER(TRIM(email_address)); this also covers rows the triggers wrote)
+- EXPLAIN of the email lookup uses the email_normalized index (key not NULL,
+  type ref). Once database_migration_contacts_email_unique.sql has replaced
+  the contacts index with uq_contacts_email_normalized, type const is expected
+  there instead
+
+Prints a JSON report and exits 1 if any check fails.
+
+Usage (from backend/, with the DB_* environment variables set):
+    python check_email_normalized.py
+"""
+import sys
+import json
+import argparse
+from typing import Any, Dict, List
+
+from connection_manager import open_connection
+from backfill_email_normalized import TABLES, NEEDS_BACKFILL
+
+# table -> {acceptable index: expected EXPLAIN type}
+EXPECTED_PLANS = {
+    'contacts': {'idx_contacts_email_normalized': 'ref', 'uq_contacts_email_normalized': 'const'},
+    'leads': {'idx_leads_email_normalized': 'ref'},
+}
+
+TRIGGERS = ('{table}_email_normalized_insert', '{table}_email_normalized_update')
+
+# Used when a table has no rows yet; a unique index needs an existing value to report const
+PROBE_EMAIL = 'email-normalized-check@example.com'
+
+
+def check_table(cursor, table: str) -> Dict[str, Any]:
+    key = TABLES[table]
+    failures: List[str] = []
+
+    cursor.execute("""
+        SELECT TRIGGER_NAME
+        FROM information_schema.TRIGGERS
+        WHERE TRIGGER_SCHEMA = DATABASE() AND EVENT_OBJECT_TABLE = %s
+    """, (table,))
+    present = {row['TRIGGER_NAME'] for row in cursor.fetchall()}
+    missing = [name.format(table=table) for name in TRIGGERS if name.format(table=table) not in present]
+    if missing:
+        failures.append(f"missing triggers: {', '.join(missing)}")
+
+    cursor.execute(f"SELECT COUNT(*) AS pending FROM {table} WHERE {NEEDS_BACKFILL}")
+    pending = cursor.fetchone()['pending']
+    if pending:
+        failures.append(f"{pending} rows still need backfill_email_normalized.py --table {table}")
+
+    cursor.execute(f"SELECT email_normalized FROM {table} WHERE email_normalized IS NOT NULL LIMIT 1")
+    row = cursor.fetchone()
+    probe = row['email_normalized'] if row else PROBE_EMAIL
+
+    cursor.execute(f"EXPLAIN SELECT {key} FROM {table} WHERE email_normalized = %s", (probe,))
+    plan = cursor.fetchone() or {}
+    plan = {'key': plan.get('key'), 'type': plan.get('type'), 'rows': plan.get('rows')}
+    expected = EXPECTED_PLANS[table]
+    if plan['key'] is None or expected.get(plan['key']) != plan['type']:
+        failures.append(
+            f"email lookup plan is key={plan['key']} type={plan['type']}, expected one of "
+            + ', '.join(f"key={index} type={access}" for index, access in expected.items())
+        )
+
+    return {'table': table, 'pending': pending, 'explain': plan, 'failures': failures}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check the email_normalized migration and backfill")
+    parser.add_argument('--table', choices=sorted(TABLES), help='Only check this table')
+    args = parser.parse_args(argv)
+
+    tables = [args.table] if args.table else sorted(TABLES)
+    connection = open_connection()
+    try:
+        with connection.cursor() as cursor:
+            results = [check_table(cursor, table) for table in tables]
+        connection.commit()
+    finally:
+        connection.close()
+
+    print(json.dumps(results, indent=2))
+    failures = [f"{result['table']}: {failure}" for result in results for failure in result['failures']]
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
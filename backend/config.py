@@ -11,15 +11,68 @@ DB_USER = os.environ.get('DB_USER', 'root')
 DB_PASSWORD = os.environ.get('DB_PASSWORD', '')
 DB_NAME = os.environ.get('DB_NAME', 'confetti_db')
 
+# Keep one MySQL connection per warm Lambda container instead of reconnecting per request
+DB_REUSE_CONNECTION = os.environ.get('DB_REUSE_CONNECTION', 'true').lower() == 'true'
+DB_PING_INTERVAL = float(os.environ.get('DB_PING_INTERVAL', '0'))  # seconds; 0 = ping on every reuse
+
+# Connection pool used by database.Database (batch scripts, thread-pool workers)
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '0'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '5'))
+DB_POOL_IDLE_TIMEOUT = float(os.environ.get('DB_POOL_IDLE_TIMEOUT', '300'))  # seconds
+DB_POOL_CHECKOUT_TIMEOUT = float(os.environ.get('DB_POOL_CHECKOUT_TIMEOUT', '10'))  # seconds
+
 # Application Configuration
 ENVIRONMENT = os.environ.get('ENVIRONMENT', 'dev')
 
+# Logging (services/log_control.py): LOG_LEVELS sets per-logger levels as name=LEVEL pairs;
+# LOG_DEBUG_SAMPLE_RATE logs that fraction of invocations at DEBUG (0.01 = 1%)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_LEVELS = os.environ.get('LOG_LEVELS', 'botocore=WARNING,boto3=WARNING,urllib3=WARNING,s3transfer=WARNING')
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '0'))
+LOG_REDACT = os.environ.get('LOG_REDACT', 'true').lower() == 'true'
+
+# Cold start metrics (services/init_profiler.py), printed once per execution environment in
+# CloudWatch embedded metric format
+INIT_METRICS_ENABLED = os.environ.get('INIT_METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ConfettiPartnership/Backend')
+
+# Per-request phase timings (services/tracing.py): EMF line per /applications request, and
+# optionally a Server-Timing response header (debugging only - it reveals internal timings)
+TRACE_METRICS_ENABLED = os.environ.get('TRACE_METRICS_ENABLED', 'true').lower() == 'true'
+TRACE_TIMING_HEADER = os.environ.get('TRACE_TIMING_HEADER', 'false').lower() == 'true'
+
 # SES Email Configuration
 SES_SENDER = os.environ.get("SES_SENDER", "noreply@example.com")
 SES_SENDER_NAME = os.environ.get("SES_SENDER_NAME", "Confetti Partnership Team")
 ALERT_EMAIL = os.environ.get("ALERT_EMAIL", "admin@example.com")
 SES_CC_ADDRESSES = os.environ.get("SES_CC_ADDRESSES", "")
 
+# Background job queue for the post-commit PDF + email stage (confirmation_worker.py)
+# JOB_QUEUE_BACKEND: sqs, sqlite, memory or inline; defaults to sqs when CONFIRMATION_QUEUE_URL is set, else inline
+JOB_QUEUE_BACKEND = os.environ.get('JOB_QUEUE_BACKEND', '')
+CONFIRMATION_QUEUE_URL = os.environ.get('CONFIRMATION_QUEUE_URL', '')
+JOB_QUEUE_SQLITE_PATH = os.environ.get('JOB_QUEUE_SQLITE_PATH', '/tmp/confirmation_jobs.sqlite3')
+CONFIRMATION_BATCH_SIZE = int(os.environ.get('CONFIRMATION_BATCH_SIZE', '10'))
+# The application body (signature image, NRIC) is staged in S3 under this bucket/prefix and only its
+# key is queued; objects are deleted once the email is sent. Empty bucket keeps the body in the job
+# payload, which is only meant for the local sqlite/memory/inline backends
+CONFIRMATION_DATA_BUCKET = os.environ.get('CONFIRMATION_DATA_BUCKET', os.environ.get('S3_BUCKET_NAME', ''))
+CONFIRMATION_DATA_PREFIX = os.environ.get('CONFIRMATION_DATA_PREFIX', 'confirmation-jobs/')
+
+# Idempotent POST /applications (idempotency.py). IDEMPOTENCY_LOCK_SECONDS must exceed the API
+# function timeout: a claim older than that is treated as abandoned and taken over by a retry
+IDEMPOTENCY_ENABLED = os.environ.get('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400'))  # 24 hours
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', '120'))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '10'))  # how long a duplicate waits for the original
+IDEMPOTENCY_POLL_INTERVAL = float(os.environ.get('IDEMPOTENCY_POLL_INTERVAL', '0.25'))  # seconds
+
+# Write the /applications rows with one CALL to the submit_partner_application stored procedure
+# (database_migration_submit_procedure.sql) instead of one round trip per statement.
+# UNVERIFIED: the procedure has not yet been run against a MySQL/MariaDB server. Keep this off until
+# benchmarks/check_submit_parity.py passes there and benchmarks/bench_submit_path.py shows a gain
+SUBMIT_PROCEDURE_ENABLED = os.environ.get('SUBMIT_PROCEDURE_ENABLED', 'false').lower() == 'true'
+
 # CORS Configuration
 ALLOWED_ORIGINS = os.environ.get('ALLOWED_ORIGINS', '*').split(',')
 
@@ -29,11 +82,52 @@ PXIER_USERNAME = os.environ.get('PXIER_USERNAME', '')
 PXIER_PASSWORD = os.environ.get('PXIER_PASSWORD', '')
 PXIER_PLATFORM_ADDRESS = os.environ.get('PXIER_PLATFORM_ADDRESS', '')
 
+# Pxier outbox drain (pxier_outbox.py)
+PXIER_OUTBOX_FUNCTION_NAME = os.environ.get('PXIER_OUTBOX_FUNCTION_NAME', '')
+PXIER_OUTBOX_BATCH_SIZE = int(os.environ.get('PXIER_OUTBOX_BATCH_SIZE', '10'))
+PXIER_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('PXIER_OUTBOX_MAX_ATTEMPTS', '8'))
+PXIER_OUTBOX_RETRY_BASE_DELAY = int(os.environ.get('PXIER_OUTBOX_RETRY_BASE_DELAY', '30'))  # seconds
+PXIER_OUTBOX_RETRY_MAX_DELAY = int(os.environ.get('PXIER_OUTBOX_RETRY_MAX_DELAY', '3600'))  # seconds
+PXIER_OUTBOX_CLAIM_TIMEOUT = int(os.environ.get('PXIER_OUTBOX_CLAIM_TIMEOUT', '300'))  # seconds
+
 # PDF Template Configuration
 TEMPLATE_BUCKET = os.environ.get('TEMPLATE_BUCKET', '')
 TEMPLATE_KEY = os.environ.get('TEMPLATE_KEY', '')
 OUTPUT_BUCKET = os.environ.get('OUTPUT_BUCKET', '')
 
+# Template cache (memory + /tmp); S3 is revalidated with If-None-Match at most this often
+TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', '/tmp/template_cache')
+TEMPLATE_CACHE_REVALIDATE_SECONDS = float(os.environ.get('TEMPLATE_CACHE_REVALIDATE_SECONDS', '300'))
+
+# Receipt extraction worker (receipt_worker.py)
+RECEIPT_WORKER_FUNCTION_NAME = os.environ.get('RECEIPT_WORKER_FUNCTION_NAME', '')
+RECEIPT_WORKER_BATCH_SIZE = int(os.environ.get('RECEIPT_WORKER_BATCH_SIZE', '10'))
+RECEIPT_WORKER_MAX_ATTEMPTS = int(os.environ.get('RECEIPT_WORKER_MAX_ATTEMPTS', '3'))
+RECEIPT_WORKER_CLAIM_TIMEOUT = int(os.environ.get('RECEIPT_WORKER_CLAIM_TIMEOUT', '900'))  # seconds
+
+# Textract result cache, keyed by receipt ETag / content hash (services/textract_cache.py)
+# TEXTRACT_CACHE_BACKEND: mysql, sqlite, memory, or empty to disable
+TEXTRACT_CACHE_BACKEND = os.environ.get('TEXTRACT_CACHE_BACKEND', '')
+TEXTRACT_CACHE_SQLITE_PATH = os.environ.get('TEXTRACT_CACHE_SQLITE_PATH', '/tmp/textract_cache.sqlite3')
+TEXTRACT_CACHE_TTL_SECONDS = int(os.environ.get('TEXTRACT_CACHE_TTL_SECONDS', str(90 * 24 * 3600)))  # 90 days
+
+# Asynchronous Textract for multi-page receipts (PDF/TIFF); completion arrives via SNS when
+# both ARNs are set, otherwise the scheduled receipt worker run polls for it
+TEXTRACT_ASYNC_ENABLED = os.environ.get('TEXTRACT_ASYNC_ENABLED', 'true').lower() == 'true'
+TEXTRACT_SNS_TOPIC_ARN = os.environ.get('TEXTRACT_SNS_TOPIC_ARN', '')
+TEXTRACT_SNS_ROLE_ARN = os.environ.get('TEXTRACT_SNS_ROLE_ARN', '')
+TEXTRACT_ASYNC_TIMEOUT = int(os.environ.get('TEXTRACT_ASYNC_TIMEOUT', '3600'))  # seconds before a job is given up on
+
+# Receipt image normalization before Textract (services/receipt_preprocess.py): images of at least
+# RECEIPT_PREPROCESS_MIN_BYTES are made upright, grayscale and at most RECEIPT_OCR_MAX_DIMENSION px
+RECEIPT_PREPROCESS_ENABLED = os.environ.get('RECEIPT_PREPROCESS_ENABLED', 'true').lower() == 'true'
+RECEIPT_PREPROCESS_MIN_BYTES = int(os.environ.get('RECEIPT_PREPROCESS_MIN_BYTES', '1048576'))  # 1MB
+RECEIPT_OCR_MAX_DIMENSION = int(os.environ.get('RECEIPT_OCR_MAX_DIMENSION', '2000'))
+RECEIPT_OCR_JPEG_QUALITY = int(os.environ.get('RECEIPT_OCR_JPEG_QUALITY', '85'))
+
+# Receipt uploads under this prefix are pre-processed by receipt_upload_handler.py (S3 ObjectCreated)
+RECEIPT_UPLOAD_PREFIX = os.environ.get('RECEIPT_UPLOAD_PREFIX', 'receipts/')
+
 # File upload constraints
 MAX_FILE_SIZE = int(os.environ.get('MAX_FILE_SIZE', '10485760'))  # 10MB default
 ALLOWED_FILE_TYPES = os.environ.get('ALLOWED_FILE_TYPES', 'image/jpeg,image/png,image/jpg,application/pdf').split(',')
@@ -55,10 +149,18 @@ PLACEHOLDER_POSITIONS = {
     'submitted_date': (124, 127),
 }
 
+# Overlay page writer: 'native' (built-in PDF writer, no reportlab import) or 'reportlab'
+# The native writer falls back to reportlab if it cannot render an overlay
+PDF_OVERLAY_BACKEND = os.environ.get('PDF_OVERLAY_BACKEND', 'native')
+
 # Signature positioning for PDF (if signature field exists)
 SIGNATURE_POSITION = (50, 195)
 SIGNATURE_SIZE = (120, 60)
 
+# Signature images larger than SIGNATURE_SIZE x this many pixels per point are
+# downscaled before embedding (2 = 144 dpi when printed); 0 disables downscaling
+SIGNATURE_PIXELS_PER_POINT = float(os.environ.get('SIGNATURE_PIXELS_PER_POINT', '2'))
+
 # Field width limits for PDF text (in characters)
 # Adjust these to control how much text fits in each field
 ADDRESS_MAX_WIDTH = 70  # Maximum characters for address field per line
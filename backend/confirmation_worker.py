@@ -0,0 +1,103 @@
+"""
+Confirmation job worker.
+
+Processes queued application_confirmation jobs (PDF render + SES email) that
+/applications enqueues after commit.
+
+Invoked by:
+- an SQS event source mapping, with a batch of Records. Failed records are
+  reported through batchItemFailures (ReportBatchItemFailures) so only they
+  are redelivered.
+- directly with {"drain": true, "batch_size": N} to process local SQLite or
+  in-memory queues in batches until they are empty.
+"""
+import logging
+from typing import Dict, Any, List
+
+from services.confirmation_service import handle_confirmation_job
+from services.job_queue import decode_job, get_job_queue
+from services.log_control import configure_logging
+import config
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    event = event or {}
+
+    if 'Records' in event:
+        return process_sqs_records(event['Records'])
+
+    if event.get('drain'):
+        batch_size = int(event.get('batch_size') or config.CONFIRMATION_BATCH_SIZE)
+        return drain_queue(batch_size=batch_size)
+
+    logger.warning("Confirmation worker invoked without Records or drain flag")
+    return {'processed': 0, 'failed': 0}
+
+
+def process_sqs_records(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Process one SQS batch and report the records that should be retried."""
+    failures = []
+
+    for record in records:
+        message_id = record.get('messageId')
+        try:
+            job = decode_job(message_id, record['body'])
+            if not handle_confirmation_job(job):
+                failures.append({'itemIdentifier': message_id})
+        except Exception as e:
+            logger.error("Confirmation job failed", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e),
+                'message_id': message_id
+            }, exc_info=True)
+            failures.append({'itemIdentifier': message_id})
+
+    logger.info("Confirmation batch processed", extra={
+        'record_count': len(records),
+        'failed_count': len(failures)
+    })
+
+    return {'batchItemFailures': failures}
+
+
+def drain_queue(batch_size: int = 10) -> Dict[str, Any]:
+    """Receive and process jobs from the configured queue until it is empty."""
+    queue = get_job_queue(inline_handler=handle_confirmation_job)
+    processed = 0
+    failed = []
+
+    while True:
+        jobs = queue.receive(batch_size)
+        if not jobs:
+            break
+
+        for job in jobs:
+            try:
+                ok = handle_confirmation_job(job)
+            except Exception as e:
+                logger.error("Confirmation job failed", extra={
+                    'error_type': type(e).__name__,
+                    'error_message': str(e),
+                    'job_id': job.job_id
+                }, exc_info=True)
+                ok = False
+
+            processed += 1
+            if ok:
+                queue.ack(job)
+            else:
+                failed.append(job)
+
+    # Return failed jobs only now so this drain does not spin on them
+    for job in failed:
+        queue.nack(job)
+
+    logger.info("Confirmation queue drained", extra={
+        'processed': processed,
+        'failed': len(failed)
+    })
+
+    return {'processed': processed, 'failed': len(failed)}
@@ -0,0 +1,205 @@
+"""
+Warm-container MySQL connection reuse.
+
+Lambda keeps module state alive between invocations of a warm container, so a
+single connection opened on the first request can serve every later request
+handled by the same container. The manager checks the cached connection with a
+cheap ping before handing it out, resets any transaction left behind by a
+previous invocation and falls back to a fresh connect when the server has
+dropped it.
+"""
+import os
+import time
+import logging
+import pymysql
+
+# Import config for connection reuse settings
+try:
+    from backend import config
+except ImportError:
+    import config
+
+logger = logging.getLogger(__name__)
+
+
+def open_connection():
+    """
+    Create and return a MySQL database connection using environment variables.
+    """
+    logger.debug("Attempting database connection", extra={
+        'db_host': os.environ.get('DB_HOST', 'NOT_SET'),
+        'db_name': os.environ.get('DB_NAME', 'NOT_SET'),
+        'db_user': os.environ.get('DB_USER', 'NOT_SET'),
+        'db_port': os.environ.get('DB_PORT', '3306')
+    })
+
+    try:
+        connection = pymysql.connect(
+            host=os.environ['DB_HOST'],
+            user=os.environ['DB_USER'],
+            password=os.environ['DB_PASSWORD'],
+            database=os.environ['DB_NAME'],
+            port=int(os.environ.get('DB_PORT', 3306)),
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor,
+            autocommit=False,
+            connect_timeout=10,
+            read_timeout=30,
+            write_timeout=30
+        )
+
+        logger.info("Database connection established successfully", extra={
+            'db_host': os.environ['DB_HOST'],
+            'db_name': os.environ['DB_NAME']
+        })
+        return connection
+
+    except KeyError as e:
+        logger.error("Missing required environment variable for database connection", extra={
+            'missing_variable': str(e),
+            'available_variables': list(os.environ.keys())
+        })
+        raise Exception(f"Database configuration error: Missing {str(e)}")
+
+    except pymysql.MySQLError as e:
+        logger.error("MySQL connection error", extra={
+            'error_code': e.args[0] if e.args else 'UNKNOWN',
+            'error_message': e.args[1] if len(e.args) > 1 else str(e),
+            'db_host': os.environ.get('DB_HOST', 'NOT_SET')
+        })
+        raise Exception("Database connection failed")
+
+    except Exception as e:
+        logger.error("Unexpected database connection error", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e)
+        }, exc_info=True)
+        raise
+
+
+class ConnectionManager:
+    """
+    Keeps one MySQL connection per warm Lambda container.
+
+    acquire() returns the cached connection when it is still alive (a hit) or
+    opens a new one (a miss). release() hands it back; pass discard=True after
+    a connection-level error so the next acquire() reconnects.
+    """
+
+    def __init__(self, connect=open_connection, reuse=True, ping_interval=0.0):
+        self._connect = connect
+        self.reuse = reuse
+        self.ping_interval = ping_interval
+        self._connection = None
+        self._checked_out = False
+        self._last_used = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+        self.discards = 0
+
+    def acquire(self):
+        """Return a live connection with no open transaction."""
+        connection = self._connection if self.reuse else None
+
+        if connection is not None and self._is_usable(connection):
+            self.hits += 1
+            self._checked_out = True
+            logger.debug("Reusing warm database connection", extra=self.stats())
+            return connection
+
+        if connection is not None:
+            self.reconnects += 1
+            self._close(connection)
+            self._connection = None
+
+        self.misses += 1
+        connection = self._connect()
+        if self.reuse:
+            self._connection = connection
+            self._checked_out = True
+        self._last_used = time.monotonic()
+        return connection
+
+    def release(self, connection, discard=False):
+        """Return a connection obtained from acquire()."""
+        if connection is None:
+            return
+
+        if discard or not self.reuse or connection is not self._connection:
+            if discard:
+                self.discards += 1
+            self._close(connection)
+            if connection is self._connection:
+                self._connection = None
+                self._checked_out = False
+            return
+
+        self._checked_out = False
+
+        # Never carry an uncommitted transaction into the next invocation
+        try:
+            connection.rollback()
+        except Exception as e:
+            logger.warning("Failed to reset warm database connection - discarding", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e)
+            })
+            self.discards += 1
+            self._close(connection)
+            self._connection = None
+            return
+
+        self._last_used = time.monotonic()
+
+    def close(self):
+        """Close the cached connection, if any."""
+        if self._connection is not None:
+            self._close(self._connection)
+            self._connection = None
+
+    def stats(self):
+        """Hit/miss counters for the cached connection."""
+        return {
+            'db_connection_hits': self.hits,
+            'db_connection_misses': self.misses,
+            'db_connection_reconnects': self.reconnects,
+            'db_connection_discards': self.discards
+        }
+
+    def _is_usable(self, connection):
+        if not getattr(connection, 'open', False):
+            return False
+
+        try:
+            # Skip the round trip when the connection was used moments ago
+            if time.monotonic() - self._last_used >= self.ping_interval:
+                connection.ping(reconnect=False)
+            # A previous invocation never released it - clear its transaction
+            if self._checked_out:
+                connection.rollback()
+            return True
+        except Exception as e:
+            logger.info("Warm database connection is stale - reconnecting", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e)
+            })
+            return False
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+            logger.debug("Database connection closed")
+        except Exception as e:
+            logger.warning("Error closing database connection", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e)
+            })
+
+
+# Singleton instance shared by every invocation of a warm container
+connection_manager = ConnectionManager(
+    reuse=config.DB_REUSE_CONNECTION,
+    ping_interval=config.DB_PING_INTERVAL
+)
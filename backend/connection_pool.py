@@ -0,0 +1,267 @@
+"""
+Bounded, thread-safe MySQL connection pool.
+
+Used by database.Database so batch scripts and thread-pool workers share a
+fixed set of connections instead of paying a TCP/auth handshake per query.
+"""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout"""
+    pass
+
+
+class _PooledConnection:
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Pool of at most max_size connections created by connect().
+
+    - warm() opens min_size connections up front; idle eviction never goes below min_size
+    - connections idle for longer than idle_timeout seconds are closed at the next checkout or checkin
+    - every checkout pings the connection and replaces it if it is dead
+    - callers block for up to checkout_timeout seconds when the pool is exhausted
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 0,
+        max_size: int = 5,
+        idle_timeout: float = 300.0,
+        checkout_timeout: float = 10.0
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+
+        self._idle: List[_PooledConnection] = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition(threading.Lock())
+
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'closed': 0,
+            'evicted_idle': 0,
+            'failed_health_checks': 0
+        }
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the with-block."""
+        pooled = self._checkout()
+        discard = False
+        try:
+            yield pooled.connection
+        except Exception as e:
+            # Connection-level failures leave the socket in an unknown state
+            discard = _is_connection_error(e)
+            raise
+        finally:
+            self._checkin(pooled, discard=discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool sizing, checkout and wait-time statistics."""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+        checkouts = stats['checkouts']
+        stats['wait_time_avg'] = stats['wait_time_total'] / checkouts if checkouts else 0.0
+        return stats
+
+    def warm(self) -> None:
+        """Open connections until min_size are available."""
+        while True:
+            with self._condition:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                pooled = _PooledConnection(self._connect())
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                raise
+            with self._condition:
+                self._stats['created'] += 1
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def close(self) -> None:
+        """Close idle connections and refuse further checkouts."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            self._close(pooled)
+
+    def _checkout(self) -> _PooledConnection:
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        waited = False
+
+        while True:
+            pooled = None
+            create = False
+            expired: List[_PooledConnection] = []
+            try:
+                with self._condition:
+                    while True:
+                        if self._closed:
+                            raise PoolTimeoutError("Connection pool is closed")
+                        # After a quiet spell the next checkout, not a checkin, is the first chance to evict
+                        expired.extend(self._collect_expired())
+                        if self._idle:
+                            # LIFO keeps the busiest connections warm and lets the rest expire
+                            pooled = self._idle.pop()
+                            break
+                        if self._size < self.max_size:
+                            self._size += 1
+                            create = True
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats['timeouts'] += 1
+                            raise PoolTimeoutError(
+                                f"Timed out after {self.checkout_timeout}s waiting for a database connection"
+                            )
+                        waited = True
+                        self._condition.wait(remaining)
+            finally:
+                for stale in expired:
+                    self._close(stale)
+
+            if create:
+                try:
+                    pooled = _PooledConnection(self._connect())
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._stats['created'] += 1
+            elif not self._is_healthy(pooled):
+                self._discard(pooled)
+                continue
+
+            wait_time = time.monotonic() - started
+            with self._condition:
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                self._stats['wait_time_total'] += wait_time
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+            return pooled
+
+    def _checkin(self, pooled: _PooledConnection, discard: bool = False) -> None:
+        if not discard:
+            try:
+                # Drop whatever the caller left uncommitted
+                pooled.connection.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            self._discard(pooled)
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._condition:
+            if self._closed:
+                self._size -= 1
+                closing = True
+            else:
+                self._idle.append(pooled)
+                closing = False
+            expired = self._collect_expired()
+            self._condition.notify()
+
+        if closing:
+            self._close(pooled)
+        for stale in expired:
+            self._close(stale)
+
+    def _collect_expired(self) -> List[_PooledConnection]:
+        """Remove idle connections past idle_timeout, keeping min_size open. Caller holds the lock."""
+        if self.idle_timeout is None:
+            return []
+
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        # Oldest idle connections sit at the front of the LIFO list
+        while self._idle and self._size > self.min_size and self._idle[0].last_used < cutoff:
+            expired.append(self._idle.pop(0))
+            self._size -= 1
+            self._stats['evicted_idle'] += 1
+        return expired
+
+    def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        try:
+            pooled.connection.ping(reconnect=False)
+            return True
+        except Exception as e:
+            logger.info("Pooled database connection failed health check", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e)
+            })
+            with self._condition:
+                self._stats['failed_health_checks'] += 1
+            return False
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+        self._close(pooled)
+
+    def _close(self, pooled: _PooledConnection) -> None:
+        with self._condition:
+            self._stats['closed'] += 1
+        try:
+            pooled.connection.close()
+        except Exception as e:
+            logger.debug("Error closing pooled database connection", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e)
+            })
+
+
+def _is_connection_error(error: Exception) -> bool:
+    try:
+        import pymysql
+    except ImportError:
+        return False
+    return isinstance(error, (pymysql.OperationalError, pymysql.InterfaceError))
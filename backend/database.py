@@ -3,17 +3,27 @@ from pymysql.cursors import DictCursor
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from contextlib import contextmanager
-from config import config
+try:
+    from backend import config
+except ImportError:
+    import config
+
+from connection_pool import ConnectionPool, PoolTimeoutError
 import logging
 
-logger = logging.getLogger()
+logger = logging.getLogger(__name__)
 
 class DatabaseError(Exception):
     """Custom database error"""
     pass
 
 class Database:
+    # Rows the email_normalized backfill (backfill_email_normalized.py) has not reached yet are
+    # NULL there; until none remain, lead lookups also match LOWER(TRIM(email_address)) as before
+    LEAD_EMAIL_FALLBACK = "(email_normalized = %s OR (email_normalized IS NULL AND LOWER(TRIM(email_address)) = %s))"
+
     def __init__(self):
+        self._leads_backfilled = False
         self.connection_params = {
             'host': config.DB_HOST,
             'port': config.DB_PORT,
@@ -24,31 +34,62 @@ class Database:
             'charset': 'utf8mb4',
             'connect_timeout': 5
         }
+        self.pool = ConnectionPool(
+            self._connect,
+            min_size=config.DB_POOL_MIN_SIZE,
+            max_size=config.DB_POOL_MAX_SIZE,
+            idle_timeout=config.DB_POOL_IDLE_TIMEOUT,
+            checkout_timeout=config.DB_POOL_CHECKOUT_TIMEOUT
+        )
+        try:
+            # Open DB_POOL_MIN_SIZE connections now; the pool still connects lazily if this fails
+            self.pool.warm()
+        except pymysql.Error as e:
+            logger.warning(f"Could not pre-open pooled database connections: {str(e)}")
+    
+    def _connect(self):
+        return pymysql.connect(**self.connection_params)
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        connection = None
+        """Context manager for pooled database connections"""
         try:
-            connection = pymysql.connect(**self.connection_params)
-            yield connection
+            with self.pool.connection() as connection:
+                yield connection
+        except PoolTimeoutError as e:
+            logger.error(f"Database pool exhausted: {str(e)}", extra=self.pool.stats())
+            raise DatabaseError(f"Database connection failed: {str(e)}")
         except pymysql.Error as e:
             logger.error(f"Database connection error: {str(e)}")
             raise DatabaseError(f"Database connection failed: {str(e)}")
-        finally:
-            if connection:
-                connection.close()
     
+    def pool_stats(self) -> Dict[str, Any]:
+        """Checkout, wait-time and sizing statistics for the connection pool"""
+        return self.pool.stats()
+    
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close()
+    
+    def _lead_email_condition(self, cursor, email: str):
+        """WHERE condition and args matching leads with this email (case- and whitespace-insensitive)"""
+        normalized = email.strip().lower()
+        if not self._leads_backfilled:
+            # Uses idx_leads_email_normalized; once it finds nothing, the triggers keep it that way
+            cursor.execute("SELECT 1 FROM leads WHERE email_normalized IS NULL LIMIT 1")
+            self._leads_backfilled = cursor.fetchone() is None
+        if self._leads_backfilled:
+            return "email_normalized = %s", (normalized,)
+        return self.LEAD_EMAIL_FALLBACK, (normalized, normalized)
+
     def create_lead(self, application_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new lead in the database"""
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
                     # Check if email already exists
-                    cursor.execute(
-                        "SELECT lead_id FROM leads WHERE email_address = %s",
-                        (application_data['email'],)
-                    )
+                    condition, args = self._lead_email_condition(cursor, application_data['email'])
+                    cursor.execute(f"SELECT lead_id FROM leads WHERE {condition}", args)
                     
                     if cursor.fetchone():
                         raise DatabaseError('A lead with this email already exists')
@@ -139,14 +180,12 @@ class Database:
             raise DatabaseError(f"Failed to retrieve lead: {str(e)}")
     
     def get_lead_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        """Get a lead by email"""
+        """Get a lead by email (case- and whitespace-insensitive, via the indexed email_normalized once backfilled)"""
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute(
-                        "SELECT * FROM leads WHERE email_address = %s",
-                        (email,)
-                    )
+                    condition, args = self._lead_email_condition(cursor, email)
+                    cursor.execute(f"SELECT * FROM leads WHERE {condition}", args)
                     return cursor.fetchone()
         except pymysql.Error as e:
             logger.error(f"Database error: {str(e)}")
@@ -0,0 +1,8 @@
+-- Migration script for bulk application imports (bulk_import.py)
+-- Each imported row records where it came from as <source>:<row number>. The unique index lets a
+-- resumed import skip rows committed after its last checkpoint write, so no row is imported twice.
+
+ALTER TABLE partner_applications
+ADD COLUMN IF NOT EXISTS import_row_ref VARCHAR(255) NULL COMMENT 'bulk_import.py source and row number; NULL for /applications submissions';
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_partner_applications_import_row_ref ON partner_applications(import_row_ref);
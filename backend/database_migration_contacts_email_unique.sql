@@ -0,0 +1,23 @@
+-- Migration script for the single-statement contact upsert in POST /applications
+-- insert_lead_and_partner_application resolves the contact with
+--   INSERT INTO contacts (...) ON DUPLICATE KEY UPDATE contact_id = LAST_INSERT_ID(contact_id)
+-- which needs email_normalized to be unique: two concurrent submissions with the same email can no
+-- longer both miss a SELECT and insert two contacts.
+--
+-- Order:
+--   1. database_migration_email_normalized.sql and its backfill must already have run
+--   2. Resolve any duplicate contacts reported by the query below (merge them and repoint their
+--      partner_applications, payments and audit rows); the ALTER fails while duplicates remain
+--   3. Run the ALTER, then deploy the code that uses the upsert
+
+-- Duplicates that block the unique index
+SELECT email_normalized, COUNT(*) AS contacts, GROUP_CONCAT(contact_id ORDER BY contact_id) AS contact_ids
+FROM contacts
+WHERE email_normalized IS NOT NULL
+GROUP BY email_normalized
+HAVING COUNT(*) > 1;
+
+-- Replace the plain lookup index with a unique one (NULLs, i.e. rows not yet backfilled, never collide)
+ALTER TABLE contacts
+DROP INDEX IF EXISTS idx_contacts_email_normalized,
+ADD UNIQUE INDEX IF NOT EXISTS uq_contacts_email_normalized (email_normalized);
@@ -0,0 +1,39 @@
+-- Migration script for index-friendly email lookups on contacts and leads
+-- WHERE LOWER(email_address) = ? cannot use an index, so every /applications submission scanned contacts.
+-- email_normalized holds LOWER(TRIM(email_address)), kept current by triggers for every writer, and is indexed.
+--
+-- Order:
+--   1. Run this script (adding a nullable column is an online, metadata-only change)
+--   2. Backfill existing rows in batches: python backfill_email_normalized.py --table contacts (then --table leads)
+--   3. Verify: python check_email_normalized.py (triggers present, no rows left to backfill, and EXPLAIN of
+--      the lookups uses idx_contacts_email_normalized / idx_leads_email_normalized)
+--   4. Deploy the code that looks contacts and leads up by email_normalized. Database.create_lead and
+--      get_lead_by_email still match LOWER(TRIM(email_address)) while NULL rows remain, but the contacts
+--      lookups (and database_migration_contacts_email_unique.sql) need step 3 to pass first
+
+ALTER TABLE contacts
+ADD COLUMN IF NOT EXISTS email_normalized VARCHAR(255) NULL COMMENT 'LOWER(TRIM(email_address)), maintained by triggers';
+
+ALTER TABLE leads
+ADD COLUMN IF NOT EXISTS email_normalized VARCHAR(255) NULL COMMENT 'LOWER(TRIM(email_address)), maintained by triggers';
+
+-- Single-statement trigger bodies, so no DELIMITER change is needed
+DROP TRIGGER IF EXISTS contacts_email_normalized_insert;
+CREATE TRIGGER contacts_email_normalized_insert BEFORE INSERT ON contacts
+FOR EACH ROW SET NEW.email_normalized = LOWER(TRIM(NEW.email_address));
+
+DROP TRIGGER IF EXISTS contacts_email_normalized_update;
+CREATE TRIGGER contacts_email_normalized_update BEFORE UPDATE ON contacts
+FOR EACH ROW SET NEW.email_normalized = LOWER(TRIM(NEW.email_address));
+
+DROP TRIGGER IF EXISTS leads_email_normalized_insert;
+CREATE TRIGGER leads_email_normalized_insert BEFORE INSERT ON leads
+FOR EACH ROW SET NEW.email_normalized = LOWER(TRIM(NEW.email_address));
+
+DROP TRIGGER IF EXISTS leads_email_normalized_update;
+CREATE TRIGGER leads_email_normalized_update BEFORE UPDATE ON leads
+FOR EACH ROW SET NEW.email_normalized = LOWER(TRIM(NEW.email_address));
+
+-- Index for the lookups in insert_lead_and_partner_application and Database.get_lead_by_email
+CREATE INDEX IF NOT EXISTS idx_contacts_email_normalized ON contacts(email_normalized);
+CREATE INDEX IF NOT EXISTS idx_leads_email_normalized ON leads(email_normalized);
@@ -0,0 +1,21 @@
+-- Migration script for idempotent POST /applications
+-- Rows are claimed by idempotency.py before the application is inserted and completed in the same
+-- transaction as the inserts, so a retried request replays the stored result instead of inserting again
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key VARCHAR(128) NOT NULL COMMENT 'Idempotency-Key header, or derived:<sha256 of email, receipt key and tier>',
+    request_hash CHAR(64) NOT NULL COMMENT 'SHA-256 of the request body; a reused header key with a different body is rejected',
+    status VARCHAR(20) NOT NULL COMMENT 'in_progress or completed',
+    result JSON NULL COMMENT 'insert_lead_and_partner_application result, set when status is completed',
+    claim_token CHAR(32) NULL COMMENT 'Random token of the request holding the claim; completing or releasing the key requires it',
+    locked_until DATETIME NOT NULL COMMENT 'An in_progress claim older than this was abandoned and may be taken over',
+    expires_at DATETIME NOT NULL COMMENT 'After this the key can be used for a new request',
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (idempotency_key),
+    KEY idx_idempotency_keys_expires_at (expires_at)
+) COMMENT = 'Idempotency keys and stored results for POST /applications';
+
+-- Tables created before claim_token was added
+ALTER TABLE idempotency_keys
+ADD COLUMN IF NOT EXISTS claim_token CHAR(32) NULL COMMENT 'Random token of the request holding the claim; completing or releasing the key requires it' AFTER result;
@@ -0,0 +1,21 @@
+-- Migration script to add the Pxier customer creation outbox
+-- Rows are written by /applications in the submission transaction and pushed by pxier_outbox.py
+
+CREATE TABLE IF NOT EXISTS pxier_outbox (
+    id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    contact_id INT NOT NULL COMMENT 'contacts.contact_id to create in Pxier',
+    partner_application_id INT NOT NULL COMMENT 'partner_applications.id to update with customer_id',
+    contact_data JSON NOT NULL COMMENT 'Contact fields used to build the Pxier payload',
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' COMMENT 'pending, processing, sent or failed',
+    attempts INT NOT NULL DEFAULT 0 COMMENT 'Number of push attempts made',
+    next_attempt_at DATETIME NOT NULL COMMENT 'Earliest time the next attempt may run',
+    last_error TEXT NULL COMMENT 'Error from the most recent failed attempt',
+    pxier_customer_id VARCHAR(64) NULL COMMENT 'Pxier customerId returned on success',
+    pxier_contact_id VARCHAR(64) NULL COMMENT 'Pxier contactId returned on success',
+    sent_at DATETIME NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    KEY idx_pxier_outbox_status_next_attempt (status, next_attempt_at),
+    KEY idx_pxier_outbox_contact_id (contact_id)
+) COMMENT = 'Transactional outbox for Pxier customer creation';
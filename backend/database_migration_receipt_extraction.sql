@@ -0,0 +1,9 @@
+-- Migration script for asynchronous receipt extraction
+-- Payments are committed with status 'pending_extraction' and filled in by receipt_worker.py
+
+-- Add retry counter for the receipt worker if it doesn't exist
+ALTER TABLE payments
+ADD COLUMN IF NOT EXISTS extraction_attempts INT NOT NULL DEFAULT 0 COMMENT 'Number of Textract extraction attempts made by receipt_worker';
+
+-- Add index so the worker can find pending payments without a table scan
+CREATE INDEX IF NOT EXISTS idx_payments_status ON payments(status);
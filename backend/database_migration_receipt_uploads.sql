@@ -0,0 +1,17 @@
+-- Migration script for receipt pre-processing at upload time
+-- Rows are written by receipt_upload_handler.py (S3 ObjectCreated on receipts/) and read by /applications
+
+CREATE TABLE IF NOT EXISTS receipt_extractions (
+    storage_key VARCHAR(255) NOT NULL COMMENT 'S3 key returned by /presign (receipts/...)',
+    bucket VARCHAR(255) NOT NULL,
+    status VARCHAR(20) NOT NULL COMMENT 'extracting, awaiting_textract, extracted, no_amount, rejected or failed',
+    amount DECIMAL(12,2) NULL COMMENT 'Amount extracted by Textract, set when status is extracted',
+    size_bytes BIGINT NULL COMMENT 'Object size from the S3 event',
+    textract_job_id VARCHAR(64) NULL COMMENT 'JobId of the asynchronous Textract job for multi-page receipts',
+    error VARCHAR(255) NULL COMMENT 'Rejection reason or last error',
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (storage_key),
+    KEY idx_receipt_extractions_status_updated (status, updated_at),
+    KEY idx_receipt_extractions_textract_job_id (textract_job_id)
+) COMMENT = 'Receipt amounts extracted when the receipt is uploaded';
@@ -0,0 +1,173 @@
+-- Migration script for the single round-trip /applications submission (SUBMIT_PROCEDURE_ENABLED)
+-- submit_partner_application does server-side what lambda_function.write_application_rows does one
+-- statement at a time: contact upsert, partner_applications, receipt amount lookup, payments,
+-- pxier_outbox (new contacts only), contact_audits and completing the idempotency key.
+-- It runs in the caller's transaction and does not COMMIT; call_submit_procedure calls it.
+--
+-- Requires database_migration_contacts_email_unique.sql, database_migration_pxier_outbox.sql,
+-- database_migration_receipt_uploads.sql and database_migration_idempotency.sql.
+-- Keep in step with write_application_rows: status values below mirror PENDING_EXTRACTION
+-- (receipt_worker.py), UPLOAD_EXTRACTED (receipt_upload_handler.py), OUTBOX_PENDING
+-- (pxier_outbox.py) and KEY_IN_PROGRESS/KEY_COMPLETED (idempotency.py).
+-- Run with the mysql client, which understands DELIMITER.
+--
+-- UNVERIFIED: not yet created or called on a real server. Before setting SUBMIT_PROCEDURE_ENABLED, run
+-- benchmarks/check_submit_parity.py (same rows as write_application_rows for new/existing contacts,
+-- precomputed amounts, pending_extraction and a lost idempotency claim) and benchmarks/bench_submit_path.py.
+
+DROP PROCEDURE IF EXISTS submit_partner_application;
+
+DELIMITER $$
+
+CREATE PROCEDURE submit_partner_application(
+    IN p_first_name VARCHAR(255),
+    IN p_last_name VARCHAR(255),
+    IN p_email_address VARCHAR(255),
+    IN p_gender VARCHAR(32),
+    IN p_phone_number VARCHAR(64),
+    IN p_country_code VARCHAR(16),
+    IN p_identification_card VARCHAR(64),
+    IN p_address_line_1 VARCHAR(255),
+    IN p_address_line_2 VARCHAR(255),
+    IN p_city VARCHAR(255),
+    IN p_state VARCHAR(255),
+    IN p_postcode VARCHAR(32),
+    IN p_position VARCHAR(255),
+    IN p_company_name VARCHAR(255),
+    IN p_industry VARCHAR(255),
+    IN p_partnership_tier VARCHAR(64),
+    IN p_terms_accepted BOOLEAN,
+    IN p_total_payable DECIMAL(10, 2),
+    IN p_receipt_storage_key VARCHAR(500),
+    IN p_receipt_file_name VARCHAR(255),
+    IN p_sales_rep VARCHAR(255),
+    IN p_utm_source VARCHAR(255),
+    IN p_utm_medium VARCHAR(255),
+    IN p_referrer VARCHAR(1000),
+    IN p_pxier_contact_data JSON,
+    IN p_audit_payload JSON,
+    IN p_idempotency_key VARCHAR(128),
+    IN p_claim_token CHAR(32)
+)
+BEGIN
+    DECLARE v_contact_id INT;
+    DECLARE v_is_new_contact BOOLEAN;
+    DECLARE v_application_id INT;
+    DECLARE v_payment_id INT;
+    DECLARE v_amount DECIMAL(12, 2) DEFAULT NULL;
+    DECLARE v_payment_status VARCHAR(32) DEFAULT 'pending';
+    DECLARE v_pxier_outbox_id BIGINT UNSIGNED DEFAULT NULL;
+    DECLARE v_audit_failed BOOLEAN DEFAULT FALSE;
+
+    -- Contact: insert, or reuse the row with the same (unique) email_normalized untouched.
+    -- ROW_COUNT() is 1 only for an insert.
+    INSERT INTO contacts (
+        first_name, last_name, email_address, gender, phone_number,
+        country_code, identification_card,
+        address_line_1, address_line_2, city, state, postcode,
+        lead_source, status, created_at, updated_at
+    ) VALUES (
+        p_first_name, p_last_name, p_email_address, p_gender, p_phone_number,
+        p_country_code, p_identification_card,
+        p_address_line_1, p_address_line_2, p_city, p_state, p_postcode,
+        'ccp', 'converted', NOW(), NOW()
+    )
+    ON DUPLICATE KEY UPDATE contact_id = LAST_INSERT_ID(contact_id);
+    SET v_is_new_contact = (ROW_COUNT() = 1);
+    SET v_contact_id = LAST_INSERT_ID();
+
+    INSERT INTO partner_applications (
+        contact_id, position, company_name, industry, partnership_tier,
+        terms_accepted, total_payable,
+        receipt_storage_key, receipt_file_name,
+        sales_rep, utm_source, utm_medium, referrer,
+        submitted_at, status, created_at, updated_at
+    ) VALUES (
+        v_contact_id, p_position, p_company_name, p_industry, p_partnership_tier,
+        p_terms_accepted, p_total_payable,
+        p_receipt_storage_key, p_receipt_file_name,
+        p_sales_rep, p_utm_source, p_utm_medium, p_referrer,
+        NOW(), 'pending', NOW(), NOW()
+    );
+    SET v_application_id = LAST_INSERT_ID();
+
+    -- Amount extracted at upload time, else receipt_worker extracts it after commit
+    IF p_receipt_storage_key <> '' THEN
+        SET v_amount = (
+            SELECT amount
+            FROM receipt_extractions
+            WHERE storage_key = p_receipt_storage_key AND status = 'extracted'
+        );
+        IF v_amount IS NULL THEN
+            SET v_payment_status = 'pending_extraction';
+        END IF;
+    END IF;
+
+    INSERT INTO payments (
+        contact_id, partner_application_id, amount,
+        payment_method, payment_type, description,
+        official_receipt, attachment, status,
+        transaction_datetime, created_at, updated_at
+    ) VALUES (
+        v_contact_id, v_application_id, COALESCE(v_amount, 0),
+        'bank_transfer', 'membership_fee', CONCAT('membership_fee - ', p_last_name, ' ', p_first_name),
+        p_receipt_storage_key, p_receipt_storage_key, v_payment_status,
+        NOW(), NOW(), NOW()
+    );
+    SET v_payment_id = LAST_INSERT_ID();
+
+    IF v_is_new_contact THEN
+        INSERT INTO pxier_outbox (
+            contact_id, partner_application_id, contact_data,
+            status, attempts, next_attempt_at, created_at, updated_at
+        ) VALUES (
+            v_contact_id, v_application_id, p_pxier_contact_data,
+            'pending', 0, NOW(), NOW(), NOW()
+        );
+        SET v_pxier_outbox_id = LAST_INSERT_ID();
+    END IF;
+
+    -- A failed audit insert does not fail the submission; it is reported in audit_failed
+    BEGIN
+        DECLARE CONTINUE HANDLER FOR SQLEXCEPTION SET v_audit_failed = TRUE;
+        INSERT INTO contact_audits (
+            contact_id, email_address, phone_number, booking_id,
+            action, source, payload, created_at
+        ) VALUES (
+            v_contact_id, p_email_address, p_phone_number, v_application_id,
+            IF(v_is_new_contact, 'created', 'proposed_update'), 'corporate_form', p_audit_payload, NOW()
+        );
+    END;
+
+    IF p_idempotency_key IS NOT NULL THEN
+        UPDATE idempotency_keys
+        SET status = 'completed',
+            result = JSON_OBJECT(
+                'contact_id', v_contact_id,
+                'application_id', v_application_id,
+                'payment_id', v_payment_id,
+                'payment_amount', COALESCE(v_amount, 0),
+                'payment_status', v_payment_status
+            ),
+            updated_at = NOW()
+        WHERE idempotency_key = p_idempotency_key
+          AND status = 'in_progress'
+          AND claim_token = p_claim_token;
+        -- Claim taken over by another request: abort so the caller rolls back (see CLAIM_LOST_MESSAGE)
+        IF ROW_COUNT() <> 1 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'idempotency claim lost';
+        END IF;
+    END IF;
+
+    SELECT
+        v_contact_id AS contact_id,
+        v_is_new_contact AS is_new_contact,
+        v_application_id AS application_id,
+        v_payment_id AS payment_id,
+        COALESCE(v_amount, 0) AS payment_amount,
+        v_payment_status AS payment_status,
+        v_pxier_outbox_id AS pxier_outbox_id,
+        v_audit_failed AS audit_failed;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,10 @@
+-- Migration script for asynchronous (multi-page) Textract jobs
+-- receipt_worker.py starts start_document_text_detection for PDF receipts and parks the
+-- payment in status 'awaiting_textract' until the job completes
+
+-- Add the Textract job ID if it doesn't exist
+ALTER TABLE payments
+ADD COLUMN IF NOT EXISTS textract_job_id VARCHAR(64) NULL COMMENT 'JobId of the asynchronous Textract text detection job for the receipt';
+
+-- Add index so SNS completion callbacks can find the payment by job ID
+CREATE INDEX IF NOT EXISTS idx_payments_textract_job_id ON payments(textract_job_id);
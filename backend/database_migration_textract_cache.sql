@@ -0,0 +1,13 @@
+-- Migration script for the Textract result cache
+-- Rows are written by services/textract_cache.py (TEXTRACT_CACHE_BACKEND=mysql)
+
+CREATE TABLE IF NOT EXISTS textract_results (
+    cache_key VARCHAR(128) NOT NULL COMMENT 'etag:<S3 ETag> or sha256:<content hash> of the receipt',
+    line_blocks JSON NOT NULL COMMENT 'Textract LINE blocks (Text, Confidence, Page)',
+    amount DECIMAL(12,2) NULL COMMENT 'Amount parsed from line_blocks, NULL if none found',
+    parser_version VARCHAR(32) NOT NULL COMMENT 'Parser version that produced amount; re-parsed on mismatch',
+    created_at DATETIME NOT NULL,
+    expires_at DATETIME NOT NULL,
+    PRIMARY KEY (cache_key),
+    KEY idx_textract_results_expires_at (expires_at)
+) COMMENT = 'Cached Textract output so the same receipt is only OCRd once';
@@ -0,0 +1,256 @@
+"""
+Idempotency keys for POST /applications.
+
+Browsers and API Gateway retry /applications after a timeout. Each request is
+identified by its Idempotency-Key header or, without one, by a key derived
+from the email, receipt storage key and partnership tier. Before inserting,
+/applications claims the key in idempotency_keys; the result is written to
+the same row inside the insert transaction, so a committed application and
+its completed key are never out of step.
+
+- completed key: the stored result is replayed; nothing is inserted, queued
+  or sent again
+- key claimed by a request still running (an in-flight duplicate): wait up
+  to IDEMPOTENCY_WAIT_SECONDS for it to complete and replay its result,
+  otherwise answer 409 so the client retries later
+- claim older than IDEMPOTENCY_LOCK_SECONDS: the request that made it died,
+  so the claim is taken over
+- header key reused with a different body: 422
+
+Each claim carries a random claim_token. Completing or releasing a key only
+touches the row while it still holds that token, so a request whose claim was
+taken over (it outlived IDEMPOTENCY_LOCK_SECONDS) cannot overwrite the new
+owner's result: complete_request raises ClaimLostError and its transaction
+rolls back.
+
+Failed requests release their claim so a retry can run.
+"""
+import json
+import time
+import uuid
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+import pymysql
+
+from connection_manager import connection_manager
+import config
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 128
+DUPLICATE_ENTRY = 1062
+
+KEY_IN_PROGRESS = 'in_progress'
+KEY_COMPLETED = 'completed'
+
+# IdempotentRequest.outcome values
+CLAIMED = 'claimed'
+REPLAY = 'replay'
+IN_FLIGHT = 'in_flight'
+MISMATCH = 'mismatch'
+
+
+class ClaimLostError(Exception):
+    """The idempotency key is no longer held by this request's claim."""
+
+
+class IdempotentRequest:
+    """Outcome of claim_request(); result is set for REPLAY, token for CLAIMED"""
+
+    __slots__ = ('key', 'outcome', 'result', 'derived', 'token')
+
+    def __init__(self, key: str, outcome: str, result: Optional[Dict[str, Any]] = None, derived: bool = False,
+                 token: Optional[str] = None):
+        self.key = key
+        self.outcome = outcome
+        self.result = result
+        self.derived = derived
+        self.token = token
+
+
+def _header(headers: Dict[str, str], name: str) -> Optional[str]:
+    lowered = name.lower()
+    for header, value in (headers or {}).items():
+        if header.lower() == lowered:
+            return value
+    return None
+
+
+def request_hash(body: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def idempotency_key_for(headers: Dict[str, str], body: Dict[str, Any]):
+    """Return (key, derived) for a request; derived keys come from email + receipt key + tier."""
+    key = (_header(headers, IDEMPOTENCY_HEADER) or '').strip()
+    if key:
+        return key[:MAX_KEY_LENGTH], False
+
+    parts = [
+        str(body.get('email') or '').strip().lower(),
+        str(body.get('receiptStorageKey') or '').strip(),
+        str(body.get('partnershipTier') or '').strip().lower()
+    ]
+    return 'derived:' + hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest(), True
+
+
+def _try_claim(cursor, key: str, body_hash: str, token: str) -> bool:
+    try:
+        cursor.execute("""
+            INSERT INTO idempotency_keys (
+                idempotency_key, request_hash, status, result, claim_token,
+                locked_until, expires_at, created_at, updated_at
+            ) VALUES (
+                %s, %s, %s, NULL, %s,
+                NOW() + INTERVAL %s SECOND, NOW() + INTERVAL %s SECOND, NOW(), NOW()
+            )
+        """, (key, body_hash, KEY_IN_PROGRESS, token,
+              config.IDEMPOTENCY_LOCK_SECONDS, config.IDEMPOTENCY_TTL_SECONDS))
+        return True
+    except pymysql.IntegrityError as e:
+        if e.args and e.args[0] == DUPLICATE_ENTRY:
+            return False
+        raise
+
+
+def _take_over(cursor, key: str, body_hash: str, token: str) -> bool:
+    """Reclaim an expired key or an abandoned in-progress claim; False if another request got it first."""
+    cursor.execute("""
+        UPDATE idempotency_keys
+        SET request_hash = %s,
+            status = %s,
+            result = NULL,
+            claim_token = %s,
+            locked_until = NOW() + INTERVAL %s SECOND,
+            expires_at = NOW() + INTERVAL %s SECOND,
+            updated_at = NOW()
+        WHERE idempotency_key = %s
+          AND (expires_at <= NOW() OR (status = %s AND locked_until <= NOW()))
+    """, (body_hash, KEY_IN_PROGRESS, token, config.IDEMPOTENCY_LOCK_SECONDS, config.IDEMPOTENCY_TTL_SECONDS,
+          key, KEY_IN_PROGRESS))
+    return cursor.rowcount == 1
+
+
+def _existing(cursor, key: str) -> Optional[Dict[str, Any]]:
+    cursor.execute("""
+        SELECT request_hash, status, result,
+               locked_until <= NOW() AS lock_expired,
+               expires_at <= NOW() AS expired
+        FROM idempotency_keys
+        WHERE idempotency_key = %s
+    """, (key,))
+    return cursor.fetchone()
+
+
+def _decode_result(value) -> Optional[Dict[str, Any]]:
+    if value is None or isinstance(value, dict):
+        return value
+    return json.loads(value)
+
+
+def _claim_once(key: str, body_hash: str, derived: bool) -> IdempotentRequest:
+    token = uuid.uuid4().hex
+    connection = connection_manager.acquire()
+    discard = False
+    try:
+        with connection.cursor() as cursor:
+            if _try_claim(cursor, key, body_hash, token):
+                outcome = IdempotentRequest(key, CLAIMED, derived=derived, token=token)
+            else:
+                row = _existing(cursor, key)
+                if row is None or row['expired'] or (row['status'] == KEY_IN_PROGRESS and row['lock_expired']):
+                    # Expired, abandoned or deleted since the INSERT: claim it again
+                    if row:
+                        claimed = _take_over(cursor, key, body_hash, token)
+                    else:
+                        claimed = _try_claim(cursor, key, body_hash, token)
+                    outcome = IdempotentRequest(key, CLAIMED if claimed else IN_FLIGHT, derived=derived,
+                                                token=token if claimed else None)
+                elif not derived and row['request_hash'] != body_hash:
+                    # Derived keys already encode what makes two submissions the same
+                    outcome = IdempotentRequest(key, MISMATCH, derived=derived)
+                elif row['status'] == KEY_COMPLETED:
+                    outcome = IdempotentRequest(key, REPLAY, _decode_result(row['result']), derived=derived)
+                else:
+                    outcome = IdempotentRequest(key, IN_FLIGHT, derived=derived)
+        connection.commit()
+        return outcome
+    except Exception:
+        discard = True
+        raise
+    finally:
+        connection_manager.release(connection, discard=discard)
+
+
+def claim_request(headers: Dict[str, str], body: Dict[str, Any]) -> IdempotentRequest:
+    """
+    Claim the request's idempotency key before doing any work.
+
+    An in-flight duplicate is polled until the first request completes (REPLAY)
+    or IDEMPOTENCY_WAIT_SECONDS runs out (IN_FLIGHT).
+    """
+    key, derived = idempotency_key_for(headers, body)
+    body_hash = request_hash(body)
+    deadline = time.monotonic() + config.IDEMPOTENCY_WAIT_SECONDS
+
+    while True:
+        claim = _claim_once(key, body_hash, derived)
+        if claim.outcome != IN_FLIGHT or time.monotonic() >= deadline:
+            break
+        time.sleep(config.IDEMPOTENCY_POLL_INTERVAL)
+
+    log = logger.info if claim.outcome == CLAIMED else logger.warning
+    log("Idempotency key %s", claim.outcome, extra={
+        'idempotency_key': key,
+        'derived_key': derived,
+        'outcome': claim.outcome
+    })
+    return claim
+
+
+def complete_request(cursor, key: str, token: str, result: Dict[str, Any]) -> None:
+    """
+    Store the result using the caller's cursor, inside the transaction that produced it.
+
+    Raises ClaimLostError if the key is no longer this request's in-progress
+    claim; the caller must roll back.
+    """
+    cursor.execute("""
+        UPDATE idempotency_keys
+        SET status = %s,
+            result = %s,
+            updated_at = NOW()
+        WHERE idempotency_key = %s
+          AND status = %s
+          AND claim_token = %s
+    """, (KEY_COMPLETED, json.dumps(result, default=str), key, KEY_IN_PROGRESS, token))
+    if cursor.rowcount != 1:
+        raise ClaimLostError(f"Idempotency key {key} was taken over by another request")
+
+
+def release_request(key: str, token: str) -> None:
+    """Drop an in-progress claim after a failed request so a retry can run; never raises."""
+    connection = None
+    discard = False
+    try:
+        connection = connection_manager.acquire()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM idempotency_keys WHERE idempotency_key = %s AND status = %s AND claim_token = %s",
+                (key, KEY_IN_PROGRESS, token)
+            )
+        connection.commit()
+    except Exception as e:
+        discard = True
+        # The claim expires after IDEMPOTENCY_LOCK_SECONDS anyway
+        logger.warning("⚠ Could not release idempotency key", extra={
+            'idempotency_key': key,
+            'error_type': type(e).__name__,
+            'error_message': str(e)
+        })
+    finally:
+        if connection is not None:
+            connection_manager.release(connection, discard=discard)
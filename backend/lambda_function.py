@@ -1,12 +1,9 @@
 import json
 import os
 import sys
-import pymysql
-import logging
 import re
-import requests
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import platform
 
 # Add services directory to path for imports
@@ -15,36 +12,62 @@ services_dir = os.path.join(current_dir, 'services')
 if services_dir not in sys.path:
     sys.path.insert(0, services_dir)
 
+# Imported first: its clock measures everything below
+from services import init_profiler
+from services.init_profiler import timed_import
+from services.log_control import begin_invocation, configure_logging, get_logger
+from services.tracing import span, traced_request
+
+with timed_import('pymysql'):
+    import pymysql
+
 # Import services - simplified approach like reference backend
-from services.presign_service import handle_presign_request
-from services.textract_service import extract_amount_from_receipt
-from services.email_service import send_partnership_confirmation_email
-from services.pdf_generator import generate_pdf, load_template_from_s3, generate_pdf_filename
+with timed_import('services.presign_service'):
+    from services.presign_service import handle_presign_request
+with timed_import('services.confirmation_service'):
+    from services.confirmation_service import enqueue_application_confirmation
+with timed_import('services.pxier_service'):
+    from services.pxier_service import build_pxier_payload
+with timed_import('connection_manager'):
+    from connection_manager import connection_manager
+# Before receipt_worker, which imports it too, so its time is not counted there
+with timed_import('receipt_upload_handler'):
+    from receipt_upload_handler import get_precomputed_amount
+with timed_import('receipt_worker'):
+    from receipt_worker import enqueue_receipt_extraction, PENDING_EXTRACTION
+with timed_import('pxier_outbox'):
+    from pxier_outbox import add_pxier_outbox_row, enqueue_pxier_outbox_drain
+with timed_import('idempotency'):
+    from idempotency import (
+        claim_request,
+        complete_request,
+        release_request,
+        ClaimLostError,
+        IDEMPOTENCY_HEADER,
+        REPLAY,
+        IN_FLIGHT,
+        MISMATCH
+    )
 import config
 
 # Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-
-# Log import status for debugging
-logger.info("=" * 60)
-logger.info("Lambda Function Initialization - Import Status")
-logger.info("=" * 60)
-logger.info(f"Python Version: {sys.version}")
-logger.info(f"Platform: {platform.platform()}")
-logger.info(f"Machine: {platform.machine()}")
-logger.info(f"Processor: {platform.processor()}")
-logger.info("✓ presign_service: Available")
-logger.info("✓ textract_service: Available")
-logger.info("✓ email_service: Available")
-logger.info("✓ pdf_generator: Available (lazy imports)")
-logger.info("✓ config module: Available")
-logger.info(f"Template Config - TEMPLATE_BUCKET: {config.TEMPLATE_BUCKET or 'NOT SET'}")
-logger.info(f"Template Config - TEMPLATE_KEY: {config.TEMPLATE_KEY or 'NOT SET'}")
-logger.info("=" * 60)
-logger.info("Note: reportlab/pdfrw loaded lazily when PDF generation is called")
-
-
+configure_logging()
+logger = get_logger(__name__)
+
+# One init line; platform.processor() is left out because it shells out to uname
+logger.info("Lambda function initialized", extra={
+    'python_version': platform.python_version(),
+    'platform': platform.platform(),
+    'machine': platform.machine(),
+    'template_bucket': config.TEMPLATE_BUCKET or 'NOT SET',
+    'template_key': config.TEMPLATE_KEY or 'NOT SET'
+})
+# boto3 and requests are not imported here; boto3 loads with the first AWS client
+# (see Client.* in the cold start metrics) and requests only in pxier_outbox
+init_profiler.mark_init_complete()
+
+
+@init_profiler.profiled_handler
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     AWS Lambda function to handle all corporate partnership API requests.
@@ -56,6 +79,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     - OPTIONS /* - CORS preflight
     """
 
+    begin_invocation()
+
     # Get the path and method from event
     path = event.get('path', event.get('resource', ''))
     http_method = event.get('httpMethod', 'POST')
@@ -67,7 +92,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         'Content-Type': 'application/json',
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Methods': 'POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization, Idempotency-Key'
     }
 
     logger.info("=== LAMBDA HANDLER START ===", extra={
@@ -76,7 +101,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         'path': path,
         'resource': event.get('resource'),
         'request_id': getattr(context, 'aws_request_id', 'N/A') if context else 'N/A',
-        'origin': origin,
+        'cold_start': init_profiler.is_cold_start(),
+        'origin': origin
+    })
+    logger.debug("Request headers", extra=lambda: {
         'cors_headers_set': headers,
         'all_request_headers': request_headers
     })
@@ -120,7 +148,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
 def handle_presign_route(event: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
     """Handle presign URL generation requests"""
-    logger.info("=== PRESIGN ROUTE DEBUG START ===")
+    logger.debug("=== PRESIGN ROUTE DEBUG START ===")
 
     try:
         if not handle_presign_request:
@@ -147,14 +175,16 @@ def handle_presign_route(event: Dict[str, Any], headers: Dict[str, str]) -> Dict
         origin = request_headers.get('origin') or request_headers.get('Origin') or 'UNKNOWN'
 
         logger.info("Presign request parsed", extra={
-            'body_keys': list(body.keys()),
             'file_name': body.get('fileName'),
             'file_type': body.get('fileType'),
             'origin': origin,
+            'request_id': event.get('requestContext', {}).get('requestId', 'N/A')
+        })
+        logger.debug("Presign request details", extra=lambda: {
+            'body_keys': list(body.keys()),
             'all_headers': request_headers,
             'referer': request_headers.get('referer') or request_headers.get('Referer'),
-            'user_agent': request_headers.get('user-agent') or request_headers.get('User-Agent'),
-            'request_id': event.get('requestContext', {}).get('requestId', 'N/A')
+            'user_agent': request_headers.get('user-agent') or request_headers.get('User-Agent')
         })
 
         # Build request context
@@ -167,7 +197,7 @@ def handle_presign_route(event: Dict[str, Any], headers: Dict[str, str]) -> Dict
         # Call presign service with context
         result = handle_presign_request(body, request_context)
 
-        logger.info("Presign service returned", extra={
+        logger.debug("Presign service returned", extra=lambda: {
             'result_keys': list(result.keys()),
             'status_code': result.get('statusCode'),
             'has_upload_url': 'uploadUrl' in result,
@@ -184,12 +214,8 @@ def handle_presign_route(event: Dict[str, Any], headers: Dict[str, str]) -> Dict
             }
 
             logger.info("✓ Returning presign success response", extra={
-                'upload_url_preview': result['uploadUrl'][:100] + '...',
-                'upload_url_full': result['uploadUrl'],
                 'storage_key': result['key'],
-                'bucket': result.get('bucket'),
-                'response_headers': headers,
-                'cors_enabled': 'Access-Control-Allow-Origin' in headers
+                'bucket': result.get('bucket')
             })
 
             final_response = {
@@ -198,7 +224,7 @@ def handle_presign_route(event: Dict[str, Any], headers: Dict[str, str]) -> Dict
                 'body': json.dumps(response_body)
             }
 
-            logger.info("Final response prepared", extra={
+            logger.debug("Final response prepared", extra=lambda: {
                 'status_code': 200,
                 'response_headers': final_response['headers'],
                 'body_keys': list(response_body.keys())
@@ -236,9 +262,64 @@ def handle_presign_route(event: Dict[str, Any], headers: Dict[str, str]) -> Dict
             'body': json.dumps({'error': str(e)})
         }
     finally:
-        logger.info("=== PRESIGN ROUTE DEBUG END ===")
+        logger.debug("=== PRESIGN ROUTE DEBUG END ===")
+
+
+def validate_application(body: Dict[str, Any]) -> Optional[str]:
+    """Check an /applications body; returns the 400 error message, or None if it is valid."""
+    # Validate required fields
+    # Base required fields for all users
+    required_fields = [
+        'firstName', 'lastName', 'email', 'phone',
+        'countryCode', 'nric', 'partnershipTier', 'termsAccepted'
+    ]
+
+    # Add business-specific fields only if user is a business owner
+    is_not_business_owner = body.get('notBusinessOwner', False)
+    if not is_not_business_owner:
+        required_fields.extend(['position', 'companyName', 'industry'])
+
+    missing_fields = [field for field in required_fields if not body.get(field)]
+    if missing_fields:
+        logger.warning("Missing required fields in request", extra={
+            'missing_fields': missing_fields,
+            'provided_fields': [f for f in required_fields if f not in missing_fields],
+            'email': body.get('email', 'NOT_PROVIDED'),
+            'is_not_business_owner': is_not_business_owner
+        })
+        return f'Missing required fields: {", ".join(missing_fields)}'
 
+    logger.debug("All required fields present")
 
+    # Validate email format
+    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    email_value = body['email'].strip()
+    if not re.match(email_pattern, email_value):
+        logger.warning("Invalid email format provided", extra={
+            'email_provided': email_value,
+            'email_pattern': email_pattern
+        })
+        return 'Invalid email format'
+
+    logger.debug("Email format validation passed", extra={'email': email_value})
+
+    # Validate NRIC format
+    nric_value = body['nric']
+    nric_digits = re.sub(r'[^0-9]', '', nric_value)
+    if len(nric_digits) != 12:
+        logger.warning("Invalid NRIC format provided", extra={
+            'nric_provided': nric_value,
+            'nric_digits_extracted': nric_digits,
+            'digit_count': len(nric_digits)
+        })
+        return 'Invalid NRIC format - must be 12 digits'
+
+    logger.debug("NRIC validation passed", extra={'nric_digits': nric_digits})
+
+    return None
+
+
+@traced_request('applications')
 def handle_application_route(event: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
     """Handle partnership application submission"""
     try:
@@ -251,20 +332,21 @@ def handle_application_route(event: Dict[str, Any], headers: Dict[str, str]) ->
                 'body': json.dumps({'error': 'No request body provided'})
             }
 
-        # Handle both direct invocation and API Gateway
-        if isinstance(event['body'], str):
-            try:
-                body = json.loads(event['body'])
-                logger.debug("Successfully parsed JSON from string body")
-            except json.JSONDecodeError as e:
-                logger.error("Failed to parse JSON from string body", extra={
-                    'error': str(e),
-                    'body_preview': str(event['body'])[:200]
-                })
-                raise
-        else:
-            body = event['body']
-            logger.debug("Using direct body object (non-string)")
+        with span('parse'):
+            # Handle both direct invocation and API Gateway
+            if isinstance(event['body'], str):
+                try:
+                    body = json.loads(event['body'])
+                    logger.debug("Successfully parsed JSON from string body")
+                except json.JSONDecodeError as e:
+                    logger.error("Failed to parse JSON from string body", extra={
+                        'error': str(e),
+                        'body_preview': str(event['body'])[:200]
+                    })
+                    raise
+            else:
+                body = event['body']
+                logger.debug("Using direct body object (non-string)")
 
         logger.info("Request body parsed successfully", extra={
             'body_keys': list(body.keys()) if body else [],
@@ -273,68 +355,35 @@ def handle_application_route(event: Dict[str, Any], headers: Dict[str, str]) ->
             'has_last_name': 'lastName' in body
         })
 
-        # Validate required fields
-        # Base required fields for all users
-        required_fields = [
-            'firstName', 'lastName', 'email', 'phone',
-            'countryCode', 'nric', 'partnershipTier', 'termsAccepted'
-        ]
-
-        # Add business-specific fields only if user is a business owner
-        is_not_business_owner = body.get('notBusinessOwner', False)
-        if not is_not_business_owner:
-            required_fields.extend(['position', 'companyName', 'industry'])
-
-        missing_fields = [field for field in required_fields if not body.get(field)]
-        if missing_fields:
-            logger.warning("Missing required fields in request", extra={
-                'missing_fields': missing_fields,
-                'provided_fields': [f for f in required_fields if f not in missing_fields],
-                'email': body.get('email', 'NOT_PROVIDED'),
-                'is_not_business_owner': is_not_business_owner
-            })
+        with span('validate'):
+            validation_error = validate_application(body)
+        if validation_error:
             return {
                 'statusCode': 400,
                 'headers': headers,
-                'body': json.dumps({
-                    'error': f'Missing required fields: {", ".join(missing_fields)}'
-                })
+                'body': json.dumps({'error': validation_error})
             }
-
-        logger.debug("All required fields present")
-
-        # Validate email format
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
         email_value = body['email'].strip()
-        if not re.match(email_pattern, email_value):
-            logger.warning("Invalid email format provided", extra={
-                'email_provided': email_value,
-                'email_pattern': email_pattern
-            })
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({'error': 'Invalid email format'})
-            }
-
-        logger.debug("Email format validation passed", extra={'email': email_value})
-
-        # Validate NRIC format
-        nric_value = body['nric']
-        nric_digits = re.sub(r'[^0-9]', '', nric_value)
-        if len(nric_digits) != 12:
-            logger.warning("Invalid NRIC format provided", extra={
-                'nric_provided': nric_value,
-                'nric_digits_extracted': nric_digits,
-                'digit_count': len(nric_digits)
-            })
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({'error': 'Invalid NRIC format - must be 12 digits'})
-            }
 
-        logger.debug("NRIC validation passed", extra={'nric_digits': nric_digits})
+        # A retried submission replays the stored result instead of inserting again
+        claim = None
+        if config.IDEMPOTENCY_ENABLED:
+            with span('idempotency_claim'):
+                claim = claim_request(event.get('headers') or {}, body)
+            if claim.outcome == REPLAY:
+                return build_application_response(headers, claim.result, replayed=True)
+            if claim.outcome == IN_FLIGHT:
+                return {
+                    'statusCode': 409,
+                    'headers': {**headers, 'Retry-After': '2'},
+                    'body': json.dumps({'error': 'This application is still being processed - please retry shortly'})
+                }
+            if claim.outcome == MISMATCH:
+                return {
+                    'statusCode': 422,
+                    'headers': headers,
+                    'body': json.dumps({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'})
+                }
 
         # Insert data into both tables
         logger.info("Starting database insertion process", extra={
@@ -342,27 +391,34 @@ def handle_application_route(event: Dict[str, Any], headers: Dict[str, str]) ->
             'first_name': body.get('firstName'),
             'last_name': body.get('lastName')
         })
-        result = insert_lead_and_partner_application(body)
+        try:
+            result = insert_lead_and_partner_application(
+                body,
+                idempotency_key=claim.key if claim else None,
+                claim_token=claim.token if claim else None
+            )
+        except ClaimLostError:
+            # Another request took the key over and owns the result; the client retry replays it
+            return {
+                'statusCode': 409,
+                'headers': {**headers, 'Retry-After': '2'},
+                'body': json.dumps({'error': 'This application is still being processed - please retry shortly'})
+            }
+        except Exception:
+            if claim:
+                release_request(claim.key, claim.token)
+            raise
 
         logger.info("Contact, partner application, and payment submitted successfully", extra={
             'email': email_value,
             'contact_id': result['contact_id'],
             'application_id': result['application_id'],
             'payment_id': result.get('payment_id'),
-            'payment_amount': result.get('payment_amount', 0.0)
+            'payment_amount': result.get('payment_amount', 0.0),
+            'payment_status': result.get('payment_status')
         })
 
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({
-                'message': 'Application submitted successfully',
-                'contactId': result['contact_id'],
-                'applicationId': result['application_id'],
-                'paymentId': result.get('payment_id'),
-                'paymentAmount': result.get('payment_amount', 0.0)
-            })
-        }
+        return build_application_response(headers, result)
 
     except json.JSONDecodeError as e:
         logger.error("JSON decode error in request body", extra={
@@ -388,6 +444,30 @@ def handle_application_route(event: Dict[str, Any], headers: Dict[str, str]) ->
         }
 
 
+def build_application_response(headers: Dict[str, str], result: Dict[str, Any], replayed: bool = False) -> Dict[str, Any]:
+    """200 response for a stored application; replays of an idempotent request are marked in a header."""
+    if replayed:
+        logger.info("Replaying stored application response", extra={
+            'contact_id': result['contact_id'],
+            'application_id': result['application_id'],
+            'payment_id': result.get('payment_id')
+        })
+        headers = {**headers, 'Idempotent-Replayed': 'true'}
+
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps({
+            'message': 'Application submitted successfully',
+            'contactId': result['contact_id'],
+            'applicationId': result['application_id'],
+            'paymentId': result.get('payment_id'),
+            'paymentAmount': result.get('payment_amount', 0.0),
+            'paymentStatus': result.get('payment_status')
+        })
+    }
+
+
 def extract_gender_from_nric(nric: str) -> str:
     """
     Extract gender from Malaysian NRIC.
@@ -429,201 +509,460 @@ def extract_gender_from_nric(nric: str) -> str:
 
 def get_db_connection():
     """
-    Create and return a MySQL database connection using environment variables.
+    Return a MySQL database connection for this invocation.
+
+    Warm containers reuse the connection opened by an earlier invocation;
+    hand it back with release_db_connection() instead of closing it.
     """
-    logger.debug("Attempting database connection", extra={
-        'db_host': os.environ.get('DB_HOST', 'NOT_SET'),
-        'db_name': os.environ.get('DB_NAME', 'NOT_SET'),
-        'db_user': os.environ.get('DB_USER', 'NOT_SET'),
-        'db_port': os.environ.get('DB_PORT', '3306')
-    })
+    connection = connection_manager.acquire()
+    logger.debug("Database connection acquired", extra=connection_manager.stats())
+    return connection
+
+
+def release_db_connection(connection, discard: bool = False) -> None:
+    """Return a connection from get_db_connection() to the warm-container cache."""
+    connection_manager.release(connection, discard=discard)
+
+
+def build_contact_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """contacts row for a validated /applications body."""
+    # Extract gender from NRIC
+    nric = data.get('nric', '')
+    gender = extract_gender_from_nric(nric) if nric else 'prefer_not_to_say'
+
+    return {
+        'first_name': data.get('firstName', '').strip(),
+        'last_name': data.get('lastName', '').strip(),
+        # Matches the LOWER(TRIM(email_address)) the contacts trigger stores in email_normalized
+        'email_address': data['email'].strip().lower(),
+        'gender': gender,
+        'phone_number': data['phone'],
+        'country_code': data.get('countryCode', ''),
+        'identification_card': nric,
+        'address_line_1': data.get('addressLine1', 'Not provided'),
+        'address_line_2': data.get('addressLine2', ''),
+        'city': data.get('city', 'Not provided'),
+        'state': data.get('state', 'Not provided'),
+        'postcode': data.get('postcode', '00000')
+    }
 
-    try:
-        connection = pymysql.connect(
-            host=os.environ['DB_HOST'],
-            user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'],
-            database=os.environ['DB_NAME'],
-            port=int(os.environ.get('DB_PORT', 3306)),
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            autocommit=False,
-            connect_timeout=10,
-            read_timeout=30,
-            write_timeout=30
-        )
-
-        logger.info("Database connection established successfully", extra={
-            'db_host': os.environ['DB_HOST'],
-            'db_name': os.environ['DB_NAME']
-        })
-        return connection
 
-    except KeyError as e:
-        logger.error("Missing required environment variable for database connection", extra={
-            'missing_variable': str(e),
-            'available_variables': list(os.environ.keys())
-        })
-        raise Exception(f"Database configuration error: Missing {str(e)}")
+def build_partner_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """partner_applications row (without contact_id) for a validated /applications body."""
+    # Handle business fields - use defaults if user is not a business owner
+    is_not_business_owner = data.get('notBusinessOwner', False)
+    utm_source = data.get('utmSource', '')
 
-    except pymysql.MySQLError as e:
-        logger.error("MySQL connection error", extra={
-            'error_code': e.args[0] if e.args else 'UNKNOWN',
-            'error_message': e.args[1] if len(e.args) > 1 else str(e),
-            'db_host': os.environ.get('DB_HOST', 'NOT_SET')
-        })
-        raise Exception("Database connection failed")
+    return {
+        'position': data.get('position', 'N/A') if not is_not_business_owner else 'N/A',
+        'company_name': data.get('companyName', 'Individual') if not is_not_business_owner else 'Individual',
+        'industry': data.get('industry', 'N/A') if not is_not_business_owner else 'N/A',
+        'partnership_tier': data['partnershipTier'],
+        'terms_accepted': data['termsAccepted'],
+        'total_payable': data.get('totalPayable', 0),
+        'receipt_storage_key': data.get('receiptStorageKey', ''),
+        'receipt_file_name': data.get('receiptFileName', ''),
+        'sales_rep': utm_source,  # Keep for backwards compatibility
+        'utm_source': utm_source,
+        'utm_medium': data.get('utmMedium', ''),
+        'referrer': data.get('referrer', '')
+    }
 
-    except Exception as e:
-        logger.error("Unexpected database connection error", extra={
-            'error_type': type(e).__name__,
-            'error_message': str(e)
-        }, exc_info=True)
-        raise
 
+def build_pxier_contact_data(contact_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Contact fields for the Pxier payload (pxier_outbox row and audit record)."""
+    return {
+        'first_name': contact_data['first_name'],
+        'last_name': contact_data['last_name'],
+        'email_address': contact_data['email_address'],
+        'phone_number': contact_data.get('phone_number'),
+        'address_line_1': contact_data.get('address_line_1'),
+        'address_line_2': contact_data.get('address_line_2'),
+        'city': contact_data.get('city'),
+        'state': contact_data.get('state'),
+        'postcode': contact_data.get('postcode')
+    }
 
-def build_pxier_payload(contact_data: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Build Pxier API payload from contact data.
 
-    Args:
-        contact_data: Contact data with keys:
-            - first_name, last_name, email_address, phone_number
-            - address_line_1, address_line_2, city, state, postcode
+# submit_partner_application parameter order: contact_data, then partner_data columns,
+# then the Pxier outbox contact data, audit payload, idempotency key and claim token
+SUBMIT_PROCEDURE_CONTACT_COLUMNS = (
+    'first_name', 'last_name', 'email_address', 'gender', 'phone_number',
+    'country_code', 'identification_card',
+    'address_line_1', 'address_line_2', 'city', 'state', 'postcode'
+)
+SUBMIT_PROCEDURE_APPLICATION_COLUMNS = (
+    'position', 'company_name', 'industry', 'partnership_tier',
+    'terms_accepted', 'total_payable', 'receipt_storage_key', 'receipt_file_name',
+    'sales_rep', 'utm_source', 'utm_medium', 'referrer'
+)
+# ER_SIGNAL_EXCEPTION and the message of the procedure's SIGNAL when the idempotency claim was lost
+SIGNAL_EXCEPTION = 1644
+CLAIM_LOST_MESSAGE = 'idempotency claim lost'
+
+
+def write_application_rows(
+    cursor,
+    contact_data: Dict[str, Any],
+    partner_data: Dict[str, Any],
+    receipt_key: str,
+    pxier_contact_data: Dict[str, Any],
+    pxier_payload: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Write the contact, application, payment, Pxier outbox and audit rows one statement at a time.
 
-    Returns:
-        Pxier API payload dict
+    Runs in the caller's transaction; call_submit_procedure() is the single
+    round-trip equivalent. partner_data is the partner_applications row
+    without contact_id.
+    """
+    email = contact_data['email_address']
+    first_name = contact_data['first_name']
+    last_name = contact_data['last_name']
+
+    # Resolve the contact in one statement: insert it, or on a duplicate email_normalized
+    # (unique; set by the contacts trigger) leave the existing row untouched and make its
+    # contact_id the LAST_INSERT_ID. Concurrent submissions with the same email serialize
+    # on the unique key instead of racing a SELECT into two inserts.
+    contact_upsert_query = """
+    INSERT INTO contacts (
+        first_name, last_name, email_address, gender, phone_number,
+        country_code, identification_card,
+        address_line_1, address_line_2, city, state, postcode,
+        lead_source, status, created_at, updated_at
+    ) VALUES (
+        %(first_name)s, %(last_name)s, %(email_address)s, %(gender)s, %(phone_number)s,
+        %(country_code)s, %(identification_card)s,
+        %(address_line_1)s, %(address_line_2)s, %(city)s, %(state)s,
+        %(postcode)s, 'ccp', 'converted', NOW(), NOW()
+    )
+    ON DUPLICATE KEY UPDATE contact_id = LAST_INSERT_ID(contact_id)
     """
-    # Validate Pxier configuration
-    pxier_token = os.environ.get('PXIER_ACCESS_TOKEN')
-
-    if not pxier_token:
-        logger.error("Pxier API access token not configured")
-        raise Exception("Pxier API credentials not configured. Please set PXIER_ACCESS_TOKEN environment variable.")
-
-    # Build customer name
-    customer_name = f"{contact_data.get('first_name', '')} {contact_data.get('last_name', '')}".strip()
-
-    # Prepare phone number
-    phone = contact_data.get('phone_number') or ''
-
-    # Prepare payload for Pxier API
-    payload = {
-        "accessToken": pxier_token,
-        "customerId": 0,  # 0 for new customer
-        "customerName": customer_name,
-        "countryCode": "US",
-        "stateCode": contact_data.get('state') or "",
-        "customerTypeCode": 0,
-        "langCode": "en",
-        "address1": contact_data.get('address_line_1') or "",
-        "address2": contact_data.get('address_line_2') or "",
-        "zipCode": contact_data.get('postcode') or "",
-        "city": contact_data.get('city') or "",
-        "contact": [{
-            "contactId": 0,  # 0 for new contact
-            "firstName": contact_data.get('first_name') or "",
-            "lastName": contact_data.get('last_name') or "",
-            "email": contact_data.get('email_address') or "",
-            "phone": phone,
-            "mobile": phone
-        }]
-    }
 
-    return payload
+    logger.debug("Executing contact upsert query", extra={
+        'query_params_keys': list(contact_data.keys()),
+        'email': email,
+        'first_name': first_name,
+        'last_name': last_name
+    })
+
+    with span('contact_upsert'):
+        affected_rows = cursor.execute(contact_upsert_query, contact_data)
+        contact_id = cursor.lastrowid
 
+    # 1 affected row: inserted. An existing contact reports 0, as the update leaves it
+    # unchanged (2 if a column had changed); pymysql does not set CLIENT_FOUND_ROWS.
+    # Tracked for the Pxier outbox and audit log.
+    is_new_contact = affected_rows == 1
+
+    if is_new_contact:
+        logger.info("Contact record inserted successfully", extra={
+            'contact_id': contact_id,
+            'email': email,
+            'first_name': first_name,
+            'last_name': last_name,
+            'table': 'contacts'
+        })
+    else:
+        logger.info("Reusing existing contact_id for email", extra={
+            'contact_id': contact_id,
+            'email': email,
+            'table': 'contacts'
+        })
 
-def create_pxier_customer(contact_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Now insert into partner_applications table with the contact_id
+    partner_insert_query = """
+    INSERT INTO partner_applications (
+        contact_id, position, company_name, industry, partnership_tier,
+        terms_accepted, total_payable,
+        receipt_storage_key, receipt_file_name,
+        sales_rep, utm_source, utm_medium, referrer,
+        submitted_at, status, created_at, updated_at
+    ) VALUES (
+        %(contact_id)s, %(position)s, %(company_name)s, %(industry)s,
+        %(partnership_tier)s, %(terms_accepted)s, %(total_payable)s,
+        %(receipt_storage_key)s, %(receipt_file_name)s,
+        %(sales_rep)s, %(utm_source)s, %(utm_medium)s, %(referrer)s,
+        NOW(), 'pending', NOW(), NOW()
+    )
     """
-    Create customer in Pxier API
 
-    Args:
-        contact_data: Contact data from database with keys:
-            - first_name, last_name, email_address, phone_number
-            - address_line_1, address_line_2, city, state, postcode
+    logger.debug("Executing partner application insertion query", extra={
+        'query_params_keys': list(partner_data.keys()),
+        'contact_id': contact_id,
+        'table': 'partner_applications'
+    })
 
-    Returns:
-        API response from Pxier with customerId and contactId
+    with span('application_insert'):
+        cursor.execute(partner_insert_query, dict(partner_data, contact_id=contact_id))
+        application_id = cursor.lastrowid
+
+    logger.info("Partner application record inserted successfully", extra={
+        'application_id': application_id,
+        'contact_id': contact_id,
+        'email': email
+    })
 
-    Raises:
-        Exception: If API call fails
+    # The receipt is normally OCR'd at upload time by receipt_upload_handler;
+    # if that result isn't ready, receipt_worker extracts the amount after
+    # commit so the Textract call never holds this transaction's row locks open
+    payment_amount = 0.0
+    payment_status = 'pending'
+    if receipt_key:
+        with span('receipt_lookup'):
+            precomputed_amount = get_precomputed_amount(cursor, receipt_key)
+        if precomputed_amount is not None:
+            payment_amount = precomputed_amount
+            logger.info("✓ Using receipt amount extracted at upload", extra={
+                'receipt_key': receipt_key,
+                'amount': payment_amount
+            })
+        else:
+            payment_status = PENDING_EXTRACTION
+
+    # Insert into payments table
+    payment_insert_query = """
+    INSERT INTO payments (
+        contact_id, partner_application_id, amount,
+        payment_method, payment_type, description,
+        official_receipt, attachment, status,
+        transaction_datetime, created_at, updated_at
+    ) VALUES (
+        %(contact_id)s, %(partner_application_id)s, %(amount)s,
+        %(payment_method)s, %(payment_type)s, %(description)s,
+        %(official_receipt)s, %(attachment)s, %(status)s,
+        NOW(), NOW(), NOW()
+    )
     """
-    logger.info("Creating Pxier customer", extra={
-        'first_name': contact_data.get('first_name'),
-        'last_name': contact_data.get('last_name'),
-        'email': contact_data.get('email_address')
+
+    # Format: "membership_fee - LastName FirstName"
+    payment_description = f"membership_fee - {last_name} {first_name}"
+
+    payment_data = {
+        'contact_id': contact_id,
+        'partner_application_id': application_id,
+        'amount': payment_amount,
+        'payment_method': 'bank_transfer',  # Assuming bank transfer since they upload receipt
+        'payment_type': 'membership_fee',  # Changed from partnership_fee for proper redirect logic
+        'description': payment_description,
+        'official_receipt': receipt_key,
+        'attachment': receipt_key,  # S3 path stored in attachment field
+        'status': payment_status
+    }
+
+    logger.debug("Executing payment insertion query", extra={
+        'query_params_keys': list(payment_data.keys()),
+        'contact_id': contact_id,
+        'partner_application_id': application_id,
+        'amount': payment_amount,
+        'table': 'payments'
     })
 
-    # Validate Pxier configuration
-    pxier_username = os.environ.get('PXIER_USERNAME')
-    pxier_password = os.environ.get('PXIER_PASSWORD')
-    pxier_platform = os.environ.get('PXIER_PLATFORM_ADDRESS')
+    with span('payment_insert'):
+        cursor.execute(payment_insert_query, payment_data)
+        payment_id = cursor.lastrowid
+
+    logger.info("Payment record inserted successfully", extra={
+        'payment_id': payment_id,
+        'contact_id': contact_id,
+        'partner_application_id': application_id,
+        'amount': payment_amount,
+        'status': payment_status,
+        'receipt_key': receipt_key
+    })
 
-    if not pxier_username or not pxier_password or not pxier_platform:
-        logger.error("Pxier API credentials not configured")
-        raise Exception("Pxier API credentials not configured. Please set PXIER_USERNAME, PXIER_PASSWORD, and PXIER_PLATFORM_ADDRESS environment variables.")
+    # Queue Pxier customer creation ONLY for NEW contacts
+    pxier_outbox_id = None
+
+    if is_new_contact:
+        # NEW CONTACT: Write a pxier_outbox row in this transaction; the outbox
+        # drain creates the customer and writes back pxier_customer_id
+        with span('pxier_outbox'):
+            pxier_outbox_id = add_pxier_outbox_row(
+                cursor,
+                contact_id=contact_id,
+                application_id=application_id,
+                contact_data=pxier_contact_data
+            )
 
-    # Build Pxier API URL
-    pxier_url = f"{pxier_platform}/events/updateCustomer"
+        logger.info("Queued Pxier customer creation for NEW contact", extra={
+            'contact_id': contact_id,
+            'application_id': application_id,
+            'pxier_outbox_id': pxier_outbox_id
+        })
 
-    # Build payload using helper function
-    payload = build_pxier_payload(contact_data)
+        # Create audit record for NEW contact
+        try:
+            audit_insert_query = """
+            INSERT INTO contact_audits (
+                contact_id, email_address, phone_number, booking_id,
+                action, source, payload, created_at
+            ) VALUES (
+                %s, %s, %s, %s, %s, %s, %s, NOW()
+            )
+            """
+            with span('audit_insert'):
+                cursor.execute(audit_insert_query, (
+                    contact_id,
+                    email,
+                    contact_data.get('phone_number'),
+                    application_id,
+                    'created',
+                    'corporate_form',
+                    json.dumps(pxier_payload) if pxier_payload else None
+                ))
+            logger.info("Created audit record for NEW contact", extra={
+                'contact_id': contact_id,
+                'application_id': application_id,
+                'action': 'created'
+            })
+        except Exception as e:
+            logger.error("Failed to create audit record for new contact", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e),
+                'contact_id': contact_id
+            }, exc_info=True)
+
+    else:
+        # EXISTING CONTACT: Skip Pxier, create audit with action='proposed_update'
+        logger.info("Skipping Pxier update for EXISTING contact", extra={
+            'contact_id': contact_id,
+            'email': email
+        })
 
-    headers = {
-        "Content-Type": "application/json"
+        # Create audit record for EXISTING contact
+        try:
+            audit_insert_query = """
+            INSERT INTO contact_audits (
+                contact_id, email_address, phone_number, booking_id,
+                action, source, payload, created_at
+            ) VALUES (
+                %s, %s, %s, %s, %s, %s, %s, NOW()
+            )
+            """
+            with span('audit_insert'):
+                cursor.execute(audit_insert_query, (
+                    contact_id,
+                    email,
+                    contact_data.get('phone_number'),
+                    application_id,
+                    'proposed_update',
+                    'corporate_form',
+                    json.dumps(pxier_payload) if pxier_payload else None
+                ))
+            logger.info("Created audit record for EXISTING contact", extra={
+                'contact_id': contact_id,
+                'application_id': application_id,
+                'action': 'proposed_update'
+            })
+        except Exception as e:
+            logger.error("Failed to create audit record for existing contact", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e),
+                'contact_id': contact_id
+            }, exc_info=True)
+
+    return {
+        'contact_id': contact_id,
+        'is_new_contact': is_new_contact,
+        'application_id': application_id,
+        'payment_id': payment_id,
+        'payment_amount': payment_amount,
+        'payment_status': payment_status,
+        'pxier_outbox_id': pxier_outbox_id
     }
 
+
+def call_submit_procedure(
+    cursor,
+    contact_data: Dict[str, Any],
+    partner_data: Dict[str, Any],
+    pxier_contact_data: Dict[str, Any],
+    pxier_payload: Optional[Dict[str, Any]],
+    idempotency_key: Optional[str] = None,
+    claim_token: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Write the same rows as write_application_rows() with one CALL to submit_partner_application.
+
+    The procedure (database_migration_submit_procedure.sql) also completes the
+    idempotency key, so the transaction costs this CALL plus the COMMIT.
+    Raises ClaimLostError, like complete_request(), if claim_token no longer
+    holds the key.
+    """
+    args = [contact_data[column] for column in SUBMIT_PROCEDURE_CONTACT_COLUMNS]
+    args += [partner_data[column] for column in SUBMIT_PROCEDURE_APPLICATION_COLUMNS]
+    args += [
+        json.dumps(pxier_contact_data),
+        json.dumps(pxier_payload) if pxier_payload else None,
+        idempotency_key,
+        claim_token
+    ]
+    placeholders = ', '.join(['%s'] * len(args))
+
     try:
-        logger.info(f"Sending request to Pxier API")
-        logger.debug(f"Pxier API URL: {pxier_url}")
-
-        response = requests.post(
-            pxier_url,
-            data=json.dumps(payload),
-            headers=headers,
-            auth=requests.auth.HTTPBasicAuth(pxier_username, pxier_password),
-            timeout=30
-        )
-
-        response.raise_for_status()
-        result = response.json()
-
-        if result.get("error") == False:
-            logger.info("Pxier customer created successfully", extra={
-                'pxier_customer_id': result.get('data', {}).get('customerId'),
-                'pxier_contact_id': result.get('data', {}).get('contactId')
-            })
-            return result
-        else:
-            error_msg = result.get('message', 'Unknown error')
-            logger.error(f"Pxier API returned error: {result}")
-            raise Exception(f"Pxier API error: {error_msg}")
-
-    except requests.exceptions.Timeout:
-        logger.error(f"Pxier API request timeout")
-        raise Exception("Pxier API request timed out")
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"Pxier API HTTP error: {str(e)}", exc_info=True)
-        raise Exception(f"Pxier API HTTP error: {str(e)}")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Pxier API request failed: {str(e)}", exc_info=True)
-        raise Exception(f"Failed to communicate with Pxier API: {str(e)}")
-
-
-def insert_lead_and_partner_application(data: Dict[str, Any]) -> Dict[str, Any]:
+        cursor.execute(f"CALL submit_partner_application({placeholders})", args)
+    except pymysql.MySQLError as e:
+        if e.args and e.args[0] == SIGNAL_EXCEPTION and CLAIM_LOST_MESSAGE in str(e.args[-1]):
+            raise ClaimLostError(f"Idempotency key {idempotency_key} was taken over by another request") from e
+        raise
+    row = cursor.fetchone()
+    # Read the CALL status result too, or the COMMIT that follows is out of sync
+    while cursor.nextset():
+        pass
+
+    if row['audit_failed']:
+        # Same as the statement path: a failed audit insert does not fail the submission
+        logger.error("Failed to create audit record in submit procedure", extra={
+            'contact_id': row['contact_id'],
+            'application_id': row['application_id']
+        })
+
+    logger.info("Application rows written by submit procedure", extra={
+        'contact_id': row['contact_id'],
+        'is_new_contact': bool(row['is_new_contact']),
+        'application_id': row['application_id'],
+        'payment_id': row['payment_id'],
+        'payment_status': row['payment_status'],
+        'pxier_outbox_id': row['pxier_outbox_id']
+    })
+
+    return {
+        'contact_id': row['contact_id'],
+        'is_new_contact': bool(row['is_new_contact']),
+        'application_id': row['application_id'],
+        'payment_id': row['payment_id'],
+        'payment_amount': float(row['payment_amount']),
+        'payment_status': row['payment_status'],
+        'pxier_outbox_id': row['pxier_outbox_id']
+    }
+
+
+def insert_lead_and_partner_application(
+    data: Dict[str, Any],
+    idempotency_key: Optional[str] = None,
+    claim_token: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Insert data into contacts, partner_applications, and payments tables in a single transaction.
 
     Flow:
-    1. Insert into contacts table -> get contact_id
+    1. Upsert into contacts on the unique email_normalized -> get contact_id (new or existing)
     2. Insert into partner_applications table -> get application_id
-    3. Extract receipt amount using Textract
-    4. Insert into payments table with extracted amount
+    3. Insert into payments table with status 'pending_extraction'
+    4. For new contacts, insert a pxier_outbox row for Pxier customer creation
+    5. With an idempotency_key (claimed by idempotency.claim_request), store the result on it;
+       ClaimLostError if claim_token no longer holds the key (the transaction is rolled back)
+    6. After commit, enqueue receipt_worker and the Pxier outbox drain
+
+    Steps 1-5 run as write_application_rows() statements or, with
+    SUBMIT_PROCEDURE_ENABLED, as one call_submit_procedure() CALL.
 
     Returns dict with contact_id, application_id, and payment_id
     """
     connection = None
-    email = data['email'].lower()
+    # Same normalization as build_contact_data
+    email = data['email'].strip().lower()
 
     # Get first and last name directly from data
     first_name = data.get('firstName', '').strip()
@@ -632,7 +971,6 @@ def insert_lead_and_partner_application(data: Dict[str, Any]) -> Dict[str, Any]:
     # Get receipt information
     receipt_key = data.get('receiptStorageKey', '')
     receipt_file_name = data.get('receiptFileName', '')
-    bucket_name = os.environ.get('S3_BUCKET_NAME', '')
 
     # Get UTM parameters for tracking
     utm_source = data.get('utmSource', '')
@@ -648,225 +986,14 @@ def insert_lead_and_partner_application(data: Dict[str, Any]) -> Dict[str, Any]:
     })
 
     try:
-        connection = get_db_connection()
+        with span('db_connect'):
+            connection = get_db_connection()
         current_time = datetime.utcnow()
 
         with connection.cursor() as cursor:
-            # Extract gender from NRIC
-            nric = data.get('nric', '')
-            gender = extract_gender_from_nric(nric) if nric else 'prefer_not_to_say'
-
-            contact_data = {
-                'first_name': first_name,
-                'last_name': last_name,
-                'email_address': email,
-                'gender': gender,
-                'phone_number': data['phone'],
-                'country_code': data.get('countryCode', ''),
-                'identification_card': nric,
-                'address_line_1': data.get('addressLine1', 'Not provided'),
-                'address_line_2': data.get('addressLine2', ''),
-                'city': data.get('city', 'Not provided'),
-                'state': data.get('state', 'Not provided'),
-                'postcode': data.get('postcode', '00000')
-            }
-
-            # Resolve contact_id by email first (do not always insert a new contact)
-            cursor.execute(
-                """
-                SELECT contact_id
-                FROM contacts
-                WHERE LOWER(email_address) = %s
-                LIMIT 1
-                """,
-                (email,)
-            )
-            existing_contact = cursor.fetchone()
-
-            # Track whether this is a new or existing contact for audit purposes
-            is_new_contact = False
-
-            if existing_contact and existing_contact.get('contact_id'):
-                contact_id = existing_contact['contact_id']
-                is_new_contact = False
-                logger.info("Reusing existing contact_id for email", extra={
-                    'contact_id': contact_id,
-                    'email': email,
-                    'table': 'contacts'
-                })
-            else:
-                is_new_contact = True
-                # Insert into contacts table FIRST
-                contact_insert_query = """
-                INSERT INTO contacts (
-                    first_name, last_name, email_address, gender, phone_number,
-                    country_code, identification_card,
-                    address_line_1, address_line_2, city, state, postcode,
-                    lead_source, status, created_at, updated_at
-                ) VALUES (
-                    %(first_name)s, %(last_name)s, %(email_address)s, %(gender)s, %(phone_number)s,
-                    %(country_code)s, %(identification_card)s,
-                    %(address_line_1)s, %(address_line_2)s, %(city)s, %(state)s,
-                    %(postcode)s, 'ccp', 'converted', NOW(), NOW()
-                )
-                """
-
-                logger.debug("Executing contact insertion query", extra={
-                    'query_params_keys': list(contact_data.keys()),
-                    'email': email,
-                    'first_name': first_name,
-                    'last_name': last_name
-                })
-
-                cursor.execute(contact_insert_query, contact_data)
-                contact_id = cursor.lastrowid
-
-                logger.info("Contact record inserted successfully", extra={
-                    'contact_id': contact_id,
-                    'email': email,
-                    'first_name': first_name,
-                    'last_name': last_name,
-                    'table': 'contacts'
-                })
-
-            # Now insert into partner_applications table with the contact_id
-            partner_insert_query = """
-            INSERT INTO partner_applications (
-                contact_id, position, company_name, industry, partnership_tier,
-                terms_accepted, total_payable,
-                receipt_storage_key, receipt_file_name,
-                sales_rep, utm_source, utm_medium, referrer,
-                submitted_at, status, created_at, updated_at
-            ) VALUES (
-                %(contact_id)s, %(position)s, %(company_name)s, %(industry)s,
-                %(partnership_tier)s, %(terms_accepted)s, %(total_payable)s,
-                %(receipt_storage_key)s, %(receipt_file_name)s,
-                %(sales_rep)s, %(utm_source)s, %(utm_medium)s, %(referrer)s,
-                NOW(), 'pending', NOW(), NOW()
-            )
-            """
-
-            # Handle business fields - use defaults if user is not a business owner
-            is_not_business_owner = data.get('notBusinessOwner', False)
-
-            partner_data = {
-                'contact_id': contact_id,
-                'position': data.get('position', 'N/A') if not is_not_business_owner else 'N/A',
-                'company_name': data.get('companyName', 'Individual') if not is_not_business_owner else 'Individual',
-                'industry': data.get('industry', 'N/A') if not is_not_business_owner else 'N/A',
-                'partnership_tier': data['partnershipTier'],
-                'terms_accepted': data['termsAccepted'],
-                'total_payable': data.get('totalPayable', 0),
-                'receipt_storage_key': data.get('receiptStorageKey', ''),
-                'receipt_file_name': data.get('receiptFileName', ''),
-                'sales_rep': utm_source,  # Keep for backwards compatibility
-                'utm_source': utm_source,
-                'utm_medium': utm_medium,
-                'referrer': data.get('referrer', '')
-            }
-
-            logger.debug("Executing partner application insertion query", extra={
-                'query_params_keys': list(partner_data.keys()),
-                'contact_id': contact_id,
-                'table': 'partner_applications'
-            })
-
-            cursor.execute(partner_insert_query, partner_data)
-            application_id = cursor.lastrowid
-
-            logger.info("Partner application record inserted successfully", extra={
-                'application_id': application_id,
-                'contact_id': contact_id,
-                'email': email
-            })
-
-            # Extract amount from receipt using Textract if receipt exists
-            payment_amount = 0.0
-            if receipt_key and bucket_name and extract_amount_from_receipt:
-                logger.info("Extracting amount from receipt using Textract", extra={
-                    'bucket': bucket_name,
-                    'key': receipt_key
-                })
-                try:
-                    payment_amount = extract_amount_from_receipt(bucket_name, receipt_key)
-                    logger.info("Amount extracted from receipt", extra={
-                        'amount': payment_amount,
-                        'receipt_key': receipt_key
-                    })
-                except Exception as e:
-                    logger.error("Failed to extract amount from receipt", extra={
-                        'error_type': type(e).__name__,
-                        'error_message': str(e),
-                        'receipt_key': receipt_key
-                    }, exc_info=True)
-                    payment_amount = 0.0
-            else:
-                logger.info("Skipping Textract extraction", extra={
-                    'has_receipt_key': bool(receipt_key),
-                    'has_bucket_name': bool(bucket_name),
-                    'textract_available': bool(extract_amount_from_receipt)
-                })
-
-            # Insert into payments table
-            payment_insert_query = """
-            INSERT INTO payments (
-                contact_id, partner_application_id, amount,
-                payment_method, payment_type, description,
-                official_receipt, attachment, status,
-                transaction_datetime, created_at, updated_at
-            ) VALUES (
-                %(contact_id)s, %(partner_application_id)s, %(amount)s,
-                %(payment_method)s, %(payment_type)s, %(description)s,
-                %(official_receipt)s, %(attachment)s, 'pending',
-                NOW(), NOW(), NOW()
-            )
-            """
-
-            # Format: "membership_fee - LastName FirstName"
-            payment_description = f"membership_fee - {last_name} {first_name}"
-
-            payment_data = {
-                'contact_id': contact_id,
-                'partner_application_id': application_id,
-                'amount': payment_amount,
-                'payment_method': 'bank_transfer',  # Assuming bank transfer since they upload receipt
-                'payment_type': 'membership_fee',  # Changed from partnership_fee for proper redirect logic
-                'description': payment_description,
-                'official_receipt': receipt_key,
-                'attachment': receipt_key  # S3 path stored in attachment field
-            }
-
-            logger.debug("Executing payment insertion query", extra={
-                'query_params_keys': list(payment_data.keys()),
-                'contact_id': contact_id,
-                'partner_application_id': application_id,
-                'amount': payment_amount,
-                'table': 'payments'
-            })
-
-            cursor.execute(payment_insert_query, payment_data)
-            payment_id = cursor.lastrowid
-
-            logger.info("Payment record inserted successfully", extra={
-                'payment_id': payment_id,
-                'contact_id': contact_id,
-                'partner_application_id': application_id,
-                'amount': payment_amount,
-                'receipt_key': receipt_key
-            })
-
-            # Prepare contact data for Pxier payload (always build payload for audit)
-            pxier_contact_data = {
-                'first_name': first_name,
-                'last_name': last_name,
-                'email_address': email,
-                'phone_number': contact_data.get('phone_number'),
-                'address_line_1': contact_data.get('address_line_1'),
-                'address_line_2': contact_data.get('address_line_2'),
-                'city': contact_data.get('city'),
-                'state': contact_data.get('state'),
-                'postcode': contact_data.get('postcode')
-            }
+            contact_data = build_contact_data(data)
+            partner_data = build_partner_data(data)
+            pxier_contact_data = build_pxier_contact_data(contact_data)
 
             # Build Pxier payload for audit record
             pxier_payload = None
@@ -876,137 +1003,43 @@ def insert_lead_and_partner_application(data: Dict[str, Any]) -> Dict[str, Any]:
                 logger.error("Failed to build Pxier payload for audit", extra={
                     'error_type': type(e).__name__,
                     'error_message': str(e),
-                    'contact_id': contact_id
+                    'email': email
                 }, exc_info=True)
 
-            # Create customer in Pxier ONLY for NEW contacts
-            pxier_customer_id = None
-            pxier_contact_id = None
-
-            if is_new_contact:
-                # NEW CONTACT: Send to Pxier and create audit with action='created'
-                try:
-                    logger.info("Creating Pxier customer for NEW contact", extra={
-                        'contact_id': contact_id,
-                        'email': email
-                    })
-
-                    pxier_response = create_pxier_customer(pxier_contact_data)
-                    pxier_customer_id = pxier_response.get('data', {}).get('customerId')
-                    pxier_contact_id = pxier_response.get('data', {}).get('contactId')
-
-                    logger.info("Pxier customer created successfully", extra={
-                        'pxier_customer_id': pxier_customer_id,
-                        'pxier_contact_id': pxier_contact_id,
-                        'contact_id': contact_id
-                    })
-
-                    # Update contacts table with Pxier IDs
-                    cursor.execute("""
-                        UPDATE contacts
-                        SET pxier_customer_id = %s,
-                            pxier_contact_id = %s,
-                            became_customer_at = NOW(),
-                            updated_at = NOW()
-                        WHERE contact_id = %s
-                    """, (pxier_customer_id, pxier_contact_id, contact_id))
-
-                    # Update partner_applications with customer_id
-                    cursor.execute("""
-                        UPDATE partner_applications
-                        SET customer_id = %s,
-                            converted_to_customer_at = NOW(),
-                            updated_at = NOW()
-                        WHERE id = %s
-                    """, (pxier_customer_id, application_id))
-
-                    logger.info("Updated contacts and partner_applications with Pxier customer IDs", extra={
-                        'contact_id': contact_id,
-                        'application_id': application_id,
-                        'pxier_customer_id': pxier_customer_id
-                    })
-
-                except Exception as e:
-                    # Log error but don't fail the entire transaction
-                    # The application is still submitted even if Pxier creation fails
-                    logger.error("Failed to create Pxier customer (application still saved)", extra={
-                        'error_type': type(e).__name__,
-                        'error_message': str(e),
-                        'contact_id': contact_id,
-                        'application_id': application_id
-                    }, exc_info=True)
-
-                # Create audit record for NEW contact
-                try:
-                    audit_insert_query = """
-                    INSERT INTO contact_audits (
-                        contact_id, email_address, phone_number, booking_id,
-                        action, source, payload, created_at
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, NOW()
+            if config.SUBMIT_PROCEDURE_ENABLED:
+                # One CALL instead of a round trip per row; it also completes the idempotency key
+                with span('submit_procedure'):
+                    written = call_submit_procedure(
+                        cursor, contact_data, partner_data, pxier_contact_data, pxier_payload,
+                        idempotency_key, claim_token
                     )
-                    """
-                    cursor.execute(audit_insert_query, (
-                        contact_id,
-                        email,
-                        contact_data.get('phone_number'),
-                        application_id,
-                        'created',
-                        'corporate_form',
-                        json.dumps(pxier_payload) if pxier_payload else None
-                    ))
-                    logger.info("Created audit record for NEW contact", extra={
-                        'contact_id': contact_id,
-                        'application_id': application_id,
-                        'action': 'created'
-                    })
-                except Exception as e:
-                    logger.error("Failed to create audit record for new contact", extra={
-                        'error_type': type(e).__name__,
-                        'error_message': str(e),
-                        'contact_id': contact_id
-                    }, exc_info=True)
-
             else:
-                # EXISTING CONTACT: Skip Pxier, create audit with action='proposed_update'
-                logger.info("Skipping Pxier update for EXISTING contact", extra={
-                    'contact_id': contact_id,
-                    'email': email
-                })
+                written = write_application_rows(
+                    cursor, contact_data, partner_data, receipt_key, pxier_contact_data, pxier_payload
+                )
 
-                # Create audit record for EXISTING contact
-                try:
-                    audit_insert_query = """
-                    INSERT INTO contact_audits (
-                        contact_id, email_address, phone_number, booking_id,
-                        action, source, payload, created_at
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, NOW()
-                    )
-                    """
-                    cursor.execute(audit_insert_query, (
-                        contact_id,
-                        email,
-                        contact_data.get('phone_number'),
-                        application_id,
-                        'proposed_update',
-                        'corporate_form',
-                        json.dumps(pxier_payload) if pxier_payload else None
-                    ))
-                    logger.info("Created audit record for EXISTING contact", extra={
-                        'contact_id': contact_id,
-                        'application_id': application_id,
-                        'action': 'proposed_update'
-                    })
-                except Exception as e:
-                    logger.error("Failed to create audit record for existing contact", extra={
-                        'error_type': type(e).__name__,
-                        'error_message': str(e),
-                        'contact_id': contact_id
-                    }, exc_info=True)
+            contact_id = written['contact_id']
+            application_id = written['application_id']
+            payment_id = written['payment_id']
+            payment_amount = written['payment_amount']
+            payment_status = written['payment_status']
+            pxier_outbox_id = written['pxier_outbox_id']
+
+            result = {
+                'contact_id': contact_id,
+                'application_id': application_id,
+                'payment_id': payment_id,
+                'payment_amount': payment_amount,
+                'payment_status': payment_status
+            }
+
+            # Completed in this transaction, so a retry either sees the result or redoes everything
+            if idempotency_key and not config.SUBMIT_PROCEDURE_ENABLED:
+                complete_request(cursor, idempotency_key, claim_token, result)
 
             # Commit all inserts and updates
-            connection.commit()
+            with span('commit'):
+                connection.commit()
             logger.info("Database transaction committed successfully", extra={
                 'contact_id': contact_id,
                 'application_id': application_id,
@@ -1015,119 +1048,40 @@ def insert_lead_and_partner_application(data: Dict[str, Any]) -> Dict[str, Any]:
                 'first_name': first_name,
                 'last_name': last_name,
                 'payment_amount': payment_amount,
+                'payment_status': payment_status,
                 'tables_updated': ['contacts', 'partner_applications', 'payments']
             })
 
-            # Send confirmation email after successful commit
-            if send_partnership_confirmation_email:
-                try:
-                    # Get CC addresses from environment variable (comma-separated)
-                    cc_addresses_str = os.environ.get('SES_CC_ADDRESSES', '')
-                    cc_addresses = []
-                    if cc_addresses_str:
-                        cc_addresses = [addr.strip() for addr in cc_addresses_str.split(',') if addr.strip()]
-
-                    logger.info("Sending confirmation email", extra={
-                        'recipient_email': email,
-                        'application_id': application_id,
-                        'has_cc_addresses': bool(cc_addresses),
-                        'cc_count': len(cc_addresses) if cc_addresses else 0
-                    })
-
-                    # Generate PDF attachment - simplified approach
-                    pdf_bytes = None
-                    pdf_filename = None
-
-                    # Check if template is configured
-                    if config.TEMPLATE_BUCKET and config.TEMPLATE_KEY:
-                        try:
-                            logger.info("Generating PDF attachment from template", extra={
-                                'application_id': application_id,
-                                'template_bucket': config.TEMPLATE_BUCKET,
-                                'template_key': config.TEMPLATE_KEY
-                            })
-
-                            # Load template from S3
-                            template_bytes = load_template_from_s3(
-                                config.TEMPLATE_BUCKET,
-                                config.TEMPLATE_KEY
-                            )
-
-                            # Generate PDF with overlay and signature
-                            pdf_bytes = generate_pdf(
-                                template_bytes=template_bytes,
-                                application_data=data,
-                                placeholder_positions=config.PLACEHOLDER_POSITIONS,
-                                signature_position=config.SIGNATURE_POSITION,
-                                signature_size=config.SIGNATURE_SIZE
-                            )
-
-                            pdf_filename = generate_pdf_filename(
-                                f"{first_name} {last_name}",
-                                data.get('phone', '0000')
-                            )
-
-                            logger.info("✓ PDF generated successfully", extra={
-                                'pdf_filename': pdf_filename,
-                                'pdf_size': len(pdf_bytes)
-                            })
-                        except Exception as pdf_error:
-                            logger.error("✗ Failed to generate PDF attachment", extra={
-                                'error_type': type(pdf_error).__name__,
-                                'error_message': str(pdf_error),
-                                'application_id': application_id
-                            }, exc_info=True)
-                            pdf_bytes = None
-                            pdf_filename = None
-                    else:
-                        logger.warning("PDF template not configured - skipping PDF generation", extra={
-                            'TEMPLATE_BUCKET': config.TEMPLATE_BUCKET or 'NOT SET',
-                            'TEMPLATE_KEY': config.TEMPLATE_KEY or 'NOT SET'
-                        })
-
-                    # Send email
-                    full_name = f"{first_name} {last_name}"
-                    email_sent = send_partnership_confirmation_email(
-                        recipient_email=email,
-                        full_name=full_name,
-                        application_id=application_id,
-                        contact_id=contact_id,
-                        payment_amount=payment_amount,
-                        partnership_tier=data['partnershipTier'],
-                        company_name=data['companyName'],
-                        cc_addresses=cc_addresses if cc_addresses else None,
-                        pdf_bytes=pdf_bytes,
-                        pdf_filename=pdf_filename
-                    )
+            # Hand the receipt to the extraction worker now that the payment is durable
+            if payment_status == PENDING_EXTRACTION:
+                with span('enqueue_receipt'):
+                    enqueue_receipt_extraction(payment_id)
+
+            # Push the queued Pxier customer without waiting on the third-party API
+            if pxier_outbox_id:
+                with span('enqueue_pxier'):
+                    enqueue_pxier_outbox_drain(pxier_outbox_id)
+
+            # Render the PDF and send the confirmation email in the background;
+            # the application is already durable at this point
+            with span('enqueue_confirmation'):
+                enqueue_application_confirmation(
+                    application_data=data,
+                    application_id=application_id,
+                    contact_id=contact_id,
+                    payment_amount=payment_amount
+                )
 
-                    if email_sent:
-                        logger.info("✓ Confirmation email sent successfully", extra={
-                            'recipient_email': email,
-                            'application_id': application_id
-                        })
-                    else:
-                        logger.warning("⚠ Failed to send confirmation email, but application was saved", extra={
-                            'recipient_email': email,
-                            'application_id': application_id
-                        })
-
-                except Exception as email_error:
-                    # Log email error but don't fail the entire transaction
-                    logger.error("Error sending confirmation email (application still saved)", extra={
-                        'error_type': type(email_error).__name__,
-                        'error_message': str(email_error),
-                        'recipient_email': email,
-                        'application_id': application_id
-                    }, exc_info=True)
-            else:
-                logger.warning("Email service not available - skipping confirmation email")
+            return result
 
-            return {
-                'contact_id': contact_id,
-                'application_id': application_id,
-                'payment_id': payment_id,
-                'payment_amount': payment_amount
-            }
+    except ClaimLostError:
+        logger.warning("Idempotency claim lost - rolling back", extra={
+            'idempotency_key': idempotency_key,
+            'email': email
+        })
+        if connection:
+            connection.rollback()
+        raise
 
     except pymysql.IntegrityError as e:
         logger.error("Database integrity error", extra={
@@ -1154,8 +1108,14 @@ def insert_lead_and_partner_application(data: Dict[str, Any]) -> Dict[str, Any]:
         })
 
         if connection:
-            connection.rollback()
-            logger.info("Database transaction rolled back due to MySQL error")
+            try:
+                connection.rollback()
+                logger.info("Database transaction rolled back due to MySQL error")
+            except Exception:
+                pass
+            # The connection may be broken - do not hand it to the next invocation
+            release_db_connection(connection, discard=True)
+            connection = None
 
         raise Exception("Failed to save application due to database error")
 
@@ -1176,11 +1136,4 @@ def insert_lead_and_partner_application(data: Dict[str, Any]) -> Dict[str, Any]:
 
     finally:
         if connection:
-            try:
-                connection.close()
-                logger.debug("Database connection closed")
-            except Exception as e:
-                logger.warning("Error closing database connection", extra={
-                    'error_type': type(e).__name__,
-                    'error_message': str(e)
-                })
+            release_db_connection(connection)
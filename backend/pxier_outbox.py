@@ -0,0 +1,275 @@
+"""
+Transactional outbox for Pxier customer creation.
+
+/applications writes a pxier_outbox row in the same transaction as the new
+contact, so the customer is never lost when Pxier is slow or down and the
+submission never waits on the third-party API. The drain entry point claims
+pending rows, calls /events/updateCustomer and writes pxier_customer_id back
+to contacts and partner_applications. Failed pushes are retried with
+exponential backoff until PXIER_OUTBOX_MAX_ATTEMPTS is reached.
+
+Invoked asynchronously by /applications (when PXIER_OUTBOX_FUNCTION_NAME is
+set) with {"outbox_ids": [...]}, or on a schedule with {} to drain the backlog.
+"""
+import json
+import logging
+from typing import Dict, Any, List, Optional
+
+from connection_manager import connection_manager
+from services.aws_clients import get_client
+from services.log_control import configure_logging
+from services.pxier_service import create_pxier_customer
+import config
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+OUTBOX_PENDING = 'pending'
+OUTBOX_PROCESSING = 'processing'
+OUTBOX_SENT = 'sent'
+OUTBOX_FAILED = 'failed'
+
+
+def add_pxier_outbox_row(cursor, contact_id: int, application_id: int, contact_data: Dict[str, Any]) -> int:
+    """
+    Queue Pxier customer creation using the caller's cursor (and transaction).
+
+    Only the contact data is stored; the payload with the access token is
+    built when the row is pushed.
+    """
+    cursor.execute("""
+        INSERT INTO pxier_outbox (
+            contact_id, partner_application_id, contact_data,
+            status, attempts, next_attempt_at, created_at, updated_at
+        ) VALUES (
+            %s, %s, %s, %s, 0, NOW(), NOW(), NOW()
+        )
+    """, (contact_id, application_id, json.dumps(contact_data), OUTBOX_PENDING))
+    return cursor.lastrowid
+
+
+def enqueue_pxier_outbox_drain(outbox_id: int) -> bool:
+    """
+    Ask the drain Lambda to push one outbox row without waiting for it.
+
+    Returns False when no drain function is configured; the scheduled drain
+    still picks the row up in that case.
+    """
+    function_name = config.PXIER_OUTBOX_FUNCTION_NAME
+    if not function_name:
+        logger.info("Pxier outbox function not configured - row left for scheduled drain", extra={
+            'pxier_outbox_id': outbox_id
+        })
+        return False
+
+    try:
+        get_client('lambda').invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'outbox_ids': [outbox_id]}).encode('utf-8')
+        )
+        logger.info("Pxier outbox drain enqueued", extra={
+            'pxier_outbox_id': outbox_id,
+            'function_name': function_name
+        })
+        return True
+    except Exception as e:
+        logger.error("Failed to enqueue Pxier outbox drain (scheduled drain will retry)", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'pxier_outbox_id': outbox_id
+        }, exc_info=True)
+        return False
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Push pending pxier_outbox rows to Pxier.
+
+    Event:
+        outbox_ids: optional list of outbox row IDs to push
+        limit: optional maximum number of rows to claim (default PXIER_OUTBOX_BATCH_SIZE)
+    """
+    event = event or {}
+    outbox_ids = event.get('outbox_ids')
+    limit = int(event.get('limit') or config.PXIER_OUTBOX_BATCH_SIZE)
+
+    logger.info("=== PXIER OUTBOX DRAIN START ===", extra={
+        'outbox_ids': outbox_ids,
+        'limit': limit,
+        'request_id': getattr(context, 'aws_request_id', 'N/A') if context else 'N/A'
+    })
+
+    results = drain_outbox(outbox_ids=outbox_ids, limit=limit)
+    sent = [r for r in results if r['status'] == OUTBOX_SENT]
+
+    logger.info("=== PXIER OUTBOX DRAIN END ===", extra={
+        'processed': len(results),
+        'sent': len(sent),
+        'not_sent': len(results) - len(sent)
+    })
+
+    return {
+        'processed': len(results),
+        'sent': len(sent),
+        'results': results
+    }
+
+
+def drain_outbox(outbox_ids: Optional[List[int]] = None, limit: int = 10) -> List[Dict[str, Any]]:
+    """Claim up to `limit` due outbox rows and push them to Pxier."""
+    connection = connection_manager.acquire()
+    discard = False
+
+    try:
+        claimed = _claim_rows(connection, outbox_ids, limit)
+        return [_push_row(connection, row) for row in claimed]
+
+    except Exception as e:
+        logger.error("Pxier outbox drain failed", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e)
+        }, exc_info=True)
+        discard = True
+        raise
+
+    finally:
+        connection_manager.release(connection, discard=discard)
+
+
+def _claim_rows(connection, outbox_ids: Optional[List[int]], limit: int) -> List[Dict[str, Any]]:
+    """
+    Mark due rows as 'processing' and commit, so the HTTP call holds no row locks.
+
+    Rows stuck in 'processing' (a drain died mid-push) are reclaimed after
+    PXIER_OUTBOX_CLAIM_TIMEOUT seconds.
+    """
+    query = """
+        SELECT id, contact_id, partner_application_id, contact_data, attempts
+        FROM pxier_outbox
+        WHERE ((status = %s AND next_attempt_at <= NOW())
+               OR (status = %s AND updated_at < NOW() - INTERVAL %s SECOND))
+    """
+    params = [OUTBOX_PENDING, OUTBOX_PROCESSING, config.PXIER_OUTBOX_CLAIM_TIMEOUT]
+
+    if outbox_ids:
+        query += " AND id IN ({})".format(', '.join(['%s'] * len(outbox_ids)))
+        params.extend(outbox_ids)
+
+    query += " ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED"
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        claimed = cursor.fetchall()
+
+        if claimed:
+            placeholders = ', '.join(['%s'] * len(claimed))
+            cursor.execute(f"""
+                UPDATE pxier_outbox
+                SET status = %s,
+                    attempts = attempts + 1,
+                    updated_at = NOW()
+                WHERE id IN ({placeholders})
+            """, [OUTBOX_PROCESSING] + [row['id'] for row in claimed])
+
+    connection.commit()
+
+    logger.info("Claimed Pxier outbox rows", extra={
+        'claimed_count': len(claimed),
+        'outbox_ids': [row['id'] for row in claimed]
+    })
+    return claimed
+
+
+def _push_row(connection, row: Dict[str, Any]) -> Dict[str, Any]:
+    outbox_id = row['id']
+    contact_id = row['contact_id']
+    application_id = row['partner_application_id']
+    attempts = row.get('attempts', 0) + 1
+
+    try:
+        contact_data = row['contact_data']
+        if isinstance(contact_data, (str, bytes)):
+            contact_data = json.loads(contact_data)
+
+        pxier_response = create_pxier_customer(contact_data)
+    except Exception as e:
+        return _record_failure(connection, outbox_id, attempts, e)
+
+    pxier_customer_id = pxier_response.get('data', {}).get('customerId')
+    pxier_contact_id = pxier_response.get('data', {}).get('contactId')
+
+    with connection.cursor() as cursor:
+        # Update contacts table with Pxier IDs
+        cursor.execute("""
+            UPDATE contacts
+            SET pxier_customer_id = %s,
+                pxier_contact_id = %s,
+                became_customer_at = NOW(),
+                updated_at = NOW()
+            WHERE contact_id = %s
+        """, (pxier_customer_id, pxier_contact_id, contact_id))
+
+        # Update partner_applications with customer_id
+        cursor.execute("""
+            UPDATE partner_applications
+            SET customer_id = %s,
+                converted_to_customer_at = NOW(),
+                updated_at = NOW()
+            WHERE id = %s
+        """, (pxier_customer_id, application_id))
+
+        cursor.execute("""
+            UPDATE pxier_outbox
+            SET status = %s,
+                pxier_customer_id = %s,
+                pxier_contact_id = %s,
+                last_error = NULL,
+                sent_at = NOW(),
+                updated_at = NOW()
+            WHERE id = %s
+        """, (OUTBOX_SENT, pxier_customer_id, pxier_contact_id, outbox_id))
+    connection.commit()
+
+    logger.info("Updated contacts and partner_applications with Pxier customer IDs", extra={
+        'pxier_outbox_id': outbox_id,
+        'contact_id': contact_id,
+        'application_id': application_id,
+        'pxier_customer_id': pxier_customer_id
+    })
+
+    return {'outbox_id': outbox_id, 'status': OUTBOX_SENT, 'pxier_customer_id': pxier_customer_id}
+
+
+def _record_failure(connection, outbox_id: int, attempts: int, error: Exception) -> Dict[str, Any]:
+    """Schedule the next retry with exponential backoff, or give up after the last attempt."""
+    if attempts >= config.PXIER_OUTBOX_MAX_ATTEMPTS:
+        status = OUTBOX_FAILED
+        delay = 0
+    else:
+        status = OUTBOX_PENDING
+        delay = min(config.PXIER_OUTBOX_RETRY_BASE_DELAY * (2 ** (attempts - 1)),
+                    config.PXIER_OUTBOX_RETRY_MAX_DELAY)
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE pxier_outbox
+            SET status = %s,
+                last_error = %s,
+                next_attempt_at = NOW() + INTERVAL %s SECOND,
+                updated_at = NOW()
+            WHERE id = %s
+        """, (status, str(error)[:1000], delay, outbox_id))
+    connection.commit()
+
+    logger.error("Failed to create Pxier customer from outbox", extra={
+        'error_type': type(error).__name__,
+        'error_message': str(error),
+        'pxier_outbox_id': outbox_id,
+        'attempts': attempts,
+        'status': status,
+        'retry_in_seconds': delay if status == OUTBOX_PENDING else None
+    }, exc_info=True)
+
+    return {'outbox_id': outbox_id, 'status': status, 'attempts': attempts}
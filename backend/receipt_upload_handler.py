@@ -0,0 +1,296 @@
+"""
+Receipt upload handler.
+
+Triggered by S3 ObjectCreated events on the receipts/ prefix that
+presign_service hands out, so Textract runs while the user is still filling
+in the form instead of after they submit it. The extracted amount is stored
+in receipt_extractions keyed by the storage key; /applications reads it when
+the form is submitted and only falls back to receipt_worker when no result
+is ready yet.
+
+Multi-page receipts (PDF/TIFF) start an asynchronous Textract job. Its
+completion arrives through the Textract SNS topic (subscribe this function
+alongside receipt_worker) or is polled by a scheduled invocation with {}.
+"""
+import json
+import logging
+from urllib.parse import unquote_plus
+from typing import Any, Dict, List, Optional
+
+from connection_manager import connection_manager
+from services.aws_clients import get_client
+from services.log_control import configure_logging
+from services.receipt_preprocess import is_normalized_key
+from services.textract_service import (
+    extract_amount_from_receipt,
+    is_multipage_document,
+    start_receipt_text_detection,
+    collect_receipt_text_detection,
+    store_receipt_result,
+    JOB_IN_PROGRESS,
+    JOB_SUCCEEDED,
+    JOB_PARTIAL_SUCCESS
+)
+import config
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# receipt_extractions.status values
+UPLOAD_EXTRACTING = 'extracting'
+UPLOAD_AWAITING_TEXTRACT = 'awaiting_textract'
+UPLOAD_EXTRACTED = 'extracted'
+UPLOAD_NO_AMOUNT = 'no_amount'
+UPLOAD_REJECTED = 'rejected'
+UPLOAD_FAILED = 'failed'
+
+
+def _s3():
+    return get_client('s3')
+
+
+def get_precomputed_amount(cursor, storage_key: str) -> Optional[float]:
+    """Return the amount extracted at upload time for this receipt, or None if there is none yet."""
+    cursor.execute("""
+        SELECT amount
+        FROM receipt_extractions
+        WHERE storage_key = %s AND status = %s
+    """, (storage_key, UPLOAD_EXTRACTED))
+    row = cursor.fetchone()
+    if not row or row['amount'] is None:
+        return None
+    return float(row['amount'])
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Extract receipt amounts at upload time.
+
+    Event:
+        Records: S3 ObjectCreated records, or Textract completion notifications through SNS
+        {} (scheduled): poll asynchronous Textract jobs still awaiting completion
+    """
+    event = event or {}
+    records = event.get('Records') or []
+
+    logger.info("=== RECEIPT UPLOAD HANDLER START ===", extra={
+        'record_count': len(records),
+        'request_id': getattr(context, 'aws_request_id', 'N/A') if context else 'N/A'
+    })
+
+    results = []
+    job_ids = []
+    for record in records:
+        if record.get('eventSource') == 'aws:s3':
+            results.append(handle_uploaded_receipt(
+                record['s3']['bucket']['name'],
+                unquote_plus(record['s3']['object']['key']),
+                record['s3']['object'].get('size')
+            ))
+        elif record.get('Sns'):
+            try:
+                message = json.loads(record['Sns'].get('Message') or '{}')
+            except ValueError:
+                continue
+            if message.get('JobId'):
+                job_ids.append(message['JobId'])
+
+    if job_ids or not records:
+        results.extend(poll_upload_textract_jobs(job_ids=job_ids or None))
+
+    logger.info("=== RECEIPT UPLOAD HANDLER END ===", extra={
+        'processed': len(results),
+        'statuses': [r['status'] for r in results]
+    })
+    return {'processed': len(results), 'results': results}
+
+
+def _validate_receipt(bucket: str, key: str, size: Optional[int]) -> Optional[str]:
+    """Return a rejection reason, or None when the upload may be sent to Textract."""
+    if size is None or size <= 0:
+        return 'empty object'
+    if size > config.MAX_FILE_SIZE:
+        return f"object is {size} bytes, limit is {config.MAX_FILE_SIZE}"
+
+    content_type = (_s3().head_object(Bucket=bucket, Key=key).get('ContentType') or '').lower()
+    if content_type not in [t.strip().lower() for t in config.ALLOWED_FILE_TYPES]:
+        return f"content type '{content_type}' is not allowed"
+    return None
+
+
+def _save_extraction(storage_key: str, bucket: str, status: str, amount: Optional[float] = None,
+                     size: Optional[int] = None, job_id: Optional[str] = None, error: Optional[str] = None,
+                     expected_status: Optional[str] = None) -> bool:
+    """Upsert the extraction row; with expected_status only that row state is updated."""
+    connection = connection_manager.acquire()
+    discard = False
+    try:
+        with connection.cursor() as cursor:
+            if expected_status is None:
+                cursor.execute("""
+                    INSERT INTO receipt_extractions (
+                        storage_key, bucket, status, amount, size_bytes,
+                        textract_job_id, error, created_at, updated_at
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
+                    ON DUPLICATE KEY UPDATE
+                        status = VALUES(status),
+                        amount = VALUES(amount),
+                        size_bytes = COALESCE(VALUES(size_bytes), size_bytes),
+                        textract_job_id = COALESCE(VALUES(textract_job_id), textract_job_id),
+                        error = VALUES(error),
+                        updated_at = NOW()
+                """, (storage_key, bucket, status, amount, size, job_id, error))
+            else:
+                cursor.execute("""
+                    UPDATE receipt_extractions
+                    SET status = %s,
+                        amount = %s,
+                        error = %s,
+                        updated_at = NOW()
+                    WHERE storage_key = %s AND status = %s
+                """, (status, amount, error, storage_key, expected_status))
+            updated = cursor.rowcount
+        connection.commit()
+        return bool(updated)
+    except Exception:
+        discard = True
+        raise
+    finally:
+        connection_manager.release(connection, discard=discard)
+
+
+def _current_status(storage_key: str) -> Optional[str]:
+    connection = connection_manager.acquire()
+    discard = False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT status FROM receipt_extractions WHERE storage_key = %s", (storage_key,))
+            row = cursor.fetchone()
+        connection.commit()
+        return row['status'] if row else None
+    except Exception:
+        discard = True
+        raise
+    finally:
+        connection_manager.release(connection, discard=discard)
+
+
+def handle_uploaded_receipt(bucket: str, key: str, size: Optional[int]) -> Dict[str, Any]:
+    """Validate one uploaded receipt and run (or start) Textract on it."""
+    prefix = config.RECEIPT_UPLOAD_PREFIX
+    if not key.startswith(prefix):
+        logger.info("Ignoring object outside the receipt prefix", extra={'key': key, 'prefix': prefix})
+        return {'storage_key': key, 'status': 'ignored'}
+    if is_normalized_key(key):
+        # Written by receipt_preprocess next to the original; not an upload
+        return {'storage_key': key, 'status': 'ignored'}
+
+    # S3 may deliver the same event more than once
+    if _current_status(key) in (UPLOAD_EXTRACTED, UPLOAD_AWAITING_TEXTRACT, UPLOAD_NO_AMOUNT, UPLOAD_REJECTED):
+        logger.info("Receipt already processed - skipping duplicate event", extra={'storage_key': key})
+        return {'storage_key': key, 'status': 'duplicate'}
+
+    try:
+        rejection = _validate_receipt(bucket, key, size)
+    except Exception as e:
+        logger.error("Could not validate uploaded receipt", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'storage_key': key
+        }, exc_info=True)
+        _save_extraction(key, bucket, UPLOAD_FAILED, size=size, error=str(e)[:255])
+        return {'storage_key': key, 'status': UPLOAD_FAILED}
+
+    if rejection:
+        logger.warning("⚠ Uploaded receipt rejected", extra={'storage_key': key, 'reason': rejection})
+        _save_extraction(key, bucket, UPLOAD_REJECTED, size=size, error=rejection)
+        return {'storage_key': key, 'status': UPLOAD_REJECTED, 'error': rejection}
+
+    if config.TEXTRACT_ASYNC_ENABLED and is_multipage_document(key):
+        try:
+            job_id = start_receipt_text_detection(bucket, key, job_tag='upload')
+        except Exception as e:
+            logger.error("Failed to start asynchronous Textract job for upload", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e),
+                'storage_key': key
+            }, exc_info=True)
+            _save_extraction(key, bucket, UPLOAD_FAILED, size=size, error=str(e)[:255])
+            return {'storage_key': key, 'status': UPLOAD_FAILED}
+        _save_extraction(key, bucket, UPLOAD_AWAITING_TEXTRACT, size=size, job_id=job_id)
+        return {'storage_key': key, 'status': UPLOAD_AWAITING_TEXTRACT, 'job_id': job_id}
+
+    _save_extraction(key, bucket, UPLOAD_EXTRACTING, size=size)
+    try:
+        amount = extract_amount_from_receipt(bucket, key)
+    except Exception as e:
+        # Transient S3/Textract error: a failed upload is extracted again by receipt_worker at submission
+        logger.error("Failed to extract amount from uploaded receipt", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'storage_key': key
+        }, exc_info=True)
+        _save_extraction(key, bucket, UPLOAD_FAILED, size=size, error=str(e)[:255])
+        return {'storage_key': key, 'status': UPLOAD_FAILED}
+    # 0.0 means Textract found no amount; leave it to receipt_worker at submission
+    status = UPLOAD_EXTRACTED if amount else UPLOAD_NO_AMOUNT
+    _save_extraction(key, bucket, status, amount=amount or None, size=size)
+
+    logger.info("✓ Receipt pre-processed at upload", extra={
+        'storage_key': key,
+        'amount': amount,
+        'status': status
+    })
+    return {'storage_key': key, 'status': status, 'amount': amount}
+
+
+def poll_upload_textract_jobs(job_ids: Optional[List[str]] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """Collect asynchronous Textract jobs started at upload time."""
+    connection = connection_manager.acquire()
+    discard = False
+    try:
+        query = """
+            SELECT storage_key, bucket, textract_job_id,
+                   TIMESTAMPDIFF(SECOND, updated_at, NOW()) AS waiting_seconds
+            FROM receipt_extractions
+            WHERE status = %s AND textract_job_id IS NOT NULL
+        """
+        params = [UPLOAD_AWAITING_TEXTRACT]
+        if job_ids:
+            query += " AND textract_job_id IN ({})".format(', '.join(['%s'] * len(job_ids)))
+            params.extend(job_ids)
+        query += " ORDER BY updated_at LIMIT %s"
+        params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            waiting = cursor.fetchall()
+        connection.commit()
+    except Exception:
+        discard = True
+        raise
+    finally:
+        connection_manager.release(connection, discard=discard)
+
+    results = []
+    for row in waiting:
+        storage_key = row['storage_key']
+        job = collect_receipt_text_detection(row['textract_job_id'])
+
+        if job['status'] == JOB_IN_PROGRESS:
+            if (row.get('waiting_seconds') or 0) < config.TEXTRACT_ASYNC_TIMEOUT:
+                continue
+            status, amount, error = UPLOAD_FAILED, None, 'Textract job timed out'
+        elif job['status'] in (JOB_SUCCEEDED, JOB_PARTIAL_SUCCESS):
+            best = job['best']
+            amount = best['amount'] if best else None
+            store_receipt_result(row['bucket'], storage_key, job['lines'], amount)
+            status, error = (UPLOAD_EXTRACTED if amount else UPLOAD_NO_AMOUNT), None
+        else:
+            status, amount, error = UPLOAD_FAILED, None, (job.get('status_message') or job['status'])[:255]
+
+        _save_extraction(storage_key, row['bucket'], status, amount=amount, error=error,
+                         expected_status=UPLOAD_AWAITING_TEXTRACT)
+        results.append({'storage_key': storage_key, 'status': status, 'amount': amount})
+
+    return results
@@ -0,0 +1,411 @@
+"""
+Receipt extraction worker.
+
+/applications commits the payment with status 'pending_extraction' and amount
+0.00 so Textract never runs inside the submission transaction. This worker
+claims those payments, runs Textract on the uploaded receipt outside any open
+transaction and writes the extracted amount back to payments.amount.
+
+Invoked asynchronously by /applications (when RECEIPT_WORKER_FUNCTION_NAME is
+set) with {"payment_ids": [...]}, or on a schedule with {} to drain the backlog.
+
+Multi-page receipts (PDF/TIFF) go through the asynchronous Textract API: the
+worker starts the job, parks the payment in 'awaiting_textract' and returns.
+The job's completion is picked up from the Textract SNS notification (when
+TEXTRACT_SNS_TOPIC_ARN is configured and subscribed to this function) or by
+polling on the next scheduled run.
+"""
+import os
+import json
+import logging
+from typing import Dict, Any, List, Optional
+
+from connection_manager import connection_manager
+from receipt_upload_handler import get_precomputed_amount
+from services.aws_clients import get_client
+from services.log_control import configure_logging
+from services.textract_service import (
+    extract_amount_from_receipt,
+    is_multipage_document,
+    start_receipt_text_detection,
+    collect_receipt_text_detection,
+    lookup_cached_amount,
+    store_receipt_result,
+    JOB_IN_PROGRESS,
+    JOB_SUCCEEDED,
+    JOB_PARTIAL_SUCCESS
+)
+import config
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+PENDING_EXTRACTION = 'pending_extraction'
+EXTRACTING = 'extracting'
+AWAITING_TEXTRACT = 'awaiting_textract'
+# Status a payment returns to once its amount is known (same as before extraction moved out)
+EXTRACTED = 'pending'
+
+
+def enqueue_receipt_extraction(payment_id: int) -> bool:
+    """
+    Ask the worker Lambda to process one payment without waiting for it.
+
+    Returns False when no worker function is configured; the scheduled drain
+    still picks the payment up in that case.
+    """
+    function_name = config.RECEIPT_WORKER_FUNCTION_NAME
+    if not function_name:
+        logger.info("Receipt worker function not configured - payment left for scheduled drain", extra={
+            'payment_id': payment_id
+        })
+        return False
+
+    try:
+        get_client('lambda').invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'payment_ids': [payment_id]}).encode('utf-8')
+        )
+        logger.info("Receipt extraction enqueued", extra={
+            'payment_id': payment_id,
+            'function_name': function_name
+        })
+        return True
+    except Exception as e:
+        logger.error("Failed to enqueue receipt extraction (scheduled drain will retry)", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'payment_id': payment_id
+        }, exc_info=True)
+        return False
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Process payments waiting for receipt extraction.
+
+    Event:
+        payment_ids: optional list of payment IDs to process
+        limit: optional maximum number of payments to claim (default RECEIPT_WORKER_BATCH_SIZE)
+        Records: Textract completion notifications delivered through SNS
+    """
+    event = event or {}
+    payment_ids = event.get('payment_ids')
+    limit = int(event.get('limit') or config.RECEIPT_WORKER_BATCH_SIZE)
+    job_ids = _textract_job_ids(event)
+
+    logger.info("=== RECEIPT WORKER START ===", extra={
+        'payment_ids': payment_ids,
+        'textract_job_ids': job_ids,
+        'limit': limit,
+        'request_id': getattr(context, 'aws_request_id', 'N/A') if context else 'N/A'
+    })
+
+    if job_ids is not None:
+        results = poll_textract_jobs(job_ids=job_ids, limit=max(len(job_ids), 1))
+    else:
+        results = process_pending_receipts(payment_ids=payment_ids, limit=limit)
+        if not payment_ids:
+            # Scheduled run: also pick up finished asynchronous jobs nobody was notified about
+            results.extend(poll_textract_jobs(limit=limit))
+
+    failed = [r for r in results if r['status'] == PENDING_EXTRACTION]
+
+    logger.info("=== RECEIPT WORKER END ===", extra={
+        'processed': len(results),
+        'failed': len(failed)
+    })
+
+    return {
+        'processed': len(results),
+        'failed': len(failed),
+        'results': results
+    }
+
+
+def process_pending_receipts(payment_ids: Optional[List[int]] = None, limit: int = 10) -> List[Dict[str, Any]]:
+    """Claim up to `limit` pending payments and extract their receipt amounts."""
+    bucket_name = os.environ.get('S3_BUCKET_NAME', '')
+    if not bucket_name:
+        logger.error("S3_BUCKET_NAME not configured - cannot extract receipt amounts")
+        return []
+
+    connection = connection_manager.acquire()
+    discard = False
+    results = []
+
+    try:
+        claimed = _claim_payments(connection, payment_ids, limit)
+
+        for payment in claimed:
+            results.append(_process_payment(connection, bucket_name, payment))
+
+        return results
+
+    except Exception as e:
+        logger.error("Receipt worker failed", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e)
+        }, exc_info=True)
+        discard = True
+        raise
+
+    finally:
+        connection_manager.release(connection, discard=discard)
+
+
+def _claim_payments(connection, payment_ids: Optional[List[int]], limit: int) -> List[Dict[str, Any]]:
+    """
+    Mark payments as 'extracting' and commit, so Textract runs without holding row locks.
+
+    Payments stuck in 'extracting' (a worker died mid-run) are reclaimed after
+    RECEIPT_WORKER_CLAIM_TIMEOUT seconds.
+    """
+    query = """
+        SELECT id, attachment, extraction_attempts
+        FROM payments
+        WHERE (status = %s
+               OR (status = %s AND updated_at < NOW() - INTERVAL %s SECOND))
+          AND extraction_attempts < %s
+    """
+    params = [PENDING_EXTRACTION, EXTRACTING, config.RECEIPT_WORKER_CLAIM_TIMEOUT,
+              config.RECEIPT_WORKER_MAX_ATTEMPTS]
+
+    if payment_ids:
+        query += " AND id IN ({})".format(', '.join(['%s'] * len(payment_ids)))
+        params.extend(payment_ids)
+
+    query += " ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED"
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        claimed = cursor.fetchall()
+
+        if claimed:
+            placeholders = ', '.join(['%s'] * len(claimed))
+            cursor.execute(f"""
+                UPDATE payments
+                SET status = %s,
+                    extraction_attempts = extraction_attempts + 1,
+                    updated_at = NOW()
+                WHERE id IN ({placeholders})
+            """, [EXTRACTING] + [p['id'] for p in claimed])
+
+    connection.commit()
+
+    logger.info("Claimed payments for receipt extraction", extra={
+        'claimed_count': len(claimed),
+        'payment_ids': [p['id'] for p in claimed]
+    })
+    return claimed
+
+
+def _process_payment(connection, bucket_name: str, payment: Dict[str, Any]) -> Dict[str, Any]:
+    payment_id = payment['id']
+    receipt_key = payment.get('attachment') or ''
+
+    if receipt_key:
+        # The upload handler may have finished since the application was submitted
+        with connection.cursor() as cursor:
+            precomputed = get_precomputed_amount(cursor, receipt_key)
+        if precomputed is not None:
+            return _store_amount(connection, payment, precomputed, EXTRACTED, expected_status=EXTRACTING)
+
+    if receipt_key and config.TEXTRACT_ASYNC_ENABLED and is_multipage_document(receipt_key):
+        return _start_async_extraction(connection, bucket_name, payment)
+
+    amount = 0.0
+    status = EXTRACTED
+    if receipt_key:
+        try:
+            amount = extract_amount_from_receipt(bucket_name, receipt_key)
+        except Exception as e:
+            logger.error("Failed to extract amount from receipt", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e),
+                'payment_id': payment_id,
+                'receipt_key': receipt_key
+            }, exc_info=True)
+            status = _retry_status(payment)
+
+    return _store_amount(connection, payment, amount, status, expected_status=EXTRACTING)
+
+
+def _retry_status(payment: Dict[str, Any]) -> str:
+    # Retry on the next run until RECEIPT_WORKER_MAX_ATTEMPTS is reached
+    if payment.get('extraction_attempts', 0) + 1 >= config.RECEIPT_WORKER_MAX_ATTEMPTS:
+        return EXTRACTED
+    return PENDING_EXTRACTION
+
+
+def _store_amount(connection, payment: Dict[str, Any], amount: float, status: str, expected_status: str) -> Dict[str, Any]:
+    payment_id = payment['id']
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE payments
+            SET amount = %s,
+                status = %s,
+                updated_at = NOW()
+            WHERE id = %s AND status = %s
+        """, (amount, status, payment_id, expected_status))
+    connection.commit()
+
+    logger.info("Receipt amount stored", extra={
+        'payment_id': payment_id,
+        'amount': amount,
+        'status': status,
+        'receipt_key': payment.get('attachment')
+    })
+
+    return {'payment_id': payment_id, 'amount': amount, 'status': status}
+
+
+def _start_async_extraction(connection, bucket_name: str, payment: Dict[str, Any]) -> Dict[str, Any]:
+    """Start an asynchronous Textract job and park the payment until it completes."""
+    payment_id = payment['id']
+    receipt_key = payment['attachment']
+
+    cached_amount = lookup_cached_amount(bucket_name, receipt_key)
+    if cached_amount is not None:
+        return _store_amount(connection, payment, cached_amount, EXTRACTED, expected_status=EXTRACTING)
+
+    try:
+        job_id = start_receipt_text_detection(bucket_name, receipt_key, job_tag=f"payment-{payment_id}")
+    except Exception as e:
+        logger.error("Failed to start asynchronous Textract job", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'payment_id': payment_id,
+            'receipt_key': receipt_key
+        }, exc_info=True)
+        return _store_amount(connection, payment, 0.0, _retry_status(payment), expected_status=EXTRACTING)
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE payments
+            SET status = %s,
+                textract_job_id = %s,
+                updated_at = NOW()
+            WHERE id = %s AND status = %s
+        """, (AWAITING_TEXTRACT, job_id, payment_id, EXTRACTING))
+    connection.commit()
+
+    return {'payment_id': payment_id, 'amount': None, 'status': AWAITING_TEXTRACT, 'job_id': job_id}
+
+
+def _textract_job_ids(event: Dict[str, Any]) -> Optional[List[str]]:
+    """Return the JobIds of Textract SNS notifications in the event, or None for other events."""
+    records = event.get('Records')
+    if not records:
+        return None
+
+    job_ids = []
+    for record in records:
+        sns = record.get('Sns') or {}
+        try:
+            message = json.loads(sns.get('Message') or '{}')
+        except ValueError:
+            logger.warning("Ignoring SNS record with a non-JSON message", extra={
+                'message_id': sns.get('MessageId')
+            })
+            continue
+        if message.get('JobId'):
+            job_ids.append(message['JobId'])
+    return job_ids
+
+
+def poll_textract_jobs(job_ids: Optional[List[str]] = None, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Collect finished asynchronous Textract jobs and store their amounts.
+
+    Jobs still running are left alone until TEXTRACT_ASYNC_TIMEOUT, after which
+    the payment is retried (or given up on) like a failed extraction.
+    """
+    bucket_name = os.environ.get('S3_BUCKET_NAME', '')
+    if not bucket_name:
+        logger.error("S3_BUCKET_NAME not configured - cannot collect Textract results")
+        return []
+
+    connection = connection_manager.acquire()
+    discard = False
+    results = []
+
+    try:
+        query = """
+            SELECT id, attachment, textract_job_id, extraction_attempts,
+                   TIMESTAMPDIFF(SECOND, updated_at, NOW()) AS waiting_seconds
+            FROM payments
+            WHERE status = %s AND textract_job_id IS NOT NULL
+        """
+        params = [AWAITING_TEXTRACT]
+        if job_ids:
+            query += " AND textract_job_id IN ({})".format(', '.join(['%s'] * len(job_ids)))
+            params.extend(job_ids)
+        query += " ORDER BY updated_at LIMIT %s"
+        params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            waiting = cursor.fetchall()
+        # End the read transaction before calling Textract
+        connection.commit()
+
+        for payment in waiting:
+            result = _complete_async_extraction(connection, bucket_name, payment)
+            if result is not None:
+                results.append(result)
+
+        return results
+
+    except Exception as e:
+        logger.error("Textract job polling failed", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e)
+        }, exc_info=True)
+        discard = True
+        raise
+
+    finally:
+        connection_manager.release(connection, discard=discard)
+
+
+def _complete_async_extraction(connection, bucket_name: str, payment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    payment_id = payment['id']
+    job_id = payment['textract_job_id']
+
+    try:
+        job = collect_receipt_text_detection(job_id)
+    except Exception as e:
+        logger.error("Failed to collect Textract job results", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'payment_id': payment_id,
+            'job_id': job_id
+        }, exc_info=True)
+        job = {'status': JOB_IN_PROGRESS}
+
+    if job['status'] == JOB_IN_PROGRESS:
+        if (payment.get('waiting_seconds') or 0) < config.TEXTRACT_ASYNC_TIMEOUT:
+            return None
+        logger.warning("⚠ Asynchronous Textract job timed out", extra={
+            'payment_id': payment_id,
+            'job_id': job_id,
+            'waiting_seconds': payment.get('waiting_seconds')
+        })
+        return _store_amount(connection, payment, 0.0, _retry_status(payment), expected_status=AWAITING_TEXTRACT)
+
+    if job['status'] in (JOB_SUCCEEDED, JOB_PARTIAL_SUCCESS):
+        best = job['best']
+        amount = best['amount'] if best else 0.0
+        store_receipt_result(bucket_name, payment['attachment'], job['lines'], best['amount'] if best else None)
+        return _store_amount(connection, payment, amount, EXTRACTED, expected_status=AWAITING_TEXTRACT)
+
+    logger.error("Asynchronous Textract job failed", extra={
+        'payment_id': payment_id,
+        'job_id': job_id,
+        'job_status': job['status'],
+        'status_message': job.get('status_message')
+    })
+    return _store_amount(connection, payment, 0.0, _retry_status(payment), expected_status=AWAITING_TEXTRACT)
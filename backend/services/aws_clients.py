@@ -0,0 +1,92 @@
+"""
+AWS Clients
+Process-wide registry of lazily created boto3 clients.
+
+Creating a boto3 client costs tens of milliseconds (the first one also pays
+for importing boto3/botocore), so modules ask for clients here when they
+first need them instead of building them at import time. An OPTIONS preflight
+then constructs no clients at all and /presign only builds S3.
+
+Clients are created once per process under a lock from a dedicated boto3
+Session (the default session is not safe for concurrent client creation);
+boto3 clients themselves are thread-safe and shared.
+
+Endpoint overrides for local stand-ins (LocalStack, MinIO, moto server):
+    AWS_ENDPOINT_URL_<SERVICE>  e.g. AWS_ENDPOINT_URL_S3=http://localhost:4566
+    AWS_ENDPOINT_URL            for every service
+"""
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_clients: Dict[str, Any] = {}
+_construction_ms: Dict[str, float] = {}
+_lock = threading.Lock()
+_session = None
+_boto3_import_ms = None
+
+
+def _endpoint_url(service_name: str):
+    env_name = 'AWS_ENDPOINT_URL_' + service_name.upper().replace('-', '_')
+    return os.environ.get(env_name) or os.environ.get('AWS_ENDPOINT_URL') or None
+
+
+def get_client(service_name: str):
+    """Return the shared boto3 client for service_name, creating it on first use."""
+    client = _clients.get(service_name)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(service_name)
+        if client is not None:
+            return client
+
+        global _session, _boto3_import_ms
+        if _session is None:
+            started = time.perf_counter()
+            import boto3
+            _boto3_import_ms = (time.perf_counter() - started) * 1000
+            _session = boto3.session.Session()
+
+        started = time.perf_counter()
+
+        kwargs = {}
+        endpoint_url = _endpoint_url(service_name)
+        if endpoint_url:
+            kwargs['endpoint_url'] = endpoint_url
+        client = _session.client(service_name, **kwargs)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _clients[service_name] = client
+        _construction_ms[service_name] = elapsed_ms
+        logger.debug("AWS client created", extra={
+            'aws_service': service_name,
+            'endpoint_url': endpoint_url,
+            'construction_ms': round(elapsed_ms, 1)
+        })
+        return client
+
+
+def set_client(service_name: str, client) -> None:
+    """Install a client (tests and local runs); None removes it so the next get_client rebuilds it."""
+    with _lock:
+        if client is None:
+            _clients.pop(service_name, None)
+        else:
+            _clients[service_name] = client
+
+
+def client_construction_times() -> Dict[str, float]:
+    """Milliseconds spent creating each client in this process (excluding the boto3 import)."""
+    with _lock:
+        return dict(_construction_ms)
+
+
+def boto3_import_ms() -> Optional[float]:
+    """Milliseconds the first get_client spent importing boto3, or None if it has not been imported here."""
+    return _boto3_import_ms
@@ -0,0 +1,274 @@
+"""
+Confirmation Service
+Renders the application PDF and sends the SES confirmation email.
+
+Runs as a background job (see confirmation_worker.py) after the application
+has been committed, so /applications responds as soon as the data is durable.
+"""
+import os
+import json
+import uuid
+import logging
+from typing import Dict, Any, Optional
+
+from botocore.exceptions import ClientError
+
+from services.email_service import send_partnership_confirmation_email
+from services.pdf_generator import generate_pdf, load_template_from_s3, generate_pdf_filename
+from services.job_queue import Job, InlineJobQueue, get_job_queue
+from services.aws_clients import get_client
+
+try:
+    from backend import config
+except ImportError:
+    import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CONFIRMATION_JOB = 'application_confirmation'
+
+
+def enqueue_application_confirmation(
+    application_data: Dict[str, Any],
+    application_id: int,
+    contact_id: int,
+    payment_amount: float
+) -> None:
+    """
+    Queue the PDF + confirmation email job for a committed application.
+
+    The request body (signature image, NRIC) is staged in S3 and only its key
+    goes on the queue. Never raises: the application is already saved, so if
+    the job cannot be queued the confirmation is sent inline instead.
+    """
+    payload = {
+        'application_id': application_id,
+        'contact_id': contact_id,
+        'payment_amount': payment_amount
+    }
+    data_key = None
+
+    try:
+        queue = get_job_queue(inline_handler=handle_confirmation_job)
+        if config.CONFIRMATION_DATA_BUCKET and not isinstance(queue, InlineJobQueue):
+            data_key = stage_application_data(application_data, application_id)
+            payload['application_data_key'] = data_key
+        else:
+            payload['application_data'] = application_data
+
+        job_id = queue.enqueue(CONFIRMATION_JOB, payload)
+        logger.info("Confirmation job enqueued", extra={
+            'job_id': job_id,
+            'application_id': application_id
+        })
+        return
+    except Exception as e:
+        logger.error("Failed to enqueue confirmation job - sending inline (application still saved)", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'application_id': application_id
+        }, exc_info=True)
+
+    if data_key:
+        delete_application_data(data_key)
+
+    send_application_confirmation(
+        data=application_data,
+        application_id=application_id,
+        contact_id=contact_id,
+        payment_amount=payment_amount
+    )
+
+
+def stage_application_data(application_data: Dict[str, Any], application_id: int) -> str:
+    """Write the request body for a confirmation job to S3 and return its key."""
+    key = f"{config.CONFIRMATION_DATA_PREFIX}{application_id}-{uuid.uuid4().hex}.json"
+    get_client('s3').put_object(
+        Bucket=config.CONFIRMATION_DATA_BUCKET,
+        Key=key,
+        Body=json.dumps(application_data, default=str).encode('utf-8'),
+        ContentType='application/json',
+        ServerSideEncryption='AES256'
+    )
+    return key
+
+
+def load_application_data(key: str) -> Optional[Dict[str, Any]]:
+    """Read a staged request body; None if it no longer exists (job already completed)."""
+    try:
+        response = get_client('s3').get_object(Bucket=config.CONFIRMATION_DATA_BUCKET, Key=key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None
+        raise
+    return json.loads(response['Body'].read())
+
+
+def delete_application_data(key: str) -> None:
+    """Best-effort removal of a staged request body."""
+    try:
+        get_client('s3').delete_object(Bucket=config.CONFIRMATION_DATA_BUCKET, Key=key)
+    except Exception as e:
+        logger.warning("Failed to delete staged confirmation data", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'data_key': key
+        })
+
+
+def handle_confirmation_job(job: Job) -> bool:
+    """Process one queued confirmation job. Returns False if it should be retried."""
+    if job.job_type != CONFIRMATION_JOB:
+        logger.error("Unknown job type - dropping", extra={
+            'job_id': job.job_id,
+            'job_type': job.job_type
+        })
+        return True
+
+    payload = job.payload
+    data_key = payload.get('application_data_key')
+    if data_key:
+        data = load_application_data(data_key)
+        if data is None:
+            # Deleted after a successful send; this is a redelivery
+            logger.warning("Staged confirmation data missing - dropping job", extra={
+                'job_id': job.job_id,
+                'application_id': payload['application_id']
+            })
+            return True
+    else:
+        # Jobs queued before the body was staged in S3, and local backends
+        data = payload['application_data']
+
+    sent = send_application_confirmation(
+        data=data,
+        application_id=payload['application_id'],
+        contact_id=payload['contact_id'],
+        payment_amount=payload.get('payment_amount', 0.0)
+    )
+    if sent and data_key:
+        delete_application_data(data_key)
+    return sent
+
+
+def send_application_confirmation(
+    data: Dict[str, Any],
+    application_id: int,
+    contact_id: int,
+    payment_amount: float
+) -> bool:
+    """
+    Generate the application PDF and email it to the applicant.
+
+    Returns True when the email was sent (with or without the PDF).
+    """
+    email = data['email'].lower()
+    first_name = data.get('firstName', '').strip()
+    last_name = data.get('lastName', '').strip()
+    email_sent = False
+
+    if send_partnership_confirmation_email:
+        try:
+            # Get CC addresses from environment variable (comma-separated)
+            cc_addresses_str = os.environ.get('SES_CC_ADDRESSES', '')
+            cc_addresses = []
+            if cc_addresses_str:
+                cc_addresses = [addr.strip() for addr in cc_addresses_str.split(',') if addr.strip()]
+
+            logger.info("Sending confirmation email", extra={
+                'recipient_email': email,
+                'application_id': application_id,
+                'has_cc_addresses': bool(cc_addresses),
+                'cc_count': len(cc_addresses) if cc_addresses else 0
+            })
+
+            # Generate PDF attachment - simplified approach
+            pdf_bytes = None
+            pdf_filename = None
+
+            # Check if template is configured
+            if config.TEMPLATE_BUCKET and config.TEMPLATE_KEY:
+                try:
+                    logger.info("Generating PDF attachment from template", extra={
+                        'application_id': application_id,
+                        'template_bucket': config.TEMPLATE_BUCKET,
+                        'template_key': config.TEMPLATE_KEY
+                    })
+
+                    # Load template from S3
+                    template_bytes = load_template_from_s3(
+                        config.TEMPLATE_BUCKET,
+                        config.TEMPLATE_KEY
+                    )
+
+                    # Generate PDF with overlay and signature
+                    pdf_bytes = generate_pdf(
+                        template_bytes=template_bytes,
+                        application_data=data,
+                        placeholder_positions=config.PLACEHOLDER_POSITIONS,
+                        signature_position=config.SIGNATURE_POSITION,
+                        signature_size=config.SIGNATURE_SIZE
+                    )
+
+                    pdf_filename = generate_pdf_filename(
+                        f"{first_name} {last_name}",
+                        data.get('phone', '0000')
+                    )
+
+                    logger.info("✓ PDF generated successfully", extra={
+                        'pdf_filename': pdf_filename,
+                        'pdf_size': len(pdf_bytes)
+                    })
+                except Exception as pdf_error:
+                    logger.error("✗ Failed to generate PDF attachment", extra={
+                        'error_type': type(pdf_error).__name__,
+                        'error_message': str(pdf_error),
+                        'application_id': application_id
+                    }, exc_info=True)
+                    pdf_bytes = None
+                    pdf_filename = None
+            else:
+                logger.warning("PDF template not configured - skipping PDF generation", extra={
+                    'TEMPLATE_BUCKET': config.TEMPLATE_BUCKET or 'NOT SET',
+                    'TEMPLATE_KEY': config.TEMPLATE_KEY or 'NOT SET'
+                })
+
+            # Send email
+            full_name = f"{first_name} {last_name}"
+            email_sent = send_partnership_confirmation_email(
+                recipient_email=email,
+                full_name=full_name,
+                application_id=application_id,
+                contact_id=contact_id,
+                payment_amount=payment_amount,
+                partnership_tier=data['partnershipTier'],
+                company_name=data.get('companyName', ''),
+                cc_addresses=cc_addresses if cc_addresses else None,
+                pdf_bytes=pdf_bytes,
+                pdf_filename=pdf_filename
+            )
+
+            if email_sent:
+                logger.info("✓ Confirmation email sent successfully", extra={
+                    'recipient_email': email,
+                    'application_id': application_id
+                })
+            else:
+                logger.warning("⚠ Failed to send confirmation email, but application was saved", extra={
+                    'recipient_email': email,
+                    'application_id': application_id
+                })
+
+        except Exception as email_error:
+            # Log email error but don't fail the entire transaction
+            logger.error("Error sending confirmation email (application still saved)", extra={
+                'error_type': type(email_error).__name__,
+                'error_message': str(email_error),
+                'recipient_email': email,
+                'application_id': application_id
+            }, exc_info=True)
+    else:
+        logger.warning("Email service not available - skipping confirmation email")
+
+    return email_sent
@@ -3,23 +3,23 @@ Email Service
 Handles sending emails via AWS SES for Incentive Beneficiary Partner Program (IBPP) applications
 """
 import os
-import boto3
 from botocore.exceptions import ClientError
 from typing import Optional, List
 from datetime import datetime
-import logging
 from zoneinfo import ZoneInfo  # Python 3.9+
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 from email.mime.text import MIMEText
 
-# Configure logging
-logger = logging.getLogger()
+from services.aws_clients import get_client
+from services.log_control import get_logger
+from services.tracing import traced
 
-# Initialize SES client
-ses_client = boto3.client('ses')
+# Configure logging
+logger = get_logger(__name__)
 
 
+@traced('ses')
 def send_partnership_confirmation_email(
     recipient_email: str,
     full_name: str,
@@ -51,21 +51,14 @@ def send_partnership_confirmation_email(
         bool: True if email sent successfully, False otherwise
     """
     operation = "send_partnership_confirmation_email"
-    logger.info("=" * 60)
-    logger.info(f"=== {operation.upper()} START ===")
-    logger.info("=" * 60)
-    logger.info(f"Recipient: {recipient_email}")
-    logger.info(f"Application ID: {application_id}")
-    logger.info(f"Contact ID: {contact_id}")
-    logger.info(f"Full Name: {full_name}")
-    logger.info(f"Partnership Tier: {partnership_tier}")
-    logger.info(f"PDF Attachment Status:")
-    logger.info(f"  - pdf_bytes provided: {pdf_bytes is not None}")
-    logger.info(f"  - pdf_filename provided: {pdf_filename is not None}")
-    if pdf_bytes:
-        logger.info(f"  - PDF size: {len(pdf_bytes)} bytes ({len(pdf_bytes) / 1024:.2f} KB)")
-        logger.info(f"  - PDF filename: {pdf_filename}")
-    logger.info("=" * 60)
+    logger.info(f"=== {operation.upper()} START ===", extra={
+        'recipient_email': recipient_email,
+        'application_id': application_id,
+        'contact_id': contact_id,
+        'partnership_tier': partnership_tier,
+        'pdf_filename': pdf_filename,
+        'pdf_size': len(pdf_bytes) if pdf_bytes else None
+    })
 
     try:
         # Get sender email and sender name from environment
@@ -233,15 +226,7 @@ This is an automated message. Please do not reply to this email.
         """
 
         # If PDF attachment is provided, use raw email with MIME multipart
-        logger.info("=" * 60)
-        logger.info("Email Sending Decision Point")
-        logger.info("=" * 60)
-        logger.info(f"pdf_bytes is not None: {pdf_bytes is not None}")
-        logger.info(f"pdf_filename is not None: {pdf_filename is not None}")
-
         if pdf_bytes and pdf_filename:
-            logger.info("✓ PDF attachment available - Using send_raw_email with MIME multipart")
-            logger.info("=" * 60)
             logger.info("Sending email with PDF attachment via SES", extra={
                 'source': source,
                 'to_email': recipient_email,
@@ -281,7 +266,7 @@ This is an automated message. Please do not reply to this email.
                 destinations.extend(cc_addresses_list)
 
             # Send raw email
-            response = ses_client.send_raw_email(
+            response = get_client('ses').send_raw_email(
                 Source=source,
                 Destinations=destinations,
                 RawMessage={'Data': msg.as_string()}
@@ -295,13 +280,10 @@ This is an automated message. Please do not reply to this email.
                 'pdf_filename': pdf_filename
             })
         else:
-            logger.error("✗ PDF attachment NOT available - Using send_email WITHOUT attachment")
-            logger.error("  WARNING: Email will be sent without the PDF attachment!")
-            if not pdf_bytes:
-                logger.error("  Reason: pdf_bytes is None")
-            if not pdf_filename:
-                logger.error("  Reason: pdf_filename is None")
-            logger.info("=" * 60)
+            logger.error("✗ PDF attachment NOT available - sending email WITHOUT attachment", extra={
+                'pdf_bytes_missing': not pdf_bytes,
+                'pdf_filename_missing': not pdf_filename
+            })
 
             # Send regular email without attachment
             # Prepare destination
@@ -324,7 +306,7 @@ This is an automated message. Please do not reply to this email.
                 'has_cc': 'CcAddresses' in destination
             })
 
-            response = ses_client.send_email(
+            response = get_client('ses').send_email(
                 Source=source,
                 Destination=destination,
                 Message={
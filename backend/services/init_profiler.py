@@ -0,0 +1,151 @@
+"""
+Init Profiler
+Records what a Lambda execution environment spends before its first request.
+
+Import this module before anything else in a handler module; the init clock
+starts when it is imported. Wrap the expensive imports so each is timed:
+
+    with init_profiler.timed_import('pymysql'):
+        import pymysql
+
+then call mark_init_complete() at the end of the module and decorate the
+handler with @profiled_handler. The first invocation of the environment is the
+cold one: when it finishes, one CloudWatch embedded-metric-format (EMF) line
+is printed with the init duration, the per-module import durations and the
+construction time of every AWS client built so far (services/aws_clients.py).
+Warm invocations emit nothing.
+
+Timings are cumulative: a module imported inside another timed import is
+counted in both, and a module already imported by an earlier one costs ~0.
+boto3 is reported as Import.boto3 when the first AWS client imported it.
+"""
+import os
+import json
+import time
+
+INIT_STARTED = time.perf_counter()
+
+import logging
+import functools
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from backend import config
+except ImportError:
+    import config
+
+logger = logging.getLogger(__name__)
+
+_import_ms: Dict[str, float] = {}
+_init_ms: Optional[float] = None
+_init_completed_at: Optional[float] = None
+_invocations = 0
+
+
+@contextmanager
+def timed_import(name: str):
+    """Time the import statements in the with block under name."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _import_ms[name] = _import_ms.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def mark_init_complete() -> float:
+    """Record the end of module init and return its duration in milliseconds."""
+    global _init_ms, _init_completed_at
+    _init_completed_at = time.perf_counter()
+    _init_ms = (_init_completed_at - INIT_STARTED) * 1000
+    logger.info("Init complete", extra={
+        'init_ms': round(_init_ms, 1),
+        'import_ms': import_times()
+    })
+    return _init_ms
+
+
+def import_times() -> Dict[str, float]:
+    return {name: round(ms, 1) for name, ms in _import_ms.items()}
+
+
+def is_cold_start() -> bool:
+    """True while the first invocation of this execution environment is running."""
+    return _invocations <= 1
+
+
+def _client_times() -> Dict[str, float]:
+    from services.aws_clients import client_construction_times
+    return {name: round(ms, 1) for name, ms in client_construction_times().items()}
+
+
+def _lazy_import_times() -> Dict[str, float]:
+    # boto3 is imported by the first get_client, usually during the first request
+    from services.aws_clients import boto3_import_ms
+    imported_ms = boto3_import_ms()
+    return {'boto3': round(imported_ms, 1)} if imported_ms is not None else {}
+
+
+def build_metrics(first_invocation_ms: float, function_name: str = '') -> Dict[str, Any]:
+    """Return the EMF document describing this environment's cold start."""
+    client_ms = _client_times()
+    values = {
+        'InitDuration': round(_init_ms or 0.0, 1),
+        'FirstInvocationDuration': round(first_invocation_ms, 1),
+        'ColdStart': 1,
+    }
+    for name, ms in {**import_times(), **_lazy_import_times()}.items():
+        values[f'Import.{name}'] = ms
+    for name, ms in client_ms.items():
+        values[f'Client.{name}'] = ms
+
+    units = {'ColdStart': 'Count'}
+    document = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': config.METRICS_NAMESPACE,
+                'Dimensions': [['FunctionName']],
+                'Metrics': [{'Name': name, 'Unit': units.get(name, 'Milliseconds')} for name in values]
+            }]
+        },
+        'FunctionName': function_name or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local'),
+        'InitializationType': os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE', 'on-demand'),
+        # Provisioned concurrency and SnapStart init well before the first request
+        'IdleBeforeFirstInvocationMs': round((time.perf_counter() - (_init_completed_at or INIT_STARTED)) * 1000 - first_invocation_ms, 1),
+    }
+    document.update(values)
+    return document
+
+
+def emit_cold_start_metrics(first_invocation_ms: float, function_name: str = '') -> None:
+    if not config.INIT_METRICS_ENABLED:
+        return
+    try:
+        # EMF must be a bare JSON line on stdout; the logging formatter would prefix it
+        print(json.dumps(build_metrics(first_invocation_ms, function_name)), flush=True)
+    except Exception as e:
+        logger.warning("⚠ Could not emit cold start metrics", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e)
+        })
+
+
+def profiled_handler(handler: Callable) -> Callable:
+    """Count invocations and emit cold start metrics when the first one finishes."""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _invocations
+        _invocations += 1
+        if _invocations > 1:
+            return handler(event, context)
+
+        started = time.perf_counter()
+        try:
+            return handler(event, context)
+        finally:
+            emit_cold_start_metrics(
+                (time.perf_counter() - started) * 1000,
+                getattr(context, 'function_name', '') if context else ''
+            )
+    return wrapper
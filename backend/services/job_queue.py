@@ -0,0 +1,233 @@
+"""
+Job Queue
+Background job queue used to move post-commit work (PDF + email) off the request path.
+
+Backends (JOB_QUEUE_BACKEND):
+- sqs: Amazon SQS queue at CONFIRMATION_QUEUE_URL (production)
+- sqlite: local SQLite file at JOB_QUEUE_SQLITE_PATH (local runs and tests)
+- memory: in-process list (tests)
+- inline: no queue, the job handler runs immediately in the caller
+"""
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from backend import config
+except ImportError:
+    import config
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A received job; pass it back to ack() or nack() when done"""
+
+    __slots__ = ('job_id', 'job_type', 'payload', 'receipt')
+
+    def __init__(self, job_id: str, job_type: str, payload: Dict[str, Any], receipt: Any = None):
+        self.job_id = job_id
+        self.job_type = job_type
+        self.payload = payload
+        self.receipt = receipt
+
+
+def encode_job(job_type: str, payload: Dict[str, Any]) -> str:
+    return json.dumps({'job_type': job_type, 'payload': payload}, default=str)
+
+
+def decode_job(job_id: str, body: str, receipt: Any = None) -> Job:
+    message = json.loads(body)
+    return Job(job_id, message['job_type'], message['payload'], receipt)
+
+
+class SQSJobQueue:
+    def __init__(self, queue_url: str):
+        from services.aws_clients import get_client
+        self.queue_url = queue_url
+        self._client = get_client('sqs')
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any]) -> str:
+        response = self._client.send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=encode_job(job_type, payload)
+        )
+        return response['MessageId']
+
+    def receive(self, max_jobs: int = 10) -> List[Job]:
+        response = self._client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_jobs, 10),
+            WaitTimeSeconds=0
+        )
+        return [
+            decode_job(m['MessageId'], m['Body'], m['ReceiptHandle'])
+            for m in response.get('Messages', [])
+        ]
+
+    def ack(self, job: Job) -> None:
+        self._client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=job.receipt)
+
+    def nack(self, job: Job) -> None:
+        # Leave the message in place; SQS redelivers it after the visibility timeout
+        pass
+
+
+class SQLiteJobQueue:
+    """
+    Durable local stand-in for SQS.
+
+    Received jobs stay invisible for visibility_timeout seconds and are
+    redelivered if they are neither acked nor nacked in that time.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 300.0):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    visible_at REAL NOT NULL,
+                    receive_count INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_visible_at ON jobs(visible_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level='IMMEDIATE')
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any]) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, body, visible_at, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, encode_job(job_type, payload), now, now)
+            )
+        return job_id
+
+    def receive(self, max_jobs: int = 10) -> List[Job]:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id, body FROM jobs WHERE visible_at <= ? ORDER BY created_at LIMIT ?",
+                (now, max_jobs)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET visible_at = ?, receive_count = receive_count + 1 WHERE job_id = ?",
+                [(now + self.visibility_timeout, job_id) for job_id, _ in rows]
+            )
+        return [decode_job(job_id, body, job_id) for job_id, body in rows]
+
+    def ack(self, job: Job) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job.job_id,))
+
+    def nack(self, job: Job) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET visible_at = ? WHERE job_id = ?", (time.time(), job.job_id))
+
+    def __len__(self) -> int:
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+
+class MemoryJobQueue:
+    """In-process queue; jobs are lost when the process exits"""
+
+    def __init__(self):
+        self._jobs = deque()
+        self._lock = threading.Lock()
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any]) -> str:
+        job_id = str(uuid.uuid4())
+        # Round-trip through JSON so tests see exactly what SQS would deliver
+        with self._lock:
+            self._jobs.append(decode_job(job_id, encode_job(job_type, payload)))
+        return job_id
+
+    def receive(self, max_jobs: int = 10) -> List[Job]:
+        with self._lock:
+            return [self._jobs.popleft() for _ in range(min(max_jobs, len(self._jobs)))]
+
+    def ack(self, job: Job) -> None:
+        pass
+
+    def nack(self, job: Job) -> None:
+        with self._lock:
+            self._jobs.append(job)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+class InlineJobQueue:
+    """Runs the handler immediately instead of queueing (no background worker deployed)"""
+
+    def __init__(self, handler: Callable[[Job], Any]):
+        self._handler = handler
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any]) -> str:
+        job = decode_job(str(uuid.uuid4()), encode_job(job_type, payload))
+        self._handler(job)
+        return job.job_id
+
+    def receive(self, max_jobs: int = 10) -> List[Job]:
+        return []
+
+    def ack(self, job: Job) -> None:
+        pass
+
+    def nack(self, job: Job) -> None:
+        pass
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue(inline_handler: Optional[Callable[[Job], Any]] = None):
+    """
+    Return the process-wide job queue selected by JOB_QUEUE_BACKEND.
+
+    Defaults to SQS when CONFIRMATION_QUEUE_URL is set and to inline
+    execution otherwise.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            return _queue
+
+        backend = config.JOB_QUEUE_BACKEND or ('sqs' if config.CONFIRMATION_QUEUE_URL else 'inline')
+
+        if backend == 'sqs':
+            _queue = SQSJobQueue(config.CONFIRMATION_QUEUE_URL)
+        elif backend == 'sqlite':
+            _queue = SQLiteJobQueue(config.JOB_QUEUE_SQLITE_PATH)
+        elif backend == 'memory':
+            _queue = MemoryJobQueue()
+        elif backend == 'inline':
+            if inline_handler is None:
+                raise ValueError("inline job queue requires a handler")
+            _queue = InlineJobQueue(inline_handler)
+        else:
+            raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {backend}")
+
+        logger.info("Job queue initialized", extra={'job_queue_backend': backend})
+        return _queue
+
+
+def set_job_queue(queue) -> None:
+    """Replace the process-wide job queue (tests and local runs)."""
+    global _queue
+    with _queue_lock:
+        _queue = queue
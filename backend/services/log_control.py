@@ -0,0 +1,133 @@
+"""
+Log Control
+Keeps per-request logging cheap and safe in production.
+
+- configure_logging(): root level from LOG_LEVEL, per-logger levels from
+  LOG_LEVELS (e.g. "services.pdf_generator=WARNING,botocore=WARNING") and the
+  redaction filter on the root handlers. Safe to call from every handler module.
+- get_logger(name): a logger whose extra= may be a zero-argument callable. It is
+  only called when the record will actually be emitted, so large diagnostic
+  extras cost nothing at INFO:
+
+      logger.debug("Presign request headers", extra=lambda: {'headers': headers})
+
+- begin_invocation(): with LOG_DEBUG_SAMPLE_RATE > 0, logs that invocation at
+  DEBUG with that probability (loggers given an explicit level in LOG_LEVELS
+  keep it) and returns whether it was sampled.
+- Redaction: string extras whose key looks sensitive (password, token, NRIC,
+  authorization, cookie, ...) are masked, including inside dicts and lists,
+  and the query string of signed URLs is dropped.
+"""
+import re
+import random
+import logging
+from typing import Any, Dict, Optional
+
+try:
+    from backend import config
+except ImportError:
+    import config
+
+REDACTED = '[REDACTED]'
+
+_SENSITIVE_KEY_RE = re.compile(
+    r'password|passwd|secret|token|authorization|cookie|api[-_]?key|signature|nric|identification_card',
+    re.IGNORECASE
+)
+_SIGNED_URL_MARKERS = ('X-Amz-Signature=', 'Signature=', 'X-Amz-Credential=')
+# Attributes every LogRecord has; everything else came from extra=
+_RECORD_ATTRS = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+
+_configured = False
+_base_level = logging.INFO
+_sampled = False
+
+
+def redact(key: str, value: Any, depth: int = 0) -> Any:
+    """Return value with sensitive entries masked."""
+    if depth > 4:
+        return value
+    if isinstance(value, str):
+        if key and _SENSITIVE_KEY_RE.search(key):
+            return REDACTED
+        if '?' in value and any(marker in value for marker in _SIGNED_URL_MARKERS):
+            return value.split('?', 1)[0] + '?' + REDACTED
+        return value
+    if isinstance(value, dict):
+        return {k: redact(str(k), v, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(key, v, depth + 1) for v in value]
+    return value
+
+
+class RedactingFilter(logging.Filter):
+    """Masks sensitive extras on every record that reaches a handler."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and isinstance(value, (str, dict, list, tuple)):
+                record.__dict__[key] = redact(key, value)
+        return True
+
+
+class LazyExtraLogger(logging.LoggerAdapter):
+    """Logger adapter that builds callable extras only for records that are emitted."""
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__(logger, None)
+
+    def process(self, msg, kwargs):
+        extra = kwargs.get('extra')
+        if callable(extra):
+            kwargs['extra'] = extra()
+        return msg, kwargs
+
+
+def get_logger(name: Optional[str] = None) -> LazyExtraLogger:
+    return LazyExtraLogger(logging.getLogger(name))
+
+
+def _parse_levels(spec: str) -> Dict[str, int]:
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        name, level = name.strip(), level.strip().upper()
+        if name and isinstance(logging.getLevelName(level), int):
+            levels[name] = logging.getLevelName(level)
+    return levels
+
+
+def configure_logging() -> None:
+    """Apply LOG_LEVEL, LOG_LEVELS and redaction once per process."""
+    global _configured, _base_level
+    if _configured:
+        return
+    _configured = True
+
+    root = logging.getLogger()
+    level = logging.getLevelName(config.LOG_LEVEL.upper())
+    _base_level = level if isinstance(level, int) else logging.INFO
+    root.setLevel(_base_level)
+
+    for name, module_level in _parse_levels(config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    if config.LOG_REDACT:
+        redacting = RedactingFilter()
+        # Filters on a logger do not see records propagated from child loggers;
+        # filters on the handlers do. Without handlers yet, filter root's own records.
+        for handler in root.handlers or []:
+            handler.addFilter(redacting)
+        if not root.handlers:
+            root.addFilter(redacting)
+
+
+def begin_invocation() -> bool:
+    """Decide whether this invocation logs at DEBUG; call at the top of a handler."""
+    global _sampled
+    rate = config.LOG_DEBUG_SAMPLE_RATE
+    sampled = rate > 0 and random.random() < rate
+    if sampled != _sampled:
+        logging.getLogger().setLevel(logging.DEBUG if sampled else _base_level)
+        _sampled = sampled
+    return sampled
@@ -0,0 +1,244 @@
+"""
+Batch PDF rendering for many applications (audits, template revisions).
+
+The template is compiled once per worker process and rendering fans out
+across CPU cores with a ProcessPoolExecutor. Finished PDFs are streamed to a
+local directory or an s3://bucket/prefix as they complete; a failing record is
+reported and the batch carries on. Each agreement is dated from the record's
+submitted_date or submitted_at, not the day of the re-render.
+
+Usage (from backend/):
+    python -m services.pdf_batch --template s3://bucket/template.pdf \\
+        --input applications.jsonl --output s3://bucket/regenerated/ --report report.jsonl
+"""
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from backend import config
+except ImportError:
+    import config
+
+from services.pdf_generator import CompiledTemplate, generate_pdf, generate_pdf_filename, load_template_from_s3
+
+logger = logging.getLogger(__name__)
+
+# Per-process state set up by _init_worker
+_worker = {}
+
+
+def _split_s3_uri(uri: str):
+    bucket, _, prefix = uri[len('s3://'):].partition('/')
+    return bucket, prefix
+
+
+class _OutputWriter:
+    """Writes rendered PDFs to a directory or an s3://bucket/prefix."""
+
+    def __init__(self, output: str):
+        self.output = output
+        if output.startswith('s3://'):
+            from services.aws_clients import get_client
+            self.bucket, self.prefix = _split_s3_uri(output)
+            self._s3 = get_client('s3')
+        else:
+            self.bucket = None
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, filename: str, pdf_bytes: bytes) -> str:
+        if self.bucket:
+            key = f"{self.prefix.rstrip('/')}/{filename}" if self.prefix else filename
+            self._s3.put_object(Bucket=self.bucket, Key=key, Body=pdf_bytes, ContentType='application/pdf')
+            return f"s3://{self.bucket}/{key}"
+
+        path = os.path.join(self.output, filename)
+        with open(path, 'wb') as f:
+            f.write(pdf_bytes)
+        return path
+
+
+def _init_worker(template_bytes: bytes, output: str) -> None:
+    # Compile once per process; every record in this worker reuses it
+    _worker['template'] = CompiledTemplate(template_bytes)
+    _worker['writer'] = _OutputWriter(output)
+
+
+def _output_filename(index: int, record: Dict[str, Any]) -> str:
+    full_name = f"{record.get('firstName', '')} {record.get('lastName', '')}".strip()
+    filename = generate_pdf_filename(full_name, record.get('phone', '0000'))
+    # Prefix with the application ID (or input position) so names never collide within a batch
+    identifier = record.get('application_id') or record.get('applicationId') or f"row{index}"
+    return f"{identifier}_{filename}"
+
+
+def _render_one(index: int, record: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        pdf_bytes = generate_pdf(
+            None,
+            record,
+            config.PLACEHOLDER_POSITIONS,
+            config.SIGNATURE_POSITION,
+            config.SIGNATURE_SIZE,
+            template=_worker['template'],
+            submitted_date=record.get('submitted_date') or record.get('submitted_at') or record.get('submittedAt')
+        )
+        location = _worker['writer'].write(_output_filename(index, record), pdf_bytes)
+        return {
+            'index': index,
+            'ok': True,
+            'output': location,
+            'size': len(pdf_bytes),
+            'seconds': round(time.perf_counter() - started, 4)
+        }
+    except Exception as e:
+        return {
+            'index': index,
+            'ok': False,
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'seconds': round(time.perf_counter() - started, 4)
+        }
+
+
+def iter_render_batch(
+    records: Iterable[Dict[str, Any]],
+    template_bytes: bytes,
+    output: str,
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Render every record and yield one result dict per record as it completes.
+
+    Records are consumed lazily; at most max_in_flight renders are queued at
+    once so arbitrarily large inputs are never held in memory.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or max_workers * 4
+
+    # Fail fast on a broken template instead of once per record
+    CompiledTemplate(template_bytes)
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(template_bytes, output)
+    ) as executor:
+        pending = {}
+        for index, record in enumerate(records):
+            pending[executor.submit(_render_one, index, record)] = index
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.pop(future)
+                    yield future.result()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                yield future.result()
+
+
+def render_batch(
+    records: Iterable[Dict[str, Any]],
+    template_bytes: bytes,
+    output: str,
+    max_workers: Optional[int] = None,
+    report_stream=None
+) -> Dict[str, Any]:
+    """
+    Render a batch and return a summary; per-record results go to report_stream as JSON lines.
+    """
+    started = time.perf_counter()
+    summary = {'rendered': 0, 'failed': 0, 'bytes': 0}
+
+    for result in iter_render_batch(records, template_bytes, output, max_workers=max_workers):
+        if result['ok']:
+            summary['rendered'] += 1
+            summary['bytes'] += result['size']
+        else:
+            summary['failed'] += 1
+            logger.error("Failed to render application PDF", extra=result)
+        if report_stream is not None:
+            report_stream.write(json.dumps(result) + '\n')
+
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream application records from a .jsonl/.json-lines or .csv file ('-' for JSONL on stdin)."""
+    if path == '-':
+        for line in sys.stdin:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _load_template(location: str) -> bytes:
+    if location.startswith('s3://'):
+        bucket, key = _split_s3_uri(location)
+        return load_template_from_s3(bucket, key)
+    with open(location, 'rb') as f:
+        return f.read()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render application PDFs in bulk")
+    parser.add_argument('--template', default=None,
+                        help='Template PDF path or s3://bucket/key (default: TEMPLATE_BUCKET/TEMPLATE_KEY)')
+    parser.add_argument('--input', required=True, help='Application records (.jsonl or .csv, - for stdin)')
+    parser.add_argument('--output', required=True, help='Output directory or s3://bucket/prefix')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--report', default=None, help='Write per-record results as JSON lines to this file')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    template = args.template
+    if not template:
+        if not (config.TEMPLATE_BUCKET and config.TEMPLATE_KEY):
+            parser.error('--template is required when TEMPLATE_BUCKET/TEMPLATE_KEY are not set')
+        template = f"s3://{config.TEMPLATE_BUCKET}/{config.TEMPLATE_KEY}"
+
+    template_bytes = _load_template(template)
+
+    report_stream = open(args.report, 'w') if args.report else None
+    try:
+        summary = render_batch(
+            read_records(args.input),
+            template_bytes,
+            args.output,
+            max_workers=args.workers,
+            report_stream=report_stream
+        )
+    finally:
+        if report_stream is not None:
+            report_stream.close()
+
+    print(json.dumps(summary))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,15 +4,13 @@ Uses template overlay approach with PIL mock for broken Lambda layer.
 """
 import io
 import re
+import math
 import base64
-import logging
-try:
-    import boto3
-except Exception:
-    boto3 = None
+import hashlib
 import sys
 import platform
-from datetime import datetime
+from collections import OrderedDict
+from datetime import date, datetime, timezone
 from zoneinfo import ZoneInfo
 
 # Import config for field width limits
@@ -20,9 +18,14 @@ try:
     from backend import config
 except ImportError:
     import config
- 
 
-logger = logging.getLogger()
+from services.aws_clients import get_client
+from services.log_control import get_logger
+from services.template_cache import TemplateCache
+from services.tracing import traced
+from services.pdf_overlay_writer import OverlayWriter, UnsupportedImageError, image_from_bytes
+
+logger = get_logger(__name__)
 
 
 def get_malaysia_time():
@@ -31,6 +34,42 @@ def get_malaysia_time():
     return datetime.now(malaysia_tz)
 
 
+def get_submitted_date(value=None):
+    """
+    Submission date for the agreement as dd/mm/YYYY in Malaysia time.
+
+    value is the original submission time of a re-rendered application
+    (services/pdf_batch.py): a date, a datetime or ISO 8601 string (without a
+    timezone it is taken as UTC, like the database's NOW()), or an already
+    formatted dd/mm/YYYY string. Live submissions pass None and get the
+    current date; so does a value that cannot be read.
+    """
+    if not value:
+        return get_malaysia_time().strftime("%d/%m/%Y")
+
+    if isinstance(value, str):
+        text = value.strip()
+        if re.match(r'^\d{2}/\d{2}/\d{4}$', text):
+            return text
+        try:
+            value = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            logger.warning("Unrecognized submission date - using current date", extra={'submitted_date': text})
+            return get_malaysia_time().strftime("%d/%m/%Y")
+
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(ZoneInfo("Asia/Kuala_Lumpur")).strftime("%d/%m/%Y")
+    if isinstance(value, date):
+        return value.strftime("%d/%m/%Y")
+
+    logger.warning("Unrecognized submission date - using current date", extra={
+        'submitted_date_type': type(value).__name__
+    })
+    return get_malaysia_time().strftime("%d/%m/%Y")
+
+
 def format_field_value(key, value):
     """Format field values for display in PDF"""
     if not value:
@@ -113,34 +152,41 @@ def _build_signature_image_reader(signature_data):
         return None
 
 
-def create_overlay(application_data, placeholder_positions, signature_position=None, signature_size=None, pagesize=None):
-    """Create PDF overlay with text fields and signature image at specified positions"""
-    try:
-        from reportlab.pdfgen import canvas
-        from pdfrw import PdfReader
-    except Exception as e:
-        logger.error(
-            "PDF dependency import failed (reportlab/pdfrw). This is commonly caused by a broken/incompatible Pillow (PIL) in the Lambda layer.",
-            extra={
-                'error_type': type(e).__name__,
-                'error_message': str(e),
-                'python_version': sys.version,
-                'platform': platform.platform(),
-                'machine': platform.machine(),
-            },
-            exc_info=True
-        )
-        raise
+_signature_images = OrderedDict()
+_SIGNATURE_IMAGE_LIMIT = 32
 
-    logger.info("Creating PDF overlay with application data")
 
-    packet = io.BytesIO()
-    if pagesize:
-        can = canvas.Canvas(packet, pagesize=pagesize)
-    else:
-        can = canvas.Canvas(packet)
-    can.setFont("Helvetica", 10)
+def _signature_pixel_size(signature_size):
+    """Largest useful signature resolution for the printed SIGNATURE_SIZE, or None for no limit."""
+    scale = getattr(config, 'SIGNATURE_PIXELS_PER_POINT', 0)
+    if not signature_size or not scale:
+        return None
+    width, height = signature_size
+    return (max(1, int(math.ceil(width * scale))), max(1, int(math.ceil(height * scale))))
+
 
+def get_signature_image(image_data, signature_size=None):
+    """Return the embeddable PdfImage for a decoded signature, cached by content hash."""
+    max_size = _signature_pixel_size(signature_size)
+    key = (hashlib.sha256(image_data).hexdigest(), max_size)
+    image = _signature_images.get(key)
+    if image is not None:
+        _signature_images.move_to_end(key)
+        return image
+
+    image = image_from_bytes(image_data, max_size=max_size)
+    _signature_images[key] = image
+    while len(_signature_images) > _SIGNATURE_IMAGE_LIMIT:
+        _signature_images.popitem(last=False)
+    return image
+
+
+def _prepare_overlay_fields(application_data, placeholder_positions, submitted_date=None):
+    """
+    Resolve the text to draw on the overlay.
+
+    Returns (data, text_draws) where text_draws is a list of (x, y, text).
+    """
     # Prepare data - combine first and last name if needed
     data = application_data.copy()
     if 'firstName' in data and 'lastName' in data:
@@ -201,18 +247,20 @@ def create_overlay(application_data, placeholder_positions, signature_position=N
     # Combine all address parts into single line with comma separators
     if address_parts:
         data['address'] = ', '.join(address_parts)
-        logger.info(f"Combined address field created: {data['address']}")
+        logger.debug("Combined address field created: %s", data['address'])
+
+    # Submission date: the caller's for re-renders, today (Malaysia time) for live submissions.
+    # Never taken from application_data, which on the live path is the client's request body
+    data['submitted_date'] = get_submitted_date(submitted_date)
 
-    # Add submitted date (current Malaysia time)
-    malaysia_now = get_malaysia_time()
-    data['submitted_date'] = malaysia_now.strftime("%d/%m/%Y")
+    text_draws = []
 
     # Draw text at specified positions
     for key, value in data.items():
         if key in placeholder_positions and value:
             x, y = placeholder_positions[key]
             formatted_value = format_field_value(key, value)
-            logger.debug(f"Adding text for key '{key}' at position ({x}, {y}): {formatted_value}")
+            logger.debug("Adding text for key '%s' at position (%s, %s): %s", key, x, y, formatted_value)
 
             # Handle multi-line fields if any
             if key in ['special_requests', 'notes', 'additionalRequests']:
@@ -221,7 +269,7 @@ def create_overlay(application_data, placeholder_positions, signature_position=N
                 line_height = 12
                 for i, line in enumerate(lines):
                     if i < 5:  # Limit to 5 lines
-                        can.drawString(x, y - i * line_height, line[:80])
+                        text_draws.append((x, y - i * line_height, line[:80]))
             elif key == 'address':
                 # Special handling for address field - wrap to second row if too long
                 max_width = getattr(config, 'ADDRESS_MAX_WIDTH', 80)
@@ -230,24 +278,84 @@ def create_overlay(application_data, placeholder_positions, signature_position=N
                 if len(address_text) > max_width:
                     # Draw first line
                     first_line = address_text[:max_width]
-                    can.drawString(x, y, first_line)
+                    text_draws.append((x, y, first_line))
 
                     # Draw second line at configured position
                     second_line = address_text[max_width:]
                     row2_position = getattr(config, 'ADDRESS_ROW2_POSITION', (x, y - 12))
                     x2, y2 = row2_position
                     # Truncate second line if it's also too long
-                    can.drawString(x2, y2, second_line[:max_width])
-                    logger.debug(f"Address wrapped to second row at ({x2}, {y2})")
+                    text_draws.append((x2, y2, second_line[:max_width]))
+                    logger.debug("Address wrapped to second row at (%s, %s)", x2, y2)
                 else:
                     # Single line address
-                    can.drawString(x, y, address_text)
+                    text_draws.append((x, y, address_text))
             else:
                 # Single line fields (default 60 character limit)
                 text_to_draw = formatted_value[:60]
-                can.drawString(x, y, text_to_draw)
+                text_draws.append((x, y, text_to_draw))
+
+    return data, text_draws
+
+
+def _render_overlay_native(text_draws, signature_data_url, signature_position, signature_size, pagesize):
+    """Build the overlay page with the built-in PDF writer (no reportlab import) as a pdfrw page."""
+    writer = OverlayWriter(pagesize=pagesize)
+    writer.set_font("Helvetica", 10)
+    for x, y, text in text_draws:
+        writer.draw_string(x, y, text)
+
+    if signature_data_url and signature_position and signature_size:
+        image = None
+        try:
+            logger.info("Processing signature data")
+            image_data = _decode_base64_image_data(signature_data_url)
+            if not image_data:
+                raise ValueError("Signature data is empty or could not be decoded")
+            image = get_signature_image(image_data, signature_size)
+        except UnsupportedImageError:
+            # Let the reportlab fallback have a go at this image
+            raise
+        except Exception as e:
+            logger.error(f"Error processing signature: {str(e)}", exc_info=True)
+
+        if image is not None:
+            x, y = signature_position
+            width, height = signature_size
+            writer.draw_image(image, x, y, width, height)
+            logger.info(f"Signature drawn at ({x}, {y}) size ({width}, {height})")
+
+    return writer.to_pdfrw_page()
+
+
+def _render_overlay_reportlab(text_draws, signature_data_url, signature_position, signature_size, pagesize):
+    """Write the overlay page with reportlab (fallback for the native writer)."""
+    try:
+        from reportlab.pdfgen import canvas
+    except Exception as e:
+        logger.error(
+            "PDF dependency import failed (reportlab). This is commonly caused by a broken/incompatible Pillow (PIL) in the Lambda layer.",
+            extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e),
+                'python_version': sys.version,
+                'platform': platform.platform(),
+                'machine': platform.machine(),
+            },
+            exc_info=True
+        )
+        raise
+
+    packet = io.BytesIO()
+    if pagesize:
+        can = canvas.Canvas(packet, pagesize=pagesize)
+    else:
+        can = canvas.Canvas(packet)
+    can.setFont("Helvetica", 10)
+
+    for x, y, text in text_draws:
+        can.drawString(x, y, text)
 
-    signature_data_url = data.get('signatureData') or data.get('signature_data')
     if signature_data_url and signature_position and signature_size:
         try:
             logger.info("Processing signature data")
@@ -262,111 +370,243 @@ def create_overlay(application_data, placeholder_positions, signature_position=N
             logger.error(f"Error processing signature: {str(e)}", exc_info=True)
 
     can.save()
-    packet.seek(0)
-    overlay_pdf = PdfReader(packet)
+    return packet.getvalue()
+
+
+def create_overlay(application_data, placeholder_positions, signature_position=None, signature_size=None, pagesize=None,
+                   submitted_date=None):
+    """
+    Create the overlay with text fields and signature image at specified positions.
+
+    submitted_date is passed to get_submitted_date(). Returns the overlay pages
+    as a list of pdfrw page objects.
+    """
+    pdfrw = _import_pdfrw()
+
+    logger.info("Creating PDF overlay with application data")
+
+    data, text_draws = _prepare_overlay_fields(application_data, placeholder_positions, submitted_date)
+    signature_data_url = data.get('signatureData') or data.get('signature_data')
+    render_args = (text_draws, signature_data_url, signature_position, signature_size, pagesize)
+
+    if getattr(config, 'PDF_OVERLAY_BACKEND', 'native') == 'native':
+        try:
+            # Built as pdfrw objects directly; no PDF serialization or parsing
+            return [_render_overlay_native(*render_args)]
+        except Exception as e:
+            logger.warning("Native overlay writer failed - falling back to reportlab", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e)
+            })
+
+    overlay_pdf = pdfrw.PdfReader(io.BytesIO(_render_overlay_reportlab(*render_args)))
     logger.info(f"Overlay PDF pages count: {len(overlay_pdf.pages)}")
-    return overlay_pdf
+    return list(overlay_pdf.pages)
+
+
+def _import_pdfrw():
+    try:
+        import pdfrw
+        return pdfrw
+    except Exception as e:
+        logger.error(
+            "PDF dependency import failed (pdfrw). If this error mentions PIL/_imaging, the Lambda layer Pillow binary is incompatible with the Lambda runtime/architecture.",
+            extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e),
+                'python_version': sys.version,
+                'platform': platform.platform(),
+                'machine': platform.machine(),
+            },
+            exc_info=True
+        )
+        raise
+
+
+def _page_size(page):
+    media_box = getattr(page, 'MediaBox', None)
+    if not (media_box and len(media_box) >= 4):
+        media_box = page.inheritable.MediaBox
+    return float(media_box[2]), float(media_box[3])
+
 
+class CompiledTemplate:
+    """
+    PDF template parsed once and reused for every render.
+
+    Parsing, object loading and MediaBox lookups happen in the constructor.
+    Each render works on shallow page copies (fresh page dicts and resource
+    dicts, shared content streams, fonts and images), so the parsed template
+    is never mutated and repeat renders skip PDF parsing entirely.
 
-def generate_pdf(template_bytes, application_data, placeholder_positions, signature_position=None, signature_size=None):
+    Only the pages and document info are written out; outlines and form
+    fields of the template are not carried over.
+    """
+
+    def __init__(self, template_bytes):
+        pdfrw = _import_pdfrw()
+
+        self.digest = hashlib.sha256(template_bytes).hexdigest()
+        self.template_size = len(template_bytes)
+
+        reader = pdfrw.PdfReader(io.BytesIO(template_bytes))
+        if not reader.pages:
+            raise ValueError("Template PDF contains no pages")
+        # Resolve every indirect object now instead of lazily during the first render
+        reader.read_all()
+
+        self.info = reader.Info
+        self.pages = list(reader.pages)
+        self.page_count = len(self.pages)
+        self.page_sizes = [_page_size(page) for page in self.pages]
+        self.page_size = self.page_sizes[0]
+
+    def copy_pages(self):
+        """Fresh, mergeable copies of the template pages."""
+        from pdfrw import PdfDict
+
+        copies = []
+        for page in self.pages:
+            inheritable = page.inheritable
+            resources = PdfDict(inheritable.Resources or {})
+            if resources.XObject is not None:
+                resources.XObject = PdfDict(resources.XObject)
+
+            page_copy = PdfDict(page)
+            page_copy.indirect = True
+            page_copy.Parent = None
+            page_copy.Resources = resources
+            page_copy.MediaBox = inheritable.MediaBox
+            page_copy.CropBox = inheritable.CropBox
+            page_copy.Rotate = inheritable.Rotate
+            copies.append(page_copy)
+        return copies
+
+    def render(self, overlay_pages):
+        """Merge overlay pages onto copies of the template pages and return PDF bytes."""
+        from pdfrw import PdfWriter, PageMerge
+
+        pages = self.copy_pages()
+        for page, overlay_page in zip(pages, overlay_pages):
+            PageMerge(page).add(overlay_page).render()
+
+        writer = PdfWriter()
+        writer.addpages(pages)
+        if self.info is not None:
+            writer.trailer.Info = self.info
+
+        output_stream = io.BytesIO()
+        writer.write(output_stream)
+        return output_stream.getvalue()
+
+
+_compiled_templates = OrderedDict()
+_COMPILED_TEMPLATE_LIMIT = 2
+
+
+def get_compiled_template(template_bytes):
+    """Return the CompiledTemplate for these bytes, parsing them only the first time."""
+    digest = hashlib.sha256(template_bytes).hexdigest()
+    template = _compiled_templates.get(digest)
+    if template is not None:
+        _compiled_templates.move_to_end(digest)
+        return template
+
+    template = CompiledTemplate(template_bytes)
+    _compiled_templates[digest] = template
+    while len(_compiled_templates) > _COMPILED_TEMPLATE_LIMIT:
+        _compiled_templates.popitem(last=False)
+    logger.info(f"Template PDF compiled - {template.page_count} page(s), MediaBox {template.page_size}")
+    return template
+
+
+@traced('pdf')
+def generate_pdf(template_bytes, application_data, placeholder_positions, signature_position=None, signature_size=None, template=None,
+                 submitted_date=None):
     """
     Generate filled PDF from template and application data.
     Returns PDF bytes.
 
     Args:
-        template_bytes: PDF template file as bytes
+        template_bytes: PDF template file as bytes (ignored when template is given)
         application_data: Dictionary containing application field values
         placeholder_positions: Dictionary mapping field names to (x, y) coordinates
         signature_position: Optional tuple (x, y) for signature placement
         signature_size: Optional tuple (width, height) for signature dimensions
+        template: Optional CompiledTemplate to render onto
+        submitted_date: Original submission time for re-renders; None dates the agreement today
 
     Returns:
         bytes: Generated PDF file content
     """
     try:
-        try:
-            from pdfrw import PdfReader, PdfWriter, PageMerge
-        except Exception as e:
-            logger.error(
-                "PDF dependency import failed (pdfrw). If this error mentions PIL/_imaging, the Lambda layer Pillow binary is incompatible with the Lambda runtime/architecture.",
-                extra={
-                    'error_type': type(e).__name__,
-                    'error_message': str(e),
-                    'python_version': sys.version,
-                    'platform': platform.platform(),
-                    'machine': platform.machine(),
-                },
-                exc_info=True
-            )
-            raise
+        if template is None:
+            template = get_compiled_template(template_bytes)
 
-        logger.info("=" * 60)
-        logger.info("Generating PDF from template")
-        logger.info("=" * 60)
-        logger.info(f"Template size: {len(template_bytes)} bytes")
-        logger.info(f"Application data fields: {list(application_data.keys())}")
-
-        template_pdf = PdfReader(io.BytesIO(template_bytes))
-        if not template_pdf.pages:
-            raise ValueError("Template PDF contains no pages")
-
-        logger.info(f"Template PDF loaded - {len(template_pdf.pages)} page(s)")
-
-        # Get page dimensions from template
-        page0 = template_pdf.pages[0]
-        media_box = getattr(page0, 'MediaBox', None)
-        if media_box and len(media_box) >= 4:
-            overlay_width = float(media_box[2])
-            overlay_height = float(media_box[3])
-        else:
-            overlay_width = float(page0.inheritable.MediaBox[2])
-            overlay_height = float(page0.inheritable.MediaBox[3])
-
-        logger.info(f"Using template MediaBox for overlay pagesize: ({overlay_width}, {overlay_height})")
+        overlay_width, overlay_height = template.page_size
+        logger.info("Generating PDF from template", extra={
+            'template_size': template.template_size,
+            'page_size': (overlay_width, overlay_height)
+        })
+        logger.debug("Application data fields", extra=lambda: {'fields': list(application_data.keys())})
 
         # Create overlay with application data and signature
-        overlay_pdf = create_overlay(
+        overlay_pages = create_overlay(
             application_data,
             placeholder_positions,
             signature_position,
             signature_size,
-            pagesize=(overlay_width, overlay_height)
+            pagesize=(overlay_width, overlay_height),
+            submitted_date=submitted_date
         )
 
         # Set overlay page size to match template
-        for overlay_page in overlay_pdf.pages:
+        for overlay_page in overlay_pages:
             overlay_page.MediaBox = [0, 0, overlay_width, overlay_height]
 
         # Merge overlay with template
-        for page, overlay_page in zip(template_pdf.pages, overlay_pdf.pages):
-            merger = PageMerge(page)
-            merger.add(overlay_page).render()
-        logger.info("Overlay merged with template PDF")
+        pdf_bytes = template.render(overlay_pages)
 
-        # Write output
-        output_stream = io.BytesIO()
-        PdfWriter().write(output_stream, template_pdf)
-        output_stream.seek(0)
-        pdf_bytes = output_stream.read()
-
-        logger.info(f"✓ PDF generation completed successfully - {len(pdf_bytes)} bytes ({len(pdf_bytes) / 1024:.2f} KB)")
-        logger.info("=" * 60)
+        logger.info("✓ PDF generation completed successfully", extra={'pdf_size': len(pdf_bytes)})
         return pdf_bytes
 
     except Exception as e:
-        logger.error("=" * 60)
-        logger.error(f"✗ ERROR generating PDF")
-        logger.error(f"  - Error Type: {type(e).__name__}")
-        logger.error(f"  - Error Message: {str(e)}")
-        logger.error("=" * 60)
-        logger.error(f"Full error:", exc_info=True)
+        logger.error("✗ ERROR generating PDF", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e)
+        }, exc_info=True)
         raise
 
 
+def _create_s3_client():
+    try:
+        return get_client('s3')
+    except ImportError:
+        raise RuntimeError("boto3 is required to load templates from S3, but it is not installed")
+
+
+_template_cache = None
+
+
+def get_template_cache():
+    """Process-wide template cache (memory + /tmp), created on first use"""
+    global _template_cache
+    if _template_cache is None:
+        _template_cache = TemplateCache(
+            _create_s3_client,
+            cache_dir=getattr(config, 'TEMPLATE_CACHE_DIR', '/tmp/template_cache') or None,
+            revalidate_interval=getattr(config, 'TEMPLATE_CACHE_REVALIDATE_SECONDS', 300)
+        )
+    return _template_cache
+
+
 def load_template_from_s3(bucket_name, template_key):
     """
     Load PDF template from S3 bucket
 
+    Served from the memory / /tmp cache in warm containers; S3 is only asked
+    to revalidate (If-None-Match) every TEMPLATE_CACHE_REVALIDATE_SECONDS.
+
     Args:
         bucket_name: S3 bucket name
         template_key: S3 object key for the template
@@ -375,36 +615,22 @@ def load_template_from_s3(bucket_name, template_key):
         bytes: PDF template file content
     """
     try:
-        if boto3 is None:
-            raise RuntimeError("boto3 is required to load templates from S3, but it is not installed")
-
-        logger.info("=" * 60)
-        logger.info("Loading PDF Template from S3")
-        logger.info("=" * 60)
-        logger.info(f"S3 URI: s3://{bucket_name}/{template_key}")
-
-        s3_client = boto3.client('s3')
-        logger.info("S3 client created successfully")
-
-        logger.info("Fetching object from S3...")
-        response = s3_client.get_object(Bucket=bucket_name, Key=template_key)
+        cache = get_template_cache()
+        template_bytes = cache.get(bucket_name, template_key)
 
-        template_bytes = response['Body'].read()
-        logger.info(f"✓ Template loaded successfully")
-        logger.info(f"  - Size: {len(template_bytes)} bytes ({len(template_bytes) / 1024:.2f} KB)")
-        logger.info(f"  - Content-Type: {response.get('ContentType', 'unknown')}")
-        logger.info("=" * 60)
+        logger.info(f"✓ Template loaded - s3://{bucket_name}/{template_key}", extra={
+            'template_size': len(template_bytes),
+            'template_cache': cache.stats()
+        })
 
         return template_bytes
     except Exception as e:
-        logger.error("=" * 60)
-        logger.error(f"✗ ERROR loading template from S3")
-        logger.error(f"  - Bucket: {bucket_name}")
-        logger.error(f"  - Key: {template_key}")
-        logger.error(f"  - Error Type: {type(e).__name__}")
-        logger.error(f"  - Error Message: {str(e)}")
-        logger.error("=" * 60)
-        logger.error(f"Full error:", exc_info=True)
+        logger.error("✗ ERROR loading template from S3", extra={
+            'bucket': bucket_name,
+            'key': template_key,
+            'error_type': type(e).__name__,
+            'error_message': str(e)
+        }, exc_info=True)
         raise
 
 
@@ -0,0 +1,465 @@
+"""
+Minimal PDF writer for the application overlay page.
+
+The overlay only ever contains Helvetica text at fixed positions and one
+signature image, so it is written directly as a PDF content stream instead of
+going through reportlab (whose import alone costs hundreds of milliseconds and
+pulls in Pillow). to_pdfrw_page() hands the page to pdfrw for merging onto the
+template as objects; to_bytes() writes a standalone single-page PDF.
+"""
+import io
+import zlib
+import struct
+import logging
+
+logger = logging.getLogger(__name__)
+
+# reportlab's default canvas size (US Letter), used when no pagesize is given
+DEFAULT_PAGESIZE = (612.0, 792.0)
+
+# Standard 14 fonts need no embedding; WinAnsi matches what reportlab emits for them
+STANDARD_FONTS = {
+    'Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique', 'Helvetica-BoldOblique',
+    'Times-Roman', 'Times-Bold', 'Times-Italic', 'Times-BoldItalic',
+    'Courier', 'Courier-Bold', 'Courier-Oblique', 'Courier-BoldOblique',
+}
+
+
+class UnsupportedImageError(ValueError):
+    """The image cannot be embedded without an image library"""
+    pass
+
+
+class PdfImage:
+    """
+    An image XObject ready to embed.
+
+    data is already encoded with `filter` (e.g. /DCTDecode JPEG bytes or
+    /FlateDecode zlib data); smask is an optional single-channel PdfImage used
+    as the soft mask (alpha).
+    """
+
+    __slots__ = ('width', 'height', 'color_space', 'bits', 'filter', 'data', 'decode_parms', 'smask')
+
+    def __init__(self, width, height, color_space, data, filter='/FlateDecode', bits=8,
+                 decode_parms=None, smask=None):
+        self.width = width
+        self.height = height
+        self.color_space = color_space
+        self.bits = bits
+        self.filter = filter
+        self.data = data
+        self.decode_parms = decode_parms
+        self.smask = smask
+
+    @property
+    def encoded_size(self):
+        return len(self.data) + (self.smask.encoded_size if self.smask is not None else 0)
+
+
+def _format_number(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return ('%.4f' % value).rstrip('0').rstrip('.')
+
+
+def _escape_text(text):
+    raw = str(text).encode('cp1252', errors='replace')
+    return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') \
+        .replace(b'\r', b'\\r').replace(b'\n', b'\\n')
+
+
+def _pdf_dict(entries):
+    parts = [b'<<']
+    for key, value in entries:
+        parts.append(b'/' + key.encode('ascii') + b' ' + value)
+    parts.append(b'>>')
+    return b' '.join(parts)
+
+
+class OverlayWriter:
+    """
+    Collects text and image drawing operations for one page and emits them as
+    pdfrw page objects or as a complete PDF document.
+    """
+
+    def __init__(self, pagesize=None, compress=True):
+        self.pagesize = tuple(pagesize) if pagesize else DEFAULT_PAGESIZE
+        self.compress = compress
+        self._ops = []
+        self._fonts = {}
+        self._images = []
+        self._font_name = None
+        self._font_size = None
+
+    def set_font(self, name, size):
+        if name not in STANDARD_FONTS:
+            raise ValueError(f"Only standard PDF fonts are supported, got {name}")
+        if name not in self._fonts:
+            self._fonts[name] = f"F{len(self._fonts) + 1}"
+        self._font_name = name
+        self._font_size = size
+
+    def draw_string(self, x, y, text):
+        if self._font_name is None:
+            self.set_font('Helvetica', 12)
+        self._ops.append(
+            b'BT /' + self._fonts[self._font_name].encode('ascii') + b' '
+            + _format_number(self._font_size).encode('ascii') + b' Tf 1 0 0 1 '
+            + _format_number(x).encode('ascii') + b' ' + _format_number(y).encode('ascii')
+            + b' Tm (' + _escape_text(text) + b') Tj ET'
+        )
+
+    def draw_image(self, image, x, y, width, height):
+        name = f"Im{len(self._images) + 1}"
+        self._images.append((name, image))
+        self._ops.append(
+            ('q %s 0 0 %s %s %s cm /%s Do Q' % (
+                _format_number(width), _format_number(height),
+                _format_number(x), _format_number(y), name
+            )).encode('ascii')
+        )
+
+    def _content(self):
+        """Return (content stream bytes, filter name or None)."""
+        content = b'\n'.join(self._ops)
+        if self.compress:
+            return zlib.compress(content), 'FlateDecode'
+        return content, None
+
+    def to_pdfrw_page(self):
+        """
+        Build the page directly as pdfrw objects, ready for PageMerge.
+
+        Same page as to_bytes() produces, without writing a PDF only to parse
+        it again.
+        """
+        from pdfrw import PdfDict, PdfName, PdfArray
+
+        def stream(data, **entries):
+            obj = PdfDict(**entries)
+            obj.indirect = True
+            # pdfrw keeps stream data as latin-1 text
+            obj.stream = data.decode('latin-1')
+            return obj
+
+        def image_xobject(image):
+            entries = {
+                'Type': PdfName.XObject,
+                'Subtype': PdfName.Image,
+                'Width': image.width,
+                'Height': image.height,
+                'ColorSpace': PdfName(image.color_space.lstrip('/')),
+                'BitsPerComponent': image.bits,
+            }
+            if image.filter:
+                entries['Filter'] = PdfName(image.filter.lstrip('/'))
+            if image.decode_parms:
+                entries['DecodeParms'] = PdfDict(**image.decode_parms)
+            if image.smask is not None:
+                entries['SMask'] = image_xobject(image.smask)
+            return stream(image.data, **entries)
+
+        resources = PdfDict(ProcSet=PdfArray([
+            PdfName.PDF, PdfName.Text, PdfName.ImageB, PdfName.ImageC, PdfName.ImageI
+        ]))
+        if self._fonts:
+            fonts = PdfDict()
+            for font_name, resource_name in self._fonts.items():
+                font = PdfDict(
+                    Type=PdfName.Font,
+                    Subtype=PdfName.Type1,
+                    BaseFont=PdfName(font_name),
+                    Encoding=PdfName.WinAnsiEncoding
+                )
+                font.indirect = True
+                fonts[PdfName(resource_name)] = font
+            resources.Font = fonts
+        if self._images:
+            xobjects = PdfDict()
+            for resource_name, image in self._images:
+                xobjects[PdfName(resource_name)] = image_xobject(image)
+            resources.XObject = xobjects
+
+        content, content_filter = self._content()
+        contents = stream(content, Filter=PdfName(content_filter)) if content_filter else stream(content)
+
+        width, height = self.pagesize
+        page = PdfDict(
+            Type=PdfName.Page,
+            MediaBox=PdfArray([0, 0, width, height]),
+            Resources=resources,
+            Contents=contents
+        )
+        page.indirect = True
+        return page
+
+    def to_bytes(self):
+        objects = []
+
+        def add(body):
+            objects.append(body)
+            return len(objects)
+
+        def ref(num):
+            return b'%d 0 R' % num
+
+        def stream(entries, data):
+            entries = list(entries) + [('Length', str(len(data)).encode('ascii'))]
+            return _pdf_dict(entries) + b'\nstream\n' + data + b'\nendstream'
+
+        catalog_num = add(None)
+        pages_num = add(None)
+        page_num = add(None)
+
+        font_refs = []
+        for font_name, resource_name in self._fonts.items():
+            font_num = add(_pdf_dict([
+                ('Type', b'/Font'),
+                ('Subtype', b'/Type1'),
+                ('BaseFont', b'/' + font_name.encode('ascii')),
+                ('Encoding', b'/WinAnsiEncoding'),
+            ]))
+            font_refs.append((resource_name, font_num))
+
+        image_refs = []
+        for resource_name, image in self._images:
+            image_refs.append((resource_name, add(self._image_stream(image, add, ref, stream))))
+
+        content, content_filter = self._content()
+        content_entries = []
+        if content_filter:
+            content_entries.append(('Filter', b'/' + content_filter.encode('ascii')))
+        content_num = add(stream(content_entries, content))
+
+        resources = [('ProcSet', b'[/PDF /Text /ImageB /ImageC /ImageI]')]
+        if font_refs:
+            resources.append(('Font', _pdf_dict([(name, ref(num)) for name, num in font_refs])))
+        if image_refs:
+            resources.append(('XObject', _pdf_dict([(name, ref(num)) for name, num in image_refs])))
+
+        width, height = self.pagesize
+        objects[catalog_num - 1] = _pdf_dict([('Type', b'/Catalog'), ('Pages', ref(pages_num))])
+        objects[pages_num - 1] = _pdf_dict([('Type', b'/Pages'), ('Kids', b'[' + ref(page_num) + b']'), ('Count', b'1')])
+        objects[page_num - 1] = _pdf_dict([
+            ('Type', b'/Page'),
+            ('Parent', ref(pages_num)),
+            ('MediaBox', ('[0 0 %s %s]' % (_format_number(width), _format_number(height))).encode('ascii')),
+            ('Resources', _pdf_dict(resources)),
+            ('Contents', ref(content_num)),
+        ])
+
+        out = io.BytesIO()
+        out.write(b'%PDF-1.4\n%\x93\x8c\x8b\x9e\n')
+        offsets = []
+        for num, body in enumerate(objects, start=1):
+            offsets.append(out.tell())
+            out.write(b'%d 0 obj\n' % num)
+            out.write(body)
+            out.write(b'\nendobj\n')
+
+        xref_offset = out.tell()
+        out.write(b'xref\n0 %d\n' % (len(objects) + 1))
+        out.write(b'0000000000 65535 f \n')
+        for offset in offsets:
+            out.write(b'%010d 00000 n \n' % offset)
+        out.write(b'trailer\n' + _pdf_dict([('Size', str(len(objects) + 1).encode('ascii')), ('Root', ref(catalog_num))]))
+        out.write(b'\nstartxref\n%d\n%%%%EOF\n' % xref_offset)
+        return out.getvalue()
+
+    @staticmethod
+    def _image_stream(image, add, ref, stream):
+        entries = [
+            ('Type', b'/XObject'),
+            ('Subtype', b'/Image'),
+            ('Width', str(image.width).encode('ascii')),
+            ('Height', str(image.height).encode('ascii')),
+            ('ColorSpace', image.color_space.encode('ascii')),
+            ('BitsPerComponent', str(image.bits).encode('ascii')),
+        ]
+        if image.filter:
+            entries.append(('Filter', image.filter.encode('ascii')))
+        if image.decode_parms:
+            entries.append(('DecodeParms', _pdf_dict([
+                (key, str(value).encode('ascii')) for key, value in image.decode_parms.items()
+            ])))
+        if image.smask is not None:
+            smask_num = add(OverlayWriter._image_stream(image.smask, add, ref, stream))
+            entries.append(('SMask', ref(smask_num)))
+        return stream(entries, image.data)
+
+
+def _jpeg_image(image_data):
+    """Embed a baseline/progressive JPEG as-is with /DCTDecode."""
+    stream = io.BytesIO(image_data)
+    if stream.read(2) != b'\xff\xd8':
+        return None
+
+    while True:
+        marker = stream.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        length_bytes = stream.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            bits, height, width, components = struct.unpack('>BHHB', stream.read(6))
+            color_space = {1: '/DeviceGray', 3: '/DeviceRGB', 4: '/DeviceCMYK'}.get(components)
+            if color_space is None or bits != 8:
+                return None
+            return PdfImage(width, height, color_space, image_data, filter='/DCTDecode', bits=bits)
+        stream.seek(length - 2, io.SEEK_CUR)
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG color type -> (samples per pixel, PDF color space)
+_PNG_COLOR_TYPES = {
+    0: (1, '/DeviceGray'),
+    2: (3, '/DeviceRGB'),
+    4: (2, '/DeviceGray'),
+    6: (4, '/DeviceRGB'),
+}
+
+
+def _png_predictor(colors, columns):
+    return {'Predictor': 15, 'Colors': colors, 'BitsPerComponent': 8, 'Columns': columns}
+
+
+def png_size(image_data):
+    """Return (width, height) from a PNG header, or None if image_data is not a PNG."""
+    if len(image_data) < 24 or not image_data.startswith(PNG_SIGNATURE) or image_data[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', image_data[16:24])
+
+
+def _png_image(image_data):
+    """
+    Embed an 8-bit non-interlaced PNG without decoding its pixels.
+
+    PDF's FlateDecode with a PNG predictor reads IDAT data as-is. For images
+    with an alpha channel the still-filtered scanlines are split into a color
+    and an alpha stream: at 8 bits per sample every PNG filter only refers to
+    the same channel of neighbouring pixels, so each stream stays validly
+    filtered and the alpha becomes an /SMask. Returns None for PNGs this cannot
+    handle (palette, 16-bit, interlaced, tRNS) so the caller can fall back.
+    """
+    if not image_data.startswith(PNG_SIGNATURE):
+        return None
+
+    header = None
+    idat = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(image_data):
+        length, chunk_type = struct.unpack('>I4s', image_data[pos:pos + 8])
+        body = image_data[pos + 8:pos + 8 + length]
+        if len(body) != length:
+            return None
+        pos += 12 + length
+        if chunk_type == b'IHDR':
+            header = struct.unpack('>IIBBBBB', body)
+        elif chunk_type == b'IDAT':
+            idat.append(body)
+        elif chunk_type in (b'tRNS', b'PLTE'):
+            return None
+        elif chunk_type == b'IEND':
+            break
+
+    if header is None or not idat:
+        return None
+    width, height, bits, color_type, compression, filter_method, interlace = header
+    if color_type not in _PNG_COLOR_TYPES or bits != 8 or compression or filter_method or interlace:
+        return None
+
+    channels, color_space = _PNG_COLOR_TYPES[color_type]
+    colors = 1 if color_space == '/DeviceGray' else 3
+    data = b''.join(idat)
+    if channels == colors:
+        return PdfImage(width, height, color_space, data, decode_parms=_png_predictor(colors, width))
+
+    try:
+        raw = zlib.decompress(data)
+    except zlib.error:
+        return None
+    stride = 1 + width * channels
+    if len(raw) < stride * height:
+        return None
+
+    color = bytearray((1 + width * colors) * height)
+    alpha = bytearray((1 + width) * height)
+    color_stride = 1 + width * colors
+    row_color = bytearray(width * colors)
+    for row in range(height):
+        start = row * stride
+        pixels = raw[start + 1:start + stride]
+        for channel in range(colors):
+            row_color[channel::colors] = pixels[channel::channels]
+        color_start = row * color_stride
+        color[color_start] = raw[start]
+        color[color_start + 1:color_start + color_stride] = row_color
+        alpha_start = row * (1 + width)
+        alpha[alpha_start] = raw[start]
+        alpha[alpha_start + 1:alpha_start + 1 + width] = pixels[colors::channels]
+
+    smask = PdfImage(width, height, '/DeviceGray', zlib.compress(bytes(alpha)),
+                     decode_parms=_png_predictor(1, width))
+    return PdfImage(width, height, color_space, zlib.compress(bytes(color)),
+                    decode_parms=_png_predictor(colors, width), smask=smask)
+
+
+def _pil_image(image_data, max_size=None):
+    """
+    Decode with Pillow and Flate-encode the pixels, keeping any alpha as an
+    /SMask. Images larger than max_size are downscaled first.
+    """
+    try:
+        from PIL import Image as PILImage
+    except Exception:
+        raise UnsupportedImageError("Pillow is not available to decode this image")
+
+    im = PILImage.open(io.BytesIO(image_data))
+    im.load()
+    if max_size and (im.size[0] > max_size[0] or im.size[1] > max_size[1]):
+        if im.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            im = im.convert('RGBA')
+        # Area averaging: sharper filters ring around pen strokes, which adds
+        # colour noise that compresses far worse
+        im.thumbnail(max_size, PILImage.BOX)
+
+    smask = None
+    if im.mode in ('RGBA', 'LA') or (im.mode == 'P' and 'transparency' in im.info):
+        if im.mode != 'RGBA':
+            im = im.convert('RGBA')
+        alpha = im.split()[-1]
+        smask = PdfImage(im.size[0], im.size[1], '/DeviceGray', zlib.compress(alpha.tobytes()))
+        im = im.convert('RGB')
+    elif im.mode != 'RGB':
+        im = im.convert('RGB')
+
+    return PdfImage(im.size[0], im.size[1], '/DeviceRGB', zlib.compress(im.tobytes()), smask=smask)
+
+
+def image_from_bytes(image_data, max_size=None):
+    """
+    Build a PdfImage from encoded image bytes.
+
+    JPEGs and 8-bit PNGs are embedded without decoding; other formats, and
+    PNGs larger than max_size (width, height in pixels), need Pillow.
+    Raises UnsupportedImageError when the image cannot be embedded.
+    """
+    image = _jpeg_image(image_data)
+    if image is not None:
+        return image
+
+    size = png_size(image_data)
+    if size is not None and not (max_size and (size[0] > max_size[0] or size[1] > max_size[1])):
+        image = _png_image(image_data)
+        if image is not None:
+            return image
+
+    return _pil_image(image_data, max_size=max_size)
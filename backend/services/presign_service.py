@@ -1,14 +1,14 @@
 import os
-import boto3
 import logging
 from datetime import datetime
 from uuid import uuid4
 
+from services.aws_clients import get_client
+from services.log_control import get_logger
+
 # Configure logging
-logger = logging.getLogger()
+logger = get_logger(__name__)
 
-# Initialize S3 client
-s3_client = boto3.client('s3')
 
 def handle_presign_request(body: dict, request_context: dict = None) -> dict:
     """
@@ -23,9 +23,11 @@ def handle_presign_request(body: dict, request_context: dict = None) -> dict:
         dict with statusCode and response data or error
     """
     logger.info("=== PRESIGN SERVICE START ===", extra={
-        'request_body': body,
         'file_name': body.get('fileName'),
-        'file_type': body.get('fileType'),
+        'file_type': body.get('fileType')
+    })
+    logger.debug("Presign request context", extra=lambda: {
+        'request_body': body,
         'request_context': request_context
     })
 
@@ -41,20 +43,9 @@ def handle_presign_request(body: dict, request_context: dict = None) -> dict:
         file_name = body['fileName']
         file_type = body.get('fileType', 'application/octet-stream')
 
-        logger.info("Processing file upload request", extra={
-            'original_file_name': file_name,
-            'content_type': file_type
-        })
-
         # Get S3 bucket name from environment
         bucket_name = os.environ.get('S3_BUCKET_NAME')
 
-        logger.info("S3 Configuration", extra={
-            'bucket_name': bucket_name,
-            'bucket_env_var_set': 'S3_BUCKET_NAME' in os.environ,
-            'all_env_vars': list(os.environ.keys())
-        })
-
         if not bucket_name:
             logger.error("S3_BUCKET_NAME environment variable not set")
             return {
@@ -77,15 +68,7 @@ def handle_presign_request(body: dict, request_context: dict = None) -> dict:
 
         # Generate presigned URL for PUT operation
         try:
-            logger.info("Generating presigned URL with parameters", extra={
-                'operation': 'put_object',
-                'bucket': bucket_name,
-                'key': storage_key,
-                'content_type': file_type,
-                'expires_in': 300
-            })
-
-            presigned_url = s3_client.generate_presigned_url(
+            presigned_url = get_client('s3').generate_presigned_url(
                 'put_object',
                 Params={
                     'Bucket': bucket_name,
@@ -97,11 +80,6 @@ def handle_presign_request(body: dict, request_context: dict = None) -> dict:
 
             logger.info(f"✓ Presigned URL generated successfully for {storage_key}", extra={
                 'url_length': len(presigned_url),
-                'url_preview': presigned_url[:150],
-                'full_url': presigned_url,
-                'has_signature': 'Signature=' in presigned_url,
-                'has_expires': 'Expires=' in presigned_url,
-                'bucket_in_url': bucket_name in presigned_url,
                 'url_domain': presigned_url.split('/')[2] if len(presigned_url.split('/')) > 2 else 'unknown'
             })
 
@@ -113,22 +91,9 @@ def handle_presign_request(body: dict, request_context: dict = None) -> dict:
             }, exc_info=True)
             raise
 
-        # Test bucket CORS configuration
-        try:
-            cors_response = s3_client.get_bucket_cors(Bucket=bucket_name)
-            cors_rules = cors_response.get('CORSRules', [])
-            logger.info("✓ Bucket CORS configuration retrieved", extra={
-                'cors_rules_count': len(cors_rules),
-                'cors_rules': cors_rules,
-                'allowed_origins': [rule.get('AllowedOrigins', []) for rule in cors_rules],
-                'allowed_methods': [rule.get('AllowedMethods', []) for rule in cors_rules],
-                'allowed_headers': [rule.get('AllowedHeaders', []) for rule in cors_rules]
-            })
-        except Exception as e:
-            logger.warning(f"⚠ Could not retrieve CORS config: {str(e)}", extra={
-                'error_type': type(e).__name__,
-                'bucket': bucket_name
-            })
+        # Diagnostic only: an extra S3 round trip, so only on DEBUG (e.g. sampled) invocations
+        if logger.isEnabledFor(logging.DEBUG):
+            _log_bucket_cors(bucket_name)
 
         response = {
             'statusCode': 200,
@@ -138,7 +103,6 @@ def handle_presign_request(body: dict, request_context: dict = None) -> dict:
         }
 
         logger.info("=== PRESIGN SERVICE SUCCESS ===", extra={
-            'response': response,
             'storage_key': storage_key,
             'url_length': len(presigned_url)
         })
@@ -156,3 +120,22 @@ def handle_presign_request(body: dict, request_context: dict = None) -> dict:
             'statusCode': 500,
             'error': f'Internal server error: {str(e)}'
         }
+
+
+def _log_bucket_cors(bucket_name: str) -> None:
+    """Log the bucket's CORS rules; a failed lookup is only a warning."""
+    try:
+        cors_response = get_client('s3').get_bucket_cors(Bucket=bucket_name)
+        cors_rules = cors_response.get('CORSRules', [])
+        logger.debug("✓ Bucket CORS configuration retrieved", extra={
+            'cors_rules_count': len(cors_rules),
+            'cors_rules': cors_rules,
+            'allowed_origins': [rule.get('AllowedOrigins', []) for rule in cors_rules],
+            'allowed_methods': [rule.get('AllowedMethods', []) for rule in cors_rules],
+            'allowed_headers': [rule.get('AllowedHeaders', []) for rule in cors_rules]
+        })
+    except Exception as e:
+        logger.warning(f"⚠ Could not retrieve CORS config: {str(e)}", extra={
+            'error_type': type(e).__name__,
+            'bucket': bucket_name
+        })
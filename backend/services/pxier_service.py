@@ -0,0 +1,146 @@
+"""
+Pxier Service
+Creates customers in the Pxier platform via /events/updateCustomer
+"""
+import os
+import json
+import logging
+from typing import Dict, Any
+
+from services.tracing import traced
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def build_pxier_payload(contact_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build Pxier API payload from contact data.
+
+    Args:
+        contact_data: Contact data with keys:
+            - first_name, last_name, email_address, phone_number
+            - address_line_1, address_line_2, city, state, postcode
+
+    Returns:
+        Pxier API payload dict
+    """
+    # Validate Pxier configuration
+    pxier_token = os.environ.get('PXIER_ACCESS_TOKEN')
+
+    if not pxier_token:
+        logger.error("Pxier API access token not configured")
+        raise Exception("Pxier API credentials not configured. Please set PXIER_ACCESS_TOKEN environment variable.")
+
+    # Build customer name
+    customer_name = f"{contact_data.get('first_name', '')} {contact_data.get('last_name', '')}".strip()
+
+    # Prepare phone number
+    phone = contact_data.get('phone_number') or ''
+
+    # Prepare payload for Pxier API
+    payload = {
+        "accessToken": pxier_token,
+        "customerId": 0,  # 0 for new customer
+        "customerName": customer_name,
+        "countryCode": "US",
+        "stateCode": contact_data.get('state') or "",
+        "customerTypeCode": 0,
+        "langCode": "en",
+        "address1": contact_data.get('address_line_1') or "",
+        "address2": contact_data.get('address_line_2') or "",
+        "zipCode": contact_data.get('postcode') or "",
+        "city": contact_data.get('city') or "",
+        "contact": [{
+            "contactId": 0,  # 0 for new contact
+            "firstName": contact_data.get('first_name') or "",
+            "lastName": contact_data.get('last_name') or "",
+            "email": contact_data.get('email_address') or "",
+            "phone": phone,
+            "mobile": phone
+        }]
+    }
+
+    return payload
+
+
+@traced('pxier')
+def create_pxier_customer(contact_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Create customer in Pxier API
+
+    Args:
+        contact_data: Contact data from database with keys:
+            - first_name, last_name, email_address, phone_number
+            - address_line_1, address_line_2, city, state, postcode
+
+    Returns:
+        API response from Pxier with customerId and contactId
+
+    Raises:
+        Exception: If API call fails
+    """
+    logger.info("Creating Pxier customer", extra={
+        'first_name': contact_data.get('first_name'),
+        'last_name': contact_data.get('last_name'),
+        'email': contact_data.get('email_address')
+    })
+
+    # Validate Pxier configuration
+    pxier_username = os.environ.get('PXIER_USERNAME')
+    pxier_password = os.environ.get('PXIER_PASSWORD')
+    pxier_platform = os.environ.get('PXIER_PLATFORM_ADDRESS')
+
+    if not pxier_username or not pxier_password or not pxier_platform:
+        logger.error("Pxier API credentials not configured")
+        raise Exception("Pxier API credentials not configured. Please set PXIER_USERNAME, PXIER_PASSWORD, and PXIER_PLATFORM_ADDRESS environment variables.")
+
+    # Imported here: /applications only needs build_pxier_payload, and
+    # requests adds ~100ms to the API function's cold start
+    import requests
+
+    # Build Pxier API URL
+    pxier_url = f"{pxier_platform}/events/updateCustomer"
+
+    # Build payload using helper function
+    payload = build_pxier_payload(contact_data)
+
+    headers = {
+        "Content-Type": "application/json"
+    }
+
+    try:
+        logger.info(f"Sending request to Pxier API")
+        logger.debug(f"Pxier API URL: {pxier_url}")
+
+        response = requests.post(
+            pxier_url,
+            data=json.dumps(payload),
+            headers=headers,
+            auth=requests.auth.HTTPBasicAuth(pxier_username, pxier_password),
+            timeout=30
+        )
+
+        response.raise_for_status()
+        result = response.json()
+
+        if result.get("error") == False:
+            logger.info("Pxier customer created successfully", extra={
+                'pxier_customer_id': result.get('data', {}).get('customerId'),
+                'pxier_contact_id': result.get('data', {}).get('contactId')
+            })
+            return result
+        else:
+            error_msg = result.get('message', 'Unknown error')
+            logger.error(f"Pxier API returned error: {result}")
+            raise Exception(f"Pxier API error: {error_msg}")
+
+    except requests.exceptions.Timeout:
+        logger.error(f"Pxier API request timeout")
+        raise Exception("Pxier API request timed out")
+    except requests.exceptions.HTTPError as e:
+        logger.error(f"Pxier API HTTP error: {str(e)}", exc_info=True)
+        raise Exception(f"Pxier API HTTP error: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Pxier API request failed: {str(e)}", exc_info=True)
+        raise Exception(f"Failed to communicate with Pxier API: {str(e)}")
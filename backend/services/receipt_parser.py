@@ -0,0 +1,208 @@
+"""
+Receipt Amount Parser
+Picks the paid amount out of OCR'd receipt lines in a single pass.
+
+Every line is tokenized once with one precompiled pattern into numbers and
+words; words are classified as currency markers or keywords by dictionary
+lookup. Each number is then scored:
+
+- currency adjacent to the number (RM 100.00, 100.00 MYR, S$1,000.00)
+- two decimal places
+- a payment keyword on the same line (Total, Amount paid, Jumlah, ...)
+- a payment keyword on the line above when the number stands alone on its
+  line; Textract often returns a label and its value as separate LINE blocks
+- minus a penalty for change/cash/balance/fee/tax style keywords
+
+The highest score wins and ties go to the larger amount. Thousands separators
+(1,250.00 / 1.250,00 / 12 500.00) and decimal commas are normalized, and the
+currency is taken from the winning number or, failing that, the most common
+currency on the receipt.
+"""
+import re
+from typing import Any, Dict, Iterable, Optional
+
+_NUMBER = (
+    r'(?<![\d.,/:\-])'
+    r'(?:\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?'      # 1,250.00
+    r'|\d{1,3}(?:\.\d{3})+,\d{1,2}'             # 1.250,00
+    r'|\d{1,3}(?: \d{3})+\.\d{2}'               # 12 500.00
+    r'|\d+(?:[.,]\d{1,2})?)'                    # 1250.00 / 1250,00 / 1250
+    r'(?![\w/:%]|[.,]\d)'
+)
+
+# One cheap pattern splits a line into numbers and words; words are then
+# classified with dictionary lookups instead of regex alternations
+_TOKEN_RE = re.compile(f'(?P<number>{_NUMBER})|(?P<word>[A-Za-z]+(?:\\$|\\.(?=\\s*\\d))?|[$€£])')
+_FILLER = ' \t:-=()*#'
+
+_KEYWORD_WEIGHTS = {
+    'total': 5,
+    'jumlah': 5,
+    'amount': 4,
+    'amaun': 4,
+    'betrag': 4,
+    'paid': 3,
+    'payment': 3,
+    'bayaran': 3,
+}
+# Two-word keywords, keyed by (previous word, word)
+_KEYWORD_PAIR_WEIGHTS = {
+    ('grand', 'total'): 6,
+    ('total', 'amount'): 6,
+    ('amount', 'paid'): 6,
+    ('payment', 'amount'): 5,
+    ('transfer', 'amount'): 5,
+    ('deposit', 'amount'): 5,
+}
+_NEGATIVE_WORDS = {
+    'subtotal', 'change', 'cash', 'tendered', 'balance', 'baki', 'sst', 'gst', 'tax',
+    'fee', 'fees', 'charge', 'charges', 'rounding', 'discount',
+}
+_NEGATIVE_PAIRS = {('sub', 'total')}
+
+_CURRENCY_CODES = {
+    'rm': 'MYR', 'myr': 'MYR',
+    'usd': 'USD', 'us$': 'USD', '$': 'USD',
+    'sgd': 'SGD', 's$': 'SGD',
+    'eur': 'EUR', '€': 'EUR',
+    'gbp': 'GBP', '£': 'GBP',
+    'inr': 'INR', 'rs': 'INR', 'rs.': 'INR',
+}
+
+CURRENCY_SCORE = 3
+DECIMALS_SCORE = 1
+NEGATIVE_PENALTY = 6
+# A label on the previous line counts a little less than one on the same line
+LABEL_ABOVE_DECAY = 1
+MAX_AMOUNT = 1e9
+
+
+def _to_amount(text: str) -> Optional[float]:
+    text = text.replace(' ', '')
+    comma, dot = text.rfind(','), text.rfind('.')
+    if comma >= 0 and dot >= 0:
+        if comma > dot:
+            text = text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    elif comma >= 0:
+        # 1,250 is a thousands separator, 1250,00 a decimal comma
+        if len(text) - comma - 1 == 3:
+            text = text.replace(',', '')
+        else:
+            text = text[:comma].replace(',', '') + '.' + text[comma + 1:]
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _has_decimals(text: str) -> bool:
+    return len(text) >= 3 and text[-3] in '.,' and text[-2:].isdigit()
+
+
+def parse_receipt_amount(text_lines: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """
+    Return the most likely paid amount on a receipt.
+
+    Args:
+        text_lines: OCR'd lines in reading order
+
+    Returns:
+        dict: amount, currency (ISO code or None), line, score and confidence
+        ('high', 'medium' or 'low'), or None if no amount was found
+    """
+    best = None
+    best_key = None
+    currency_counts = {}
+    label_above = 0  # keyword weight carried over from a label-only previous line
+
+    for text in text_lines:
+        tokens = []
+        positive = 0
+        negative = False
+        previous_word = None
+        for match in _TOKEN_RE.finditer(text):
+            if match.lastgroup == 'number':
+                tokens.append(('number', match.group(), match.start(), match.end()))
+                previous_word = None
+                continue
+
+            word = match.group().lower()
+            if word in _CURRENCY_CODES:
+                tokens.append(('currency', word, match.start(), match.end()))
+            elif word in _NEGATIVE_WORDS or (previous_word, word) in _NEGATIVE_PAIRS:
+                negative = True
+            else:
+                weight = _KEYWORD_PAIR_WEIGHTS.get((previous_word, word)) or _KEYWORD_WEIGHTS.get(word)
+                if weight and weight > positive:
+                    positive = weight
+            previous_word = word
+
+        # A line holding nothing but a value (and its currency) inherits the label above it
+        value_only = bool(tokens) and positive == 0 and not negative
+        if value_only:
+            position = 0
+            for _, _, start, end in tokens:
+                if text[position:start].strip(_FILLER):
+                    value_only = False
+                    break
+                position = end
+            value_only = value_only and not text[position:].strip(_FILLER)
+
+        line_weight = positive - (NEGATIVE_PENALTY if negative else 0)
+        if value_only:
+            line_weight = label_above
+
+        has_number = False
+        for index, (kind, value, start, end) in enumerate(tokens):
+            if kind == 'currency':
+                code = _CURRENCY_CODES[value]
+                currency_counts[code] = currency_counts.get(code, 0) + 1
+                continue
+
+            has_number = True
+            currency = None
+            if index > 0 and tokens[index - 1][0] == 'currency' and not text[tokens[index - 1][3]:start].strip():
+                currency = tokens[index - 1][1]
+            elif index + 1 < len(tokens) and tokens[index + 1][0] == 'currency' and not text[end:tokens[index + 1][2]].strip():
+                currency = tokens[index + 1][1]
+
+            decimals = _has_decimals(value)
+            # Bare integers are dates, references and quantities unless something says otherwise
+            if currency is None and not decimals and line_weight <= 0:
+                continue
+
+            amount = _to_amount(value)
+            if not amount or amount >= MAX_AMOUNT:
+                continue
+
+            score = line_weight
+            if currency is not None:
+                score += CURRENCY_SCORE
+            if decimals:
+                score += DECIMALS_SCORE
+
+            key = (score, amount)
+            if best_key is None or key > best_key:
+                best_key = key
+                best = {
+                    'amount': amount,
+                    'currency': _CURRENCY_CODES[currency] if currency else None,
+                    'line': text,
+                    'score': score,
+                }
+
+        # Only a line with a keyword and no number of its own labels the next line
+        if not has_number and (positive or negative):
+            label_above = (positive - LABEL_ABOVE_DECAY) if not negative else -NEGATIVE_PENALTY
+        else:
+            label_above = 0
+
+    if best is None:
+        return None
+
+    if best['currency'] is None and currency_counts:
+        best['currency'] = max(currency_counts.items(), key=lambda item: item[1])[0]
+    best['confidence'] = 'high' if best['score'] >= 7 else 'medium' if best['score'] >= 4 else 'low'
+    return best
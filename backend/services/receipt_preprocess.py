@@ -0,0 +1,140 @@
+"""
+Receipt Preprocessing
+Normalizes receipt photos before they are sent to Textract.
+
+Phone photos arrive at up to MAX_FILE_SIZE; Textract latency grows with the
+payload while OCR accuracy stops improving well below camera resolution. Large
+images are rotated upright from their EXIF orientation, converted to
+grayscale, downscaled so the long edge is at most RECEIPT_OCR_MAX_DIMENSION
+and re-encoded as a JPEG without metadata. The derivative is written next to
+the original as <key>.normalized.jpg and Textract reads that object instead.
+
+PDFs, small images and anything Pillow cannot open are passed through
+unchanged.
+"""
+import io
+import time
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from backend import config
+except ImportError:
+    import config
+
+logger = logging.getLogger(__name__)
+
+NORMALIZED_SUFFIX = '.normalized.jpg'
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.webp', '.heic', '.bmp', '.gif')
+
+
+def is_normalized_key(key: str) -> bool:
+    return key.endswith(NORMALIZED_SUFFIX)
+
+
+def normalized_key_for(key: str) -> str:
+    return key + NORMALIZED_SUFFIX
+
+
+def normalize_image(image_bytes: bytes, max_dimension: int, quality: int) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Return (jpeg_bytes, info) for an upright, grayscale, downscaled copy of the image.
+
+    Raises ImportError when Pillow is unavailable and OSError for undecodable images.
+    """
+    from PIL import Image, ImageOps
+
+    im = Image.open(io.BytesIO(image_bytes))
+    original_size = im.size
+    # JPEG draft mode lets the decoder skip straight to a reduced scale
+    if im.format == 'JPEG':
+        im.draft('L', (max_dimension, max_dimension))
+    im = ImageOps.exif_transpose(im)
+    im = im.convert('L')
+    if max(im.size) > max_dimension:
+        im.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    out = io.BytesIO()
+    # No exif= argument, so orientation and camera metadata are dropped
+    im.save(out, 'JPEG', quality=quality, optimize=True)
+    return out.getvalue(), {
+        'original_size': original_size,
+        'normalized_size': im.size
+    }
+
+
+def prepare_receipt_for_ocr(s3_client, bucket: str, key: str) -> str:
+    """
+    Return the S3 key Textract should read for this receipt.
+
+    Writes (or reuses) the normalized derivative for large images; returns
+    the original key when preprocessing is disabled, not worthwhile or fails.
+    """
+    if not config.RECEIPT_PREPROCESS_ENABLED or is_normalized_key(key) or not key.lower().endswith(IMAGE_SUFFIXES):
+        return key
+
+    normalized_key = normalized_key_for(key)
+    started = time.perf_counter()
+    try:
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        original_bytes = head.get('ContentLength', 0)
+        if original_bytes < config.RECEIPT_PREPROCESS_MIN_BYTES:
+            return key
+
+        existing = _head_or_none(s3_client, bucket, normalized_key)
+        if existing is not None and existing.get('Metadata', {}).get('source-etag') == head.get('ETag', '').strip('"'):
+            logger.info("Reusing normalized receipt", extra={'key': key, 'normalized_key': normalized_key})
+            return normalized_key
+
+        body = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+        download_ms = (time.perf_counter() - started) * 1000
+
+        normalize_started = time.perf_counter()
+        normalized, info = normalize_image(
+            body, config.RECEIPT_OCR_MAX_DIMENSION, config.RECEIPT_OCR_JPEG_QUALITY
+        )
+        normalize_ms = (time.perf_counter() - normalize_started) * 1000
+
+        if len(normalized) >= len(body):
+            logger.info("Normalized receipt is not smaller - using original", extra={
+                'key': key,
+                'original_bytes': len(body),
+                'normalized_bytes': len(normalized)
+            })
+            return key
+
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=normalized_key,
+            Body=normalized,
+            ContentType='image/jpeg',
+            Metadata={'source-etag': head.get('ETag', '').strip('"')}
+        )
+
+        logger.info("✓ Receipt normalized for OCR", extra={
+            'key': key,
+            'normalized_key': normalized_key,
+            'original_bytes': len(body),
+            'normalized_bytes': len(normalized),
+            'original_size': info['original_size'],
+            'normalized_size': info['normalized_size'],
+            'download_ms': round(download_ms, 1),
+            'normalize_ms': round(normalize_ms, 1),
+            'total_ms': round((time.perf_counter() - started) * 1000, 1)
+        })
+        return normalized_key
+
+    except Exception as e:
+        logger.warning("⚠ Receipt preprocessing failed - sending original to Textract", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'key': key
+        })
+        return key
+
+
+def _head_or_none(s3_client, bucket: str, key: str) -> Optional[Dict[str, Any]]:
+    try:
+        return s3_client.head_object(Bucket=bucket, Key=key)
+    except Exception:
+        return None
@@ -0,0 +1,199 @@
+"""
+Two-tier cache for S3 objects that rarely change (the PDF template).
+
+Tier 1 is process memory, tier 2 is a file under /tmp that survives as long as
+the Lambda execution environment. Entries are revalidated against S3 with
+If-None-Match once they are older than revalidate_interval; a 304 only bumps
+the validation time. When S3 is unreachable the last good copy keeps being
+served.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ('body', 'etag', 'content_type', 'validated_at')
+
+    def __init__(self, body: bytes, etag: Optional[str], content_type: Optional[str], validated_at: float):
+        self.body = body
+        self.etag = etag
+        self.content_type = content_type
+        self.validated_at = validated_at
+
+
+class TemplateCache:
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        cache_dir: Optional[str] = '/tmp/template_cache',
+        revalidate_interval: float = 300.0
+    ):
+        self._client_factory = client_factory
+        self._client = None
+        self.cache_dir = cache_dir
+        self.revalidate_interval = revalidate_interval
+        self._memory: Dict[Tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self.metrics = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'revalidations': 0,
+            'not_modified': 0,
+            'refreshed': 0,
+            'stale_served': 0,
+            'errors': 0
+        }
+
+    def get(self, bucket: str, key: str) -> bytes:
+        """Return the object body, reading S3 only when the cached copy needs revalidation."""
+        cache_key = (bucket, key)
+
+        with self._lock:
+            entry = self._memory.get(cache_key)
+            if entry is not None:
+                tier = 'memory_hits'
+            else:
+                entry = self._read_disk(bucket, key)
+                tier = 'disk_hits'
+                if entry is not None:
+                    self._memory[cache_key] = entry
+
+            if entry is not None and time.time() - entry.validated_at < self.revalidate_interval:
+                self.metrics[tier] += 1
+                return entry.body
+
+            entry = self._fetch(bucket, key, entry)
+            self._memory[cache_key] = entry
+            return entry.body
+
+    def invalidate(self, bucket: str, key: str) -> None:
+        with self._lock:
+            self._memory.pop((bucket, key), None)
+            path = self._disk_path(bucket, key)
+            if path:
+                for suffix in ('', '.json'):
+                    try:
+                        os.remove(path + suffix)
+                    except OSError:
+                        pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.metrics)
+
+    def _fetch(self, bucket: str, key: str, cached: Optional[_Entry]) -> _Entry:
+        params = {'Bucket': bucket, 'Key': key}
+        if cached is not None and cached.etag:
+            params['IfNoneMatch'] = cached.etag
+            self.metrics['revalidations'] += 1
+        else:
+            self.metrics['misses'] += 1
+
+        try:
+            if self._client is None:
+                self._client = self._client_factory()
+            response = self._client.get_object(**params)
+        except Exception as e:
+            if cached is not None and _is_not_modified(e):
+                self.metrics['not_modified'] += 1
+                cached.validated_at = time.time()
+                self._write_disk_meta(bucket, key, cached)
+                return cached
+
+            self.metrics['errors'] += 1
+            if cached is not None:
+                self.metrics['stale_served'] += 1
+                logger.warning("S3 revalidation failed - serving cached template", extra={
+                    'bucket': bucket,
+                    'key': key,
+                    'error_type': type(e).__name__,
+                    'error_message': str(e),
+                    'cached_etag': cached.etag
+                })
+                return cached
+            raise
+
+        entry = _Entry(
+            body=response['Body'].read(),
+            etag=response.get('ETag'),
+            content_type=response.get('ContentType'),
+            validated_at=time.time()
+        )
+        if cached is not None:
+            self.metrics['refreshed'] += 1
+        self._write_disk(bucket, key, entry)
+        return entry
+
+    def _disk_path(self, bucket: str, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha256(f"{bucket}/{key}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest)
+
+    def _read_disk(self, bucket: str, key: str) -> Optional[_Entry]:
+        path = self._disk_path(bucket, key)
+        if not path:
+            return None
+        try:
+            with open(path + '.json', 'r') as f:
+                meta = json.load(f)
+            with open(path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get('size') != len(body):
+            return None
+        return _Entry(body, meta.get('etag'), meta.get('content_type'), meta.get('validated_at', 0.0))
+
+    def _write_disk(self, bucket: str, key: str, entry: _Entry) -> None:
+        path = self._disk_path(bucket, key)
+        if not path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write-then-rename so a concurrent reader never sees a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(entry.body)
+            os.replace(tmp_path, path)
+            self._write_disk_meta(bucket, key, entry)
+        except OSError as e:
+            logger.warning("Could not write template to disk cache", extra={
+                'error_type': type(e).__name__,
+                'error_message': str(e),
+                'cache_dir': self.cache_dir
+            })
+
+    def _write_disk_meta(self, bucket: str, key: str, entry: _Entry) -> None:
+        path = self._disk_path(bucket, key)
+        if not path:
+            return
+        try:
+            tmp_path = f"{path}.json.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'bucket': bucket,
+                    'key': key,
+                    'etag': entry.etag,
+                    'content_type': entry.content_type,
+                    'size': len(entry.body),
+                    'validated_at': entry.validated_at
+                }, f)
+            os.replace(tmp_path, path + '.json')
+        except OSError:
+            pass
+
+
+def _is_not_modified(error: Exception) -> bool:
+    response = getattr(error, 'response', None) or {}
+    status = response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    code = str(response.get('Error', {}).get('Code', ''))
+    return status == 304 or code in ('304', 'NotModified')
@@ -0,0 +1,213 @@
+"""
+Textract Result Cache
+Persistent cache of Textract output so the same receipt is only OCR'd once.
+
+Entries are keyed by the receipt's S3 ETag (or a sha256 of its bytes), so a
+resubmitted receipt hits the cache even under a new object key. Each entry
+holds the raw LINE blocks, the parsed amount and the parser version that
+produced it; callers re-parse the stored lines when the version changed
+instead of calling Textract again. Entries expire after TEXTRACT_CACHE_TTL_SECONDS.
+
+Backends (TEXTRACT_CACHE_BACKEND):
+- mysql: textract_results table (database_migration_textract_cache.sql)
+- sqlite: local SQLite file at TEXTRACT_CACHE_SQLITE_PATH
+- memory: in-process dict (tests)
+- empty: caching disabled
+"""
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from backend import config
+except ImportError:
+    import config
+
+logger = logging.getLogger(__name__)
+
+
+def receipt_cache_key(etag: Optional[str] = None, content: Optional[bytes] = None) -> Optional[str]:
+    """Build the cache key for a receipt from its S3 ETag or, failing that, its bytes."""
+    if etag:
+        return 'etag:' + etag.strip().strip('"')
+    if content is not None:
+        return f"sha256:{hashlib.sha256(content).hexdigest()}"
+    return None
+
+
+class CachedResult:
+    __slots__ = ('lines', 'amount', 'parser_version')
+
+    def __init__(self, lines: List[Dict[str, Any]], amount: Optional[float], parser_version: str):
+        self.lines = lines
+        self.amount = amount
+        self.parser_version = parser_version
+
+
+class MemoryTextractCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, cache_key: str) -> Optional[CachedResult]:
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None or entry[0] <= time.time():
+                return None
+            return entry[1]
+
+    def put(self, cache_key: str, lines: List[Dict[str, Any]], amount: Optional[float], parser_version: str) -> None:
+        with self._lock:
+            self._entries[cache_key] = (time.time() + self.ttl, CachedResult(lines, amount, parser_version))
+
+
+class SQLiteTextractCache:
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS textract_results (
+                    cache_key TEXT PRIMARY KEY,
+                    line_blocks TEXT NOT NULL,
+                    amount REAL,
+                    parser_version TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, cache_key: str) -> Optional[CachedResult]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT line_blocks, amount, parser_version FROM textract_results WHERE cache_key = ? AND expires_at > ?",
+                (cache_key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedResult(json.loads(row[0]), row[1], row[2])
+
+    def put(self, cache_key: str, lines: List[Dict[str, Any]], amount: Optional[float], parser_version: str) -> None:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO textract_results "
+                "(cache_key, line_blocks, amount, parser_version, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, json.dumps(lines), amount, parser_version, now, now + self.ttl)
+            )
+
+
+class MySQLTextractCache:
+    """
+    Stores results in the textract_results table.
+
+    Uses its own connection rather than the request connection so cache reads
+    and writes never commit or roll back the caller's transaction.
+    """
+
+    def __init__(self, connect: Callable[[], Any], ttl: float):
+        self._connect = connect
+        self.ttl = ttl
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _run(self, sql: str, params: tuple, fetch: bool = False):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._connection is None:
+                        self._connection = self._connect()
+                    with self._connection.cursor() as cursor:
+                        cursor.execute(sql, params)
+                        row = cursor.fetchone() if fetch else None
+                    self._connection.commit()
+                    return row
+                except Exception:
+                    # Drop the connection and retry once on a fresh one
+                    connection, self._connection = self._connection, None
+                    if connection is not None:
+                        try:
+                            connection.close()
+                        except Exception:
+                            pass
+                    if attempt:
+                        raise
+
+    def get(self, cache_key: str) -> Optional[CachedResult]:
+        row = self._run(
+            "SELECT line_blocks, amount, parser_version FROM textract_results "
+            "WHERE cache_key = %s AND expires_at > %s",
+            (cache_key, datetime.now()),
+            fetch=True
+        )
+        if not row:
+            return None
+        amount = row['amount']
+        return CachedResult(json.loads(row['line_blocks']), float(amount) if amount is not None else None,
+                            row['parser_version'])
+
+    def put(self, cache_key: str, lines: List[Dict[str, Any]], amount: Optional[float], parser_version: str) -> None:
+        now = datetime.now()
+        self._run(
+            """
+            INSERT INTO textract_results (cache_key, line_blocks, amount, parser_version, created_at, expires_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                line_blocks = VALUES(line_blocks),
+                amount = VALUES(amount),
+                parser_version = VALUES(parser_version),
+                created_at = VALUES(created_at),
+                expires_at = VALUES(expires_at)
+            """,
+            (cache_key, json.dumps(lines), amount, parser_version, now, now + timedelta(seconds=self.ttl))
+        )
+
+
+_cache = None
+_cache_loaded = False
+_cache_lock = threading.Lock()
+
+
+def get_textract_cache():
+    """Return the process-wide cache selected by TEXTRACT_CACHE_BACKEND, or None when disabled."""
+    global _cache, _cache_loaded
+    with _cache_lock:
+        if _cache_loaded:
+            return _cache
+
+        backend = config.TEXTRACT_CACHE_BACKEND
+        ttl = config.TEXTRACT_CACHE_TTL_SECONDS
+
+        if not backend:
+            _cache = None
+        elif backend == 'mysql':
+            from connection_manager import open_connection
+            _cache = MySQLTextractCache(open_connection, ttl)
+        elif backend == 'sqlite':
+            _cache = SQLiteTextractCache(config.TEXTRACT_CACHE_SQLITE_PATH, ttl)
+        elif backend == 'memory':
+            _cache = MemoryTextractCache(ttl)
+        else:
+            raise ValueError(f"Unknown TEXTRACT_CACHE_BACKEND: {backend}")
+
+        _cache_loaded = True
+        logger.info("Textract cache initialized", extra={'textract_cache_backend': backend or 'disabled'})
+        return _cache
+
+
+def set_textract_cache(cache) -> None:
+    """Override the process-wide cache (tests and local runs)."""
+    global _cache, _cache_loaded
+    with _cache_lock:
+        _cache = cache
+        _cache_loaded = True
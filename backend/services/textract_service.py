@@ -1,122 +1,370 @@
-import boto3
+import time
 import logging
-import re
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from backend import config
+except ImportError:
+    import config
+
+from services.aws_clients import get_client
+from services.receipt_parser import parse_receipt_amount
+from services.receipt_preprocess import prepare_receipt_for_ocr
+from services.textract_cache import get_textract_cache, receipt_cache_key
+from services.tracing import traced
 
 # Configure logging
-logger = logging.getLogger()
+logger = logging.getLogger(__name__)
 
-# Initialize Textract client
-textract_client = boto3.client('textract')
 
+def _textract():
+    return get_client('textract')
 
-def extract_amount_from_receipt(bucket: str, key: str) -> float:
-    """
-    Extract the payment amount from a receipt image using AWS Textract.
 
-    Args:
-        bucket: S3 bucket name where the receipt is stored
-        key: S3 object key of the receipt
+def _s3():
+    return get_client('s3')
+
+
+# Bump when parse_amount_from_lines changes; cached results from older
+# versions are re-parsed from their stored lines instead of re-running Textract
+PARSER_VERSION = '2'
+
+# Receipts that may have several pages go through the asynchronous Textract API;
+# detect_document_text only handles single-page documents
+MULTIPAGE_SUFFIXES = ('.pdf', '.tif', '.tiff')
+
+# Async job statuses reported by get_document_text_detection
+JOB_IN_PROGRESS = 'IN_PROGRESS'
+JOB_SUCCEEDED = 'SUCCEEDED'
+JOB_PARTIAL_SUCCESS = 'PARTIAL_SUCCESS'
+JOB_FAILED = 'FAILED'
+
+
+def detect_receipt_lines(bucket: str, key: str) -> List[Dict[str, Any]]:
+    """
+    Run Textract on the receipt and return its LINE blocks.
 
     Returns:
-        float: Extracted amount, or 0.0 if unable to extract
+        list: One dict per line with Text, Confidence and Page
     """
-    logger.info("=== TEXTRACT SERVICE START ===", extra={
+    logger.info("Calling Textract to analyze document", extra={
         'bucket': bucket,
         'key': key
     })
 
+    started = time.perf_counter()
+    response = _textract().detect_document_text(
+        Document={
+            'S3Object': {
+                'Bucket': bucket,
+                'Name': key
+            }
+        }
+    )
+
+    logger.info("Textract response received", extra={
+        'key': key,
+        'textract_ms': round((time.perf_counter() - started) * 1000, 1),
+        'blocks_count': len(response.get('Blocks', [])),
+        'document_metadata': response.get('DocumentMetadata', {})
+    })
+
+    return [
+        {
+            'Text': block['Text'],
+            'Confidence': block.get('Confidence'),
+            'Page': block.get('Page', 1)
+        }
+        for block in response.get('Blocks', [])
+        if block['BlockType'] == 'LINE'
+    ]
+
+
+def parse_amount_from_lines(lines: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Pick the payment amount from Textract LINE blocks.
+
+    Returns:
+        dict: The chosen match with amount, currency, line and confidence, or None if no amount was found
+    """
+    logger.info("Text extracted from receipt", extra={
+        'line_count': len(lines),
+        'text_preview': [line['Text'] for line in lines[:5]]
+    })
+
+    return parse_receipt_amount(line['Text'] for line in lines)
+
+
+def best_amount(candidates: Iterable[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """Pick the strongest parse result, e.g. across the pages of one document."""
+    best = None
+    for candidate in candidates:
+        if candidate and (best is None or (candidate['score'], candidate['amount']) > (best['score'], best['amount'])):
+            best = candidate
+    return best
+
+
+def is_multipage_document(key: str) -> bool:
+    return key.lower().endswith(MULTIPAGE_SUFFIXES)
+
+
+def start_receipt_text_detection(bucket: str, key: str, job_tag: Optional[str] = None) -> str:
+    """
+    Start an asynchronous Textract text detection job for a (multi-page) receipt.
+
+    Completion is published to TEXTRACT_SNS_TOPIC_ARN when configured;
+    otherwise poll with collect_receipt_text_detection.
+
+    Returns:
+        str: The Textract JobId
+    """
+    params = {
+        'DocumentLocation': {
+            'S3Object': {
+                'Bucket': bucket,
+                'Name': key
+            }
+        }
+    }
+    if job_tag:
+        params['JobTag'] = job_tag
+    if config.TEXTRACT_SNS_TOPIC_ARN and config.TEXTRACT_SNS_ROLE_ARN:
+        params['NotificationChannel'] = {
+            'SNSTopicArn': config.TEXTRACT_SNS_TOPIC_ARN,
+            'RoleArn': config.TEXTRACT_SNS_ROLE_ARN
+        }
+
+    response = _textract().start_document_text_detection(**params)
+
+    logger.info("Asynchronous Textract job started", extra={
+        'bucket': bucket,
+        'key': key,
+        'job_id': response['JobId'],
+        'sns_notification': 'NotificationChannel' in params
+    })
+    return response['JobId']
+
+
+def _iter_text_detection_results(job_id: str):
+    """
+    Yield every get_document_text_detection response for a job.
+
+    The request for the next NextToken page is issued before the current page
+    is handed back, so fetching and parsing overlap.
+    """
+    def fetch(next_token):
+        params = {'JobId': job_id, 'MaxResults': 1000}
+        if next_token:
+            params['NextToken'] = next_token
+        return _textract().get_document_text_detection(**params)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        response = fetch(None)
+        while True:
+            next_token = response.get('NextToken')
+            pending = executor.submit(fetch, next_token) if next_token and response.get('JobStatus') != JOB_IN_PROGRESS else None
+            yield response
+            if pending is None:
+                return
+            response = pending.result()
+
+
+def collect_receipt_text_detection(job_id: str) -> Dict[str, Any]:
+    """
+    Collect the results of an asynchronous text detection job.
+
+    Every document page is parsed on its own as soon as all of its lines have
+    arrived, while the next result page is being fetched; the strongest
+    amount across pages wins.
+
+    Returns:
+        dict: status (Textract JobStatus), lines, pages, best (parse result or None)
+        and status_message
+    """
+    lines: List[Dict[str, Any]] = []
+    page_results = []
+    page_lines: List[Dict[str, Any]] = []
+    current_page = None
+    status = JOB_IN_PROGRESS
+    status_message = None
+    pages = 0
+
+    for response in _iter_text_detection_results(job_id):
+        status = response.get('JobStatus', status)
+        status_message = response.get('StatusMessage')
+        if status in (JOB_IN_PROGRESS, JOB_FAILED):
+            break
+        pages = response.get('DocumentMetadata', {}).get('Pages', pages)
+
+        for block in response.get('Blocks', []):
+            if block['BlockType'] != 'LINE':
+                continue
+            line = {
+                'Text': block['Text'],
+                'Confidence': block.get('Confidence'),
+                'Page': block.get('Page', 1)
+            }
+            # Results arrive in page order, so a new page number completes the previous page
+            if line['Page'] != current_page and page_lines:
+                page_results.append(parse_receipt_amount(item['Text'] for item in page_lines))
+                page_lines = []
+            current_page = line['Page']
+            page_lines.append(line)
+            lines.append(line)
+
+    if page_lines and status not in (JOB_IN_PROGRESS, JOB_FAILED):
+        page_results.append(parse_receipt_amount(item['Text'] for item in page_lines))
+
+    best = best_amount(page_results)
+    logger.info("Asynchronous Textract results collected", extra={
+        'job_id': job_id,
+        'job_status': status,
+        'pages': pages,
+        'line_count': len(lines),
+        'amount': best['amount'] if best else None
+    })
+    return {
+        'status': status,
+        'status_message': status_message,
+        'pages': pages,
+        'lines': lines,
+        'best': best
+    }
+
+
+def lookup_cached_amount(bucket: str, key: str) -> Optional[float]:
+    """Return the cached amount for a receipt parsed by the current parser, or None."""
+    _, _, cached = _lookup_cache(bucket, key)
+    if cached is not None and cached.parser_version == PARSER_VERSION:
+        return cached.amount or 0.0
+    return None
+
+
+def store_receipt_result(bucket: str, key: str, lines: List[Dict[str, Any]], amount: Optional[float]) -> None:
+    """Cache lines and amount from an asynchronous job (no-op when caching is disabled)."""
+    cache, cache_key = _cache_for(bucket, key)
+    if cache is not None:
+        _store_cache(cache, cache_key, lines, amount)
+
+
+def _receipt_cache_key(bucket: str, key: str) -> Optional[str]:
+    # HEAD is far cheaper than Textract and the ETag identifies the content, not the key
+    response = _s3().head_object(Bucket=bucket, Key=key)
+    return receipt_cache_key(etag=response.get('ETag'))
+
+
+def _cache_for(bucket: str, key: str):
+    """Return (cache, cache_key), or (None, None) when caching is disabled or unavailable."""
     try:
-        # Call Textract to detect text in the document
-        logger.info("Calling Textract to analyze document", extra={
+        cache = get_textract_cache()
+        if cache is None:
+            return None, None
+        cache_key = _receipt_cache_key(bucket, key)
+        if not cache_key:
+            return None, None
+        return cache, cache_key
+    except Exception as e:
+        logger.warning("⚠ Textract cache unavailable - calling Textract", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
             'bucket': bucket,
             'key': key
         })
+        return None, None
 
-        response = textract_client.detect_document_text(
-            Document={
-                'S3Object': {
-                    'Bucket': bucket,
-                    'Name': key
-                }
-            }
-        )
 
-        logger.info("Textract response received", extra={
-            'blocks_count': len(response.get('Blocks', [])),
-            'document_metadata': response.get('DocumentMetadata', {})
+def _lookup_cache(bucket: str, key: str):
+    """Return (cache, cache_key, cached_result); cache errors only disable caching for this call."""
+    cache, cache_key = _cache_for(bucket, key)
+    if cache is None:
+        return None, None, None
+    try:
+        return cache, cache_key, cache.get(cache_key)
+    except Exception as e:
+        logger.warning("⚠ Textract cache lookup failed - calling Textract", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'cache_key': cache_key
         })
+        return None, None, None
 
-        # Extract all text from the document
-        text_lines = []
-        for block in response.get('Blocks', []):
-            if block['BlockType'] == 'LINE':
-                text_lines.append(block['Text'])
 
-        logger.info("Text extracted from receipt", extra={
-            'line_count': len(text_lines),
-            'text_preview': text_lines[:5] if text_lines else []
+def _store_cache(cache, cache_key: str, lines: List[Dict[str, Any]], amount: Optional[float]) -> None:
+    try:
+        cache.put(cache_key, lines, amount, PARSER_VERSION)
+    except Exception as e:
+        logger.warning("⚠ Could not store Textract result in cache", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e),
+            'cache_key': cache_key
         })
 
-        # Try to find amounts in the text
-        amounts = []
-        for line in text_lines:
-            # Look for patterns like:
-            # RM 100.00, RM100.00, RM 100, 100.00, $100.00, etc.
-            # Common keywords: Total, Amount, Grand Total, Payment, etc.
-
-            # Pattern for monetary amounts
-            amount_patterns = [
-                r'(?:RM|rm|Rs|rs|\$|USD|MYR)\s*(\d+(?:,\d{3})*(?:\.\d{2})?)',  # RM 1,000.00 or $100.00
-                r'(\d+(?:,\d{3})*(?:\.\d{2}))\s*(?:RM|rm|Rs|rs|\$|USD|MYR)',   # 1,000.00 RM
-                r'(?:total|amount|grand\s*total|payment|paid|subtotal)[:\s]+(?:RM|rm|Rs|rs|\$)?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)',  # Total: RM 100.00
-            ]
-
-            for pattern in amount_patterns:
-                matches = re.findall(pattern, line, re.IGNORECASE)
-                for match in matches:
-                    try:
-                        # Remove commas and convert to float
-                        amount_str = match.replace(',', '')
-                        amount = float(amount_str)
-                        amounts.append({
-                            'amount': amount,
-                            'line': line,
-                            'confidence': 'high' if any(keyword in line.lower() for keyword in ['total', 'amount', 'payment', 'paid']) else 'medium'
-                        })
-                    except ValueError:
-                        continue
-
-        logger.info("Amounts found in receipt", extra={
-            'amounts_count': len(amounts),
-            'amounts': amounts
-        })
 
-        if amounts:
-            # Prioritize amounts from lines with keywords like "total", "amount", etc.
-            high_confidence_amounts = [a for a in amounts if a['confidence'] == 'high']
-
-            if high_confidence_amounts:
-                # Return the largest amount from high confidence matches
-                final_amount = max(high_confidence_amounts, key=lambda x: x['amount'])['amount']
-                logger.info("✓ Amount extracted with high confidence", extra={
-                    'amount': final_amount,
-                    'line': next(a['line'] for a in amounts if a['amount'] == final_amount)
-                })
-                return final_amount
-            else:
-                # Return the largest amount from all matches
-                final_amount = max(amounts, key=lambda x: x['amount'])['amount']
-                logger.info("✓ Amount extracted with medium confidence", extra={
-                    'amount': final_amount,
-                    'line': next(a['line'] for a in amounts if a['amount'] == final_amount)
-                })
-                return final_amount
+@traced('textract')
+def extract_amount_from_receipt(bucket: str, key: str) -> float:
+    """
+    Extract the payment amount from a receipt image using AWS Textract.
+
+    Results are cached by the receipt's ETag (see services/textract_cache.py),
+    so resubmitted receipts and reprocessing runs do not call Textract again.
+
+    Args:
+        bucket: S3 bucket name where the receipt is stored
+        key: S3 object key of the receipt
+
+    Returns:
+        float: Extracted amount, or 0.0 if no amount was found or Textract
+        cannot read the document (invalid S3 object, unsupported format)
+
+    Raises:
+        Any other S3, Textract or cache error (outages, throttling), so callers
+        can retry instead of storing 0.0 as the result
+    """
+    logger.info("=== TEXTRACT SERVICE START ===", extra={
+        'bucket': bucket,
+        'key': key
+    })
+
+    try:
+        cache, cache_key, cached = _lookup_cache(bucket, key)
+
+        if cached is not None and cached.parser_version == PARSER_VERSION:
+            logger.info("✓ Textract result served from cache", extra={
+                'cache_key': cache_key,
+                'amount': cached.amount
+            })
+            return cached.amount or 0.0
+
+        if cached is not None:
+            logger.info("Re-parsing cached Textract lines for new parser version", extra={
+                'cache_key': cache_key,
+                'cached_parser_version': cached.parser_version,
+                'parser_version': PARSER_VERSION
+            })
+            lines = cached.lines
         else:
+            # Large photos are sent to Textract as a smaller normalized derivative
+            lines = detect_receipt_lines(bucket, prepare_receipt_for_ocr(_s3(), bucket, key))
+
+        best = parse_amount_from_lines(lines)
+        amount = best['amount'] if best else None
+
+        if cache is not None:
+            _store_cache(cache, cache_key, lines, amount)
+
+        if best is None:
             logger.warning("⚠ No amounts found in receipt text")
             return 0.0
 
-    except textract_client.exceptions.InvalidS3ObjectException as e:
+        logger.info(f"✓ Amount extracted with {best['confidence']} confidence", extra={
+            'amount': best['amount'],
+            'currency': best['currency'],
+            'line': best['line']
+        })
+        return best['amount']
+
+    except _textract().exceptions.InvalidS3ObjectException as e:
         logger.error("Invalid S3 object for Textract", extra={
             'error': str(e),
             'bucket': bucket,
@@ -124,7 +372,7 @@ def extract_amount_from_receipt(bucket: str, key: str) -> float:
         })
         return 0.0
 
-    except textract_client.exceptions.UnsupportedDocumentException as e:
+    except _textract().exceptions.UnsupportedDocumentException as e:
         logger.error("Unsupported document format for Textract", extra={
             'error': str(e),
             'bucket': bucket,
@@ -139,7 +387,7 @@ def extract_amount_from_receipt(bucket: str, key: str) -> float:
             'bucket': bucket,
             'key': key
         }, exc_info=True)
-        return 0.0
+        raise
 
     finally:
         logger.info("=== TEXTRACT SERVICE END ===")
@@ -0,0 +1,156 @@
+"""
+Tracing
+Per-request phase timings for the API handler.
+
+A request trace is started around a route handler with @traced_request; code
+inside it times its phases with span() or @traced:
+
+    with span('contact_upsert'):
+        cursor.execute(...)
+
+    @traced('pdf')
+    def generate_pdf_from_template(...): ...
+
+Spans outside an active trace (workers, scripts) cost one context variable
+lookup and record nothing, so service functions can be decorated freely.
+Repeated spans with the same name are summed.
+
+When the trace finishes, the breakdown is printed as one CloudWatch
+embedded-metric-format (EMF) line (TRACE_METRICS_ENABLED) and, with
+TRACE_TIMING_HEADER, returned to the caller in a Server-Timing header.
+"""
+import json
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from backend import config
+except ImportError:
+    import config
+
+from services.log_control import get_logger
+
+logger = get_logger(__name__)
+
+_current: contextvars.ContextVar = contextvars.ContextVar('request_trace', default=None)
+
+
+class RequestTrace:
+    def __init__(self, route: str):
+        self.route = route
+        self.started = time.perf_counter()
+        self.total_ms: Optional[float] = None
+        self.spans: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + elapsed_ms
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def finish(self) -> float:
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+        return self.total_ms
+
+    def breakdown(self) -> Dict[str, float]:
+        timings = {name: round(ms, 2) for name, ms in self.spans.items()}
+        if self.total_ms is not None:
+            timings['total'] = round(self.total_ms, 2)
+        return timings
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: phase;dur=ms entries in the order they first ran."""
+        return ', '.join(f'{name};dur={ms}' for name, ms in self.breakdown().items())
+
+    def to_emf(self, request_id: str = '') -> Dict[str, Any]:
+        timings = self.breakdown()
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': config.METRICS_NAMESPACE,
+                    'Dimensions': [['Route']],
+                    'Metrics': [{'Name': f'Phase.{name}', 'Unit': 'Milliseconds'} for name in timings]
+                }]
+            },
+            'Route': self.route,
+            'RequestId': request_id,
+        }
+        for name, ms in timings.items():
+            document[f'Phase.{name}'] = ms
+        return document
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time the with block as phase name of the active request trace (no-op without one)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, (time.perf_counter() - started) * 1000)
+
+
+def traced(name: str) -> Callable:
+    """Decorator form of span()."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def emit_trace(trace: RequestTrace, request_id: str = '') -> None:
+    if not config.TRACE_METRICS_ENABLED:
+        return
+    try:
+        # EMF must be a bare JSON line on stdout; the logging formatter would prefix it
+        print(json.dumps(trace.to_emf(request_id)), flush=True)
+    except Exception as e:
+        logger.warning("⚠ Could not emit request trace", extra={
+            'error_type': type(e).__name__,
+            'error_message': str(e)
+        })
+
+
+def traced_request(route: str) -> Callable:
+    """
+    Run a route handler (event, headers) -> response inside a request trace.
+
+    The trace is emitted when the handler returns or raises; with
+    TRACE_TIMING_HEADER the response also gets a Server-Timing header.
+    """
+    def decorator(handler: Callable) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event, headers, *args, **kwargs):
+            trace = RequestTrace(route)
+            token = _current.set(trace)
+            response = None
+            try:
+                response = handler(event, headers, *args, **kwargs)
+                return response
+            finally:
+                _current.reset(token)
+                trace.finish()
+                request_id = ((event or {}).get('requestContext') or {}).get('requestId', '')
+                emit_trace(trace, request_id)
+                logger.debug("Request timing", extra=lambda: {'route': route, 'timings': trace.breakdown()})
+                if config.TRACE_TIMING_HEADER and isinstance(response, dict):
+                    # Copy: the caller shares one headers dict between responses
+                    response['headers'] = dict(response.get('headers') or {})
+                    response['headers']['Server-Timing'] = trace.server_timing()
+                    response['headers']['Access-Control-Expose-Headers'] = 'Server-Timing'
+        return wrapper
+    return decorator
@@ -0,0 +1,88 @@
+"""
+Lead lookups during the email_normalized backfill (database.py) and the
+check_email_normalized.py report, against a scripted cursor.
+"""
+import check_email_normalized
+from database import Database
+
+
+class ScriptedCursor:
+    """Answers each execute() with the next (matcher, rows) entry whose matcher is in the query."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.queries = []
+        self.rows = []
+
+    def execute(self, query, args=None):
+        self.queries.append((' '.join(query.split()), args))
+        for index, (matcher, rows) in enumerate(self.script):
+            if matcher in query:
+                self.rows = list(rows)
+                del self.script[index]
+                return
+        raise AssertionError(f'unexpected query: {query}')
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+def database():
+    # Skip __init__: no pool or server is needed to build the lookup condition
+    db = Database.__new__(Database)
+    db._leads_backfilled = False
+    return db
+
+
+def test_lead_lookup_falls_back_while_rows_await_backfill():
+    db = database()
+    cursor = ScriptedCursor([('email_normalized IS NULL LIMIT 1', [{'1': 1}])])
+
+    condition, args = db._lead_email_condition(cursor, ' Partner@Example.com ')
+
+    assert condition == Database.LEAD_EMAIL_FALLBACK
+    assert args == ('partner@example.com', 'partner@example.com')
+    assert db._leads_backfilled is False
+
+
+def test_lead_lookup_uses_index_only_once_backfilled():
+    db = database()
+    cursor = ScriptedCursor([('email_normalized IS NULL LIMIT 1', [])])
+
+    assert db._lead_email_condition(cursor, 'Partner@Example.com') == ('email_normalized = %s', ('partner@example.com',))
+    # Not asked again: the triggers fill email_normalized for every new row
+    assert db._lead_email_condition(cursor, 'other@example.com') == ('email_normalized = %s', ('other@example.com',))
+    assert len(cursor.queries) == 1
+
+
+def check(table, triggers, pending, plan):
+    cursor = ScriptedCursor([
+        ('information_schema.TRIGGERS', [{'TRIGGER_NAME': name} for name in triggers]),
+        ('COUNT(*) AS pending', [{'pending': pending}]),
+        ('LIMIT 1', [{'email_normalized': 'a@example.com'}]),
+        ('EXPLAIN', [plan]),
+    ])
+    return check_email_normalized.check_table(cursor, table)
+
+
+def test_check_passes_for_indexed_lookup():
+    result = check('leads', ['leads_email_normalized_insert', 'leads_email_normalized_update'], 0,
+                   {'key': 'idx_leads_email_normalized', 'type': 'ref', 'rows': 1})
+    assert result['failures'] == []
+
+    result = check('contacts', ['contacts_email_normalized_insert', 'contacts_email_normalized_update'], 0,
+                   {'key': 'uq_contacts_email_normalized', 'type': 'const', 'rows': 1})
+    assert result['failures'] == []
+
+
+def test_check_reports_scan_missing_trigger_and_pending_rows():
+    result = check('leads', ['leads_email_normalized_insert'], 12,
+                   {'key': None, 'type': 'ALL', 'rows': 100000})
+
+    assert len(result['failures']) == 3
+    assert 'leads_email_normalized_update' in result['failures'][0]
+    assert '12 rows' in result['failures'][1]
+    assert 'key=None type=ALL' in result['failures'][2]
@@ -0,0 +1,235 @@
+"""
+Asynchronous Textract flow (services/textract_service.py, receipt_worker.py)
+against a local stub of the Textract client.
+"""
+import threading
+
+import pytest
+
+import config
+import receipt_worker
+from services import textract_service
+from services.aws_clients import set_client
+from services.textract_cache import set_textract_cache
+
+
+def line(text, page):
+    return {'BlockType': 'LINE', 'Text': text, 'Confidence': 99.0, 'Page': page}
+
+
+class FakeTextract:
+    """get_document_text_detection answers from {NextToken or None: response}."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.tokens = []
+        self.started = []
+        self.fetched = threading.Event()
+
+    def get_document_text_detection(self, JobId, MaxResults, NextToken=None):
+        self.tokens.append(NextToken)
+        if NextToken:
+            self.fetched.set()
+        return self.responses[NextToken]
+
+    def start_document_text_detection(self, **params):
+        self.started.append(params)
+        return {'JobId': 'job-1'}
+
+
+@pytest.fixture
+def textract():
+    def install(responses):
+        client = FakeTextract(responses)
+        set_client('textract', client)
+        return client
+    set_textract_cache(None)
+    yield install
+    set_client('textract', None)
+
+
+# Three document pages over three result pages: page 2 is split across the first
+# two responses, so its "Amount due" label only reaches "RM 150.00" if page 2 is
+# parsed once all of its lines have arrived. Merging pages 1 and 2 would give the
+# "TOTAL" label to "RM 20.00" instead.
+MULTI_PAGE = {
+    None: {
+        'JobStatus': 'SUCCEEDED',
+        'DocumentMetadata': {'Pages': 3},
+        'NextToken': 't1',
+        'Blocks': [
+            {'BlockType': 'PAGE', 'Page': 1},
+            line('Invoice', 1),
+            line('TOTAL', 1),
+            line('RM 20.00', 2),
+            line('Amount due', 2),
+        ]
+    },
+    't1': {
+        'JobStatus': 'SUCCEEDED',
+        'DocumentMetadata': {'Pages': 3},
+        'NextToken': 't2',
+        'Blocks': [line('RM 150.00', 2), line('Thank you', 3)]
+    },
+    't2': {
+        'JobStatus': 'SUCCEEDED',
+        'DocumentMetadata': {'Pages': 3},
+        'Blocks': [line('Item 5.00', 3)]
+    }
+}
+
+
+def test_multi_page_job_follows_token_chain(textract):
+    client = textract(MULTI_PAGE)
+
+    job = textract_service.collect_receipt_text_detection('job-1')
+
+    assert client.tokens == [None, 't1', 't2']
+    assert job['status'] == 'SUCCEEDED'
+    assert job['pages'] == 3
+    assert [item['Text'] for item in job['lines']] == [
+        'Invoice', 'TOTAL', 'RM 20.00', 'Amount due', 'RM 150.00', 'Thank you', 'Item 5.00'
+    ]
+    assert job['best']['amount'] == 150.0
+    assert job['best']['score'] == 7
+    assert job['best']['confidence'] == 'high'
+
+
+def test_next_page_is_requested_before_current_page_is_consumed(textract):
+    client = textract(MULTI_PAGE)
+
+    results = textract_service._iter_text_detection_results('job-1')
+    first = next(results)
+
+    assert first['NextToken'] == 't1'
+    assert client.fetched.wait(timeout=5)
+    assert len(list(results)) == 2
+
+
+def test_in_progress_job_stops_after_first_response(textract):
+    client = textract({
+        None: {'JobStatus': 'IN_PROGRESS', 'NextToken': 't1', 'Blocks': [line('RM 150.00', 1)]}
+    })
+
+    job = textract_service.collect_receipt_text_detection('job-1')
+
+    assert client.tokens == [None]
+    assert job['status'] == 'IN_PROGRESS'
+    assert job['best'] is None
+    assert job['lines'] == []
+
+
+def test_failed_job_reports_status_message(textract):
+    textract({None: {'JobStatus': 'FAILED', 'StatusMessage': 'Unsupported document'}})
+
+    job = textract_service.collect_receipt_text_detection('job-1')
+
+    assert job['status'] == 'FAILED'
+    assert job['status_message'] == 'Unsupported document'
+    assert job['best'] is None
+
+
+def test_partial_success_keeps_detected_amount(textract):
+    textract({
+        None: {
+            'JobStatus': 'PARTIAL_SUCCESS',
+            'StatusMessage': 'Some pages could not be processed',
+            'DocumentMetadata': {'Pages': 2},
+            'Blocks': [line('Amount due', 1), line('RM 88.50', 1)]
+        }
+    })
+
+    job = textract_service.collect_receipt_text_detection('job-1')
+
+    assert job['status'] == 'PARTIAL_SUCCESS'
+    assert job['best']['amount'] == 88.5
+
+
+class FakeCursor:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, args=None):
+        self.statements.append((' '.join(query.split()), args))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self.statements)
+
+    def commit(self):
+        self.commits += 1
+
+
+def awaiting_payment(waiting_seconds=0, attempts=0):
+    return {
+        'id': 7,
+        'attachment': 'receipts/scan.pdf',
+        'textract_job_id': 'job-1',
+        'extraction_attempts': attempts,
+        'waiting_seconds': waiting_seconds
+    }
+
+
+def stored(connection):
+    """(amount, status, payment id, expected status) of the last payments UPDATE."""
+    return connection.statements[-1][1]
+
+
+def test_worker_parks_multi_page_receipt_awaiting_textract(textract):
+    client = textract({})
+    connection = FakeConnection()
+    payment = {'id': 7, 'attachment': 'receipts/scan.pdf', 'extraction_attempts': 0}
+
+    result = receipt_worker._start_async_extraction(connection, 'bucket', payment)
+
+    assert client.started[0]['DocumentLocation'] == {'S3Object': {'Bucket': 'bucket', 'Name': 'receipts/scan.pdf'}}
+    assert client.started[0]['JobTag'] == 'payment-7'
+    assert result == {'payment_id': 7, 'amount': None, 'status': 'awaiting_textract', 'job_id': 'job-1'}
+    assert stored(connection) == ('awaiting_textract', 'job-1', 7, 'extracting')
+
+
+def test_worker_leaves_running_job_until_timeout(textract, monkeypatch):
+    monkeypatch.setattr(config, 'TEXTRACT_ASYNC_TIMEOUT', 600)
+    textract({None: {'JobStatus': 'IN_PROGRESS'}})
+    connection = FakeConnection()
+
+    assert receipt_worker._complete_async_extraction(connection, 'bucket', awaiting_payment(60)) is None
+    assert connection.statements == []
+
+    result = receipt_worker._complete_async_extraction(connection, 'bucket', awaiting_payment(900))
+
+    assert result['status'] == 'pending_extraction'
+    assert stored(connection) == (0.0, 'pending_extraction', 7, 'awaiting_textract')
+
+
+@pytest.mark.parametrize('attempts, expected', [(0, 'pending_extraction'), (99, 'pending')])
+def test_worker_retries_failed_job(textract, monkeypatch, attempts, expected):
+    monkeypatch.setattr(config, 'RECEIPT_WORKER_MAX_ATTEMPTS', 3)
+    textract({None: {'JobStatus': 'FAILED', 'StatusMessage': 'boom'}})
+    connection = FakeConnection()
+
+    result = receipt_worker._complete_async_extraction(connection, 'bucket', awaiting_payment(attempts=attempts))
+
+    assert result == {'payment_id': 7, 'amount': 0.0, 'status': expected}
+    assert stored(connection) == (0.0, expected, 7, 'awaiting_textract')
+
+
+def test_worker_stores_amount_of_completed_job(textract):
+    textract(MULTI_PAGE)
+    connection = FakeConnection()
+
+    result = receipt_worker._complete_async_extraction(connection, 'bucket', awaiting_payment())
+
+    assert result == {'payment_id': 7, 'amount': 150.0, 'status': 'pending'}
+    assert stored(connection) == (150.0, 'pending', 7, 'awaiting_textract')